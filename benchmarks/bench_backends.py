@@ -0,0 +1,118 @@
+"""
+Benchmark of the model backends under identical synthetic load.
+
+Each backend (see `MODEL_BACKEND`) is loaded in a fresh interpreter from a temporary
+model directory, where its model and artifacts are built beforehand, then serves the
+same random ratings one row at a time (as `POST /predict` does) and in batches
+(as `POST /predict/batch` does). Reports the latency percentiles of a single
+prediction, the batch throughput and the resident memory of the worker.
+
+Run from the root folder: `python -m benchmarks.bench_backends` (Linux only)
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict
+
+from src.app.model import BACKENDS
+
+WORKER_SCRIPT = """
+import json, time
+import numpy as np
+start = time.perf_counter()
+from src.app.model import HappyModel
+model = HappyModel(model_dir={model_dir!r}, backend={backend!r})
+load_seconds = time.perf_counter() - start
+
+X = np.random.default_rng(42).integers(1, 6, size=({rows}, 6))
+model.predict(X[:{batch_size}])
+timings = np.empty({rows})
+for i in range({rows}):
+    start = time.perf_counter()
+    model.predict(X[i : i + 1])
+    timings[i] = time.perf_counter() - start
+
+start = time.perf_counter()
+for i in range(0, {rows}, {batch_size}):
+    model.predict(X[i : i + {batch_size}])
+batch_seconds = time.perf_counter() - start
+
+with open("/proc/self/status") as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+print(json.dumps({{
+    "load_seconds": load_seconds,
+    "p50_us": p50,
+    "p99_us": p99,
+    "rows_per_second": {rows} / batch_seconds,
+    "rss_mib": rss / 1024,
+}}))
+"""
+
+
+def measure(backend: str, model_dir: str, rows: int, batch_size: int) -> Dict[str, Any]:
+    """
+    Serve the synthetic load with a backend in a fresh interpreter.
+
+    Args:
+        backend (str): A key of BACKENDS.
+        model_dir (str): Directory of the models and their artifacts.
+        rows (int): Number of predictions.
+        batch_size (int): Number of rows of a batch.
+
+    Returns:
+        Dict[str, Any]: The loading time, latency percentiles in microseconds,
+            batch throughput and RSS in MiB.
+    """
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            WORKER_SCRIPT.format(
+                model_dir=model_dir, backend=backend, rows=rows, batch_size=batch_size
+            ),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the latency, throughput and memory of each backend.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=5000, help="number of predictions")
+    parser.add_argument("--batch-size", type=int, default=64, help="rows per batch")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as model_dir:
+        for backend in BACKENDS:
+            # The first run trains the model and builds its artifacts
+            measure(backend, model_dir, 1, 1)
+            results[backend] = measure(backend, model_dir, args.rows, args.batch_size)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'backend':<10}{'load s':>8}{'p50 us':>10}{'p99 us':>10}"
+        f"{'rows/s':>12}{'RSS MiB':>10}"
+    )
+    for backend, result in results.items():
+        print(
+            f"{backend:<10}{result['load_seconds']:>8.3f}{result['p50_us']:>10.1f}"
+            f"{result['p99_us']:>10.1f}{result['rows_per_second']:>12.0f}"
+            f"{result['rss_mib']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark of the cold start of the backend.
+
+Measures how long importing the application takes, then starts uvicorn and measures
+how long it takes until the liveness probe answers and until the readiness probe
+reports the model loaded and warmed up.
+
+Run from the root folder: `python -m benchmarks.bench_cold_start`
+"""
+
+import argparse
+import json
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Optional
+
+IMPORT_SCRIPT = (
+    "import time; start = time.perf_counter(); import src.app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def free_port() -> int:
+    """
+    Returns:
+        int: A TCP port nobody listens on.
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_status(url: str) -> Optional[int]:
+    """
+    Request a URL.
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        Optional[int]: The status code of the response, or None if the server doesn't answer.
+    """
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the cold start durations.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--timeout", type=float, default=120, help="seconds")
+    args = parser.parse_args()
+
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True
+    )
+    import_seconds = float(output.stdout.strip().splitlines()[-1])
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.app.main:app", "--port", str(port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    live_seconds = ready_seconds = None
+    try:
+        while time.perf_counter() - start < args.timeout:
+            if live_seconds is None and get_status(f"{base_url}/health/live") == 200:
+                live_seconds = time.perf_counter() - start
+            if live_seconds is not None:
+                if get_status(f"{base_url}/health/ready") == 200:
+                    ready_seconds = time.perf_counter() - start
+                    with urllib.request.urlopen(f"{base_url}/health/ready") as response:
+                        report = json.load(response)
+                    break
+            time.sleep(0.01)
+        else:
+            raise RuntimeError("The server did not get ready in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{'import src.app.main':<28}{import_seconds:>8.3f}s")
+    print(f"{'process start to live':<28}{live_seconds:>8.3f}s")
+    print(f"{'process start to ready':<28}{ready_seconds:>8.3f}s")
+    for step in ("load_seconds", "warm_up_seconds", "ready_seconds"):
+        print(f"{'  ' + step + ' (server)':<28}{report[step]:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
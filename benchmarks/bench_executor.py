@@ -0,0 +1,89 @@
+"""
+Benchmark of the inference executors under concurrent requests.
+
+Runs the same burst of concurrent single-row predictions with each executor mode,
+with and without the lookup table, and reports the throughput with the counters
+of the executor (mean execution time, mean wait time, maximum queue depth).
+
+Run from the root folder: `python -m benchmarks.bench_executor`
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from src.app.executor import EXECUTOR_MODES, InferenceExecutor
+from src.app.model import HappyModel, input_space
+
+
+async def run_burst(
+    model: HappyModel, mode: str, workers: Optional[int], requests: int
+) -> Dict[str, Any]:
+    """
+    Send a burst of concurrent predictions through an executor.
+
+    Args:
+        model (HappyModel): The model.
+        mode (str): The executor mode.
+        workers (Optional[int]): Number of threads or processes.
+        requests (int): Number of concurrent predictions.
+
+    Returns:
+        Dict[str, Any]: The throughput in predictions per second and the executor counters.
+    """
+    rows = input_space()[
+        np.random.default_rng(0).integers(0, len(input_space()), requests)
+    ]
+    executor = InferenceExecutor(
+        mode=mode, workers=workers, model_fname=model.model_fname_
+    )
+    await executor.start()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(executor.predict(model, row[None, :]) for row in rows))
+        elapsed = time.perf_counter() - start
+    finally:
+        executor.shutdown()
+    return {"throughput": requests / elapsed, **executor.stats()}
+
+
+def main() -> None:
+    """
+    Run the benchmark and print a line per executor mode and inference path.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="concurrent predictions"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="threads or processes (CPUs)"
+    )
+    args = parser.parse_args()
+
+    model = HappyModel()
+    lookup = model.lookup_
+
+    print(
+        f"{'mode':<10}{'path':<14}{'req/s':>10}{'exec us':>10}{'wait ms':>10}{'max queue':>11}"
+    )
+    for path in ("lookup table", "sklearn"):
+        # The processes of the pool load their own model, with its lookup table
+        model.lookup_ = lookup if path == "lookup table" else None
+        for mode in EXECUTOR_MODES:
+            if mode == "process" and path == "sklearn":
+                continue
+            stats = asyncio.run(run_burst(model, mode, args.workers, args.requests))
+            print(
+                f"{mode:<10}{path:<14}{stats['throughput']:>10.0f}"
+                f"{stats['execution_time_mean'] * 1e6:>10.1f}"
+                f"{stats['wait_time_total'] / stats['completed'] * 1e3:>10.2f}"
+                f"{stats['max_queue_depth']:>11}"
+            )
+    model.lookup_ = lookup
+
+
+if __name__ == "__main__":
+    main()
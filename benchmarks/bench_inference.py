@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of a single HappyModel inference.
+
+Compares the former two-call path (`predict` then `predict_proba` on a nested list),
+the single-pass `predict_array` path built on `predict_proba_array`, and the lookup table.
+
+Run from the root folder: `python -m benchmarks.bench_inference`
+"""
+
+import argparse
+import timeit
+from typing import Any, Callable, Coroutine, Dict
+
+import numpy as np
+
+from src.app.model import HappyModel
+
+
+def time_per_call(func: Callable[[], object], number: int, repeat: int) -> float:
+    """
+    Measure the best average time of a call.
+
+    Args:
+        func (Callable[[], object]): The function to benchmark.
+        number (int): Number of calls per measurement.
+        repeat (int): Number of measurements.
+
+    Returns:
+        float: The best average time of a call, in microseconds.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def run_coroutine(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Run a coroutine which never suspends, without the overhead of an event loop.
+
+    Args:
+        coro (Coroutine[Any, Any, Any]): The coroutine to run.
+
+    Returns:
+        Any: The value returned by the coroutine.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("The coroutine suspended")
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the per-call latency of each inference path.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--number", type=int, default=1000, help="calls per measurement"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="number of measurements")
+    args = parser.parse_args()
+
+    model = HappyModel()
+    ratings = [4, 3, 5, 2, 4, 1]
+    lookup = model.lookup_
+
+    def two_calls() -> None:
+        data_in = [ratings]
+        model.model.predict(data_in)
+        model.model.predict_proba(data_in).max()
+
+    def single_pass() -> None:
+        model.predict_array(np.array([ratings]))
+
+    def lookup_table() -> None:
+        model.lookup_ = lookup
+        run_coroutine(model.predict_happiness(*ratings))
+
+    def single_pass_endpoint() -> None:
+        model.lookup_ = None
+        run_coroutine(model.predict_happiness(*ratings))
+
+    results: Dict[str, float] = {
+        "predict + predict_proba": time_per_call(two_calls, args.number, args.repeat),
+        "predict_array (single pass)": time_per_call(
+            single_pass, args.number, args.repeat
+        ),
+        "predict_happiness (single pass)": time_per_call(
+            single_pass_endpoint, args.number, args.repeat
+        ),
+        "predict_happiness (lookup table)": time_per_call(
+            lookup_table, args.number, args.repeat
+        ),
+    }
+    model.lookup_ = lookup
+
+    baseline = results["predict + predict_proba"]
+    print(f"{'path':<36}{'us/call':>10}{'speedup':>10}")
+    for name, us in results.items():
+        print(f"{name:<36}{us:>10.1f}{baseline / us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
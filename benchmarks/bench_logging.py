@@ -0,0 +1,144 @@
+"""
+Benchmark of the logging pipeline under request load.
+
+Each logging mode (see `LOG_QUEUE`, `LOG_FORMAT` and `LOG_SAMPLE_RATE`) runs in a
+fresh interpreter, since the application logger is configured on import, and sends
+the same concurrent `POST /predict` requests to the application in-process. The
+database is left out so that the throughput difference is the cost of logging.
+The records are written to a temporary log file and to stdout (discarded), and
+the best of several runs is reported to smooth out the noise of the machine.
+
+Run from the root folder: `python -m benchmarks.bench_logging`
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict
+
+# Environment of each logging mode, "off" logs warnings only
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {},
+    "queue": {"LOG_QUEUE": "true"},
+    "queue+json": {"LOG_QUEUE": "true", "LOG_FORMAT": "json"},
+    "queue+sampled": {"LOG_QUEUE": "true", "LOG_SAMPLE_RATE": "0.01"},
+}
+
+WORKER_SCRIPT = """
+import asyncio, json, time
+import httpx
+from src.app import main
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        main.DB_INITIALIZED = False
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            semaphore = asyncio.Semaphore({concurrency})
+
+            async def request(i):
+                async with semaphore:
+                    payload = {{
+                        feature: (i + offset) % 5 + 1
+                        for offset, feature in enumerate(
+                            ("city_services", "housing_costs", "school_quality",
+                             "local_policies", "maintenance", "social_events")
+                        )
+                    }}
+                    response = await client.post("/predict", json=payload)
+                    response.raise_for_status()
+
+            await asyncio.gather(*(request(i) for i in range(100)))
+            start = time.perf_counter()
+            await asyncio.gather(*(request(i) for i in range({requests})))
+            return {requests} / (time.perf_counter() - start)
+
+throughput = asyncio.run(run())
+with open({result_path!r}, "w") as f:
+    json.dump({{"throughput": throughput}}, f)
+"""
+
+
+def measure(
+    env: Dict[str, str], requests: int, concurrency: int, tmp_dir: str
+) -> Dict[str, Any]:
+    """
+    Send the requests to the application in a fresh interpreter.
+
+    Args:
+        env (Dict[str, str]): The logging settings.
+        requests (int): Number of requests.
+        concurrency (int): Maximum number of requests in flight.
+        tmp_dir (str): Directory of the log file and of the result.
+
+    Returns:
+        Dict[str, Any]: The throughput in requests per second and the size of the log file.
+    """
+    log_path = os.path.join(tmp_dir, "bench.log")
+    result_path = os.path.join(tmp_dir, "result.json")
+    if os.path.exists(log_path):
+        os.remove(log_path)
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            WORKER_SCRIPT.format(
+                requests=requests, concurrency=concurrency, result_path=result_path
+            ),
+        ],
+        env={
+            **os.environ,
+            "LOG_FILE": log_path,
+            "LOG_FILE_MAX_BYTES": str(1024**3),
+            "RETRAIN_INTERVAL": "0",
+            **env,
+        },
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    with open(result_path) as f:
+        result = json.load(f)
+    result["log_kib"] = (
+        os.path.getsize(log_path) / 1024 if os.path.exists(log_path) else 0.0
+    )
+    return result
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the throughput of each logging mode.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=5000, help="number of requests")
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="requests in flight"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode, env in MODES.items():
+            results[mode] = max(
+                (
+                    measure(env, args.requests, args.concurrency, tmp_dir)
+                    for _ in range(args.repeat)
+                ),
+                key=lambda result: result["throughput"],
+            )
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<16}{'req/s':>10}{'log KiB':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<16}{result['throughput']:>10.0f}{result['log_kib']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark of the resident memory of a serving worker.
+
+Starts fresh interpreters which load HappyModel the way a serving worker does, and
+reports their resident set size (RSS), without and with the training dataset
+(and pandas) loaded, as HappyModel did before the dataset was loaded lazily.
+
+Run from the root folder: `python -m benchmarks.bench_memory` (Linux only)
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict
+
+WORKER_SCRIPT = """
+import time
+start = time.perf_counter()
+from src.app.model import HappyModel
+model = HappyModel()
+if {eager}:
+    model.df
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as status:
+    rss = next(int(line.split()[1]) for line in status if line.startswith("VmRSS:"))
+print(rss, elapsed)
+"""
+
+
+def measure(eager: bool) -> Dict[str, float]:
+    """
+    Load the model in a fresh interpreter and measure it.
+
+    Args:
+        eager (bool): Whether to load the dataset too.
+
+    Returns:
+        Dict[str, float]: The RSS in MiB and the loading time in seconds.
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", WORKER_SCRIPT.format(eager=eager)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rss, elapsed = output.stdout.strip().splitlines()[-1].split()
+    return {"rss": int(rss) / 1024, "seconds": float(elapsed)}
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the RSS and loading time of a worker.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\\n\\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="number of measurements")
+    args = parser.parse_args()
+
+    print(f"{'worker':<32}{'RSS MiB':>10}{'load s':>10}")
+    for name, eager in (
+        ("with the dataset (before)", True),
+        ("lazy dataset (after)", False),
+    ):
+        runs = [measure(eager) for _ in range(args.repeat)]
+        rss = min(run["rss"] for run in runs)
+        seconds = min(run["seconds"] for run in runs)
+        print(f"{name:<32}{rss:>10.1f}{seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the aggregate memory of several serving workers on a node.
+
+Starts 1, 4 and 16 processes which load HappyModel like uvicorn workers do and
+reports their total resident set size (RSS) and proportional set size (PSS, where
+the pages shared by several processes are split between them), for the pickled
+model, the compiled model, and the compiled model with memory-mapped artifacts.
+
+Run from the root folder: `python -m benchmarks.bench_workers` (Linux only)
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Dict, List
+
+WORKER_SCRIPT = """
+import sys
+from src.app.model import HappyModel, input_space
+model = HappyModel(compiled={compiled}, mmap={mmap})
+# Touch every page of the artifacts, as serving would over time
+model.predict(input_space())
+model.predict_proba_array(input_space()[:100])
+print("ready", flush=True)
+sys.stdin.read()
+"""
+
+MODES = {
+    "pickle": {"compiled": False, "mmap": False},
+    "compiled": {"compiled": True, "mmap": False},
+    "compiled+mmap": {"compiled": True, "mmap": True},
+}
+
+
+def memory(pid: int) -> Dict[str, int]:
+    """
+    Read the memory of a process.
+
+    Args:
+        pid (int): The process id.
+
+    Returns:
+        Dict[str, int]: The RSS and PSS of the process, in KiB.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower()] = int(rest.split()[0])
+    return values
+
+
+def measure(workers: int, compiled: bool, mmap: bool) -> Dict[str, float]:
+    """
+    Start workers, wait until they have loaded the model and measure them.
+
+    Args:
+        workers (int): Number of processes.
+        compiled (bool): Whether the workers serve the compiled model.
+        mmap (bool): Whether the workers memory-map the artifacts.
+
+    Returns:
+        Dict[str, float]: The total RSS and PSS of the workers, in MiB.
+    """
+    script = WORKER_SCRIPT.format(compiled=compiled, mmap=mmap)
+    processes: List[subprocess.Popen] = []
+    try:
+        for _ in range(workers):
+            processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-c", script],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                )
+            )
+        for process in processes:
+            assert process.stdout is not None
+            while process.stdout.readline().strip() != "ready":
+                if process.poll() is not None:
+                    raise RuntimeError("A worker failed to load the model")
+        usage = [memory(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            if process.stdin is not None:
+                process.stdin.close()
+            process.wait()
+    return {
+        "rss": sum(u["rss"] for u in usage) / 1024,
+        "pss": sum(u["pss"] for u in usage) / 1024,
+    }
+
+
+def main() -> None:
+    """
+    Run the benchmark and print the aggregate memory per number of workers and mode.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\\n\\n")[0])
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 4, 16], help="numbers of workers"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=list(MODES), default=list(MODES), help="modes"
+    )
+    args = parser.parse_args()
+
+    print(f"{'workers':>8}  {'mode':<16}{'RSS MiB':>10}{'PSS MiB':>10}")
+    for workers in args.workers:
+        for mode in args.modes:
+            result = measure(workers, **MODES[mode])
+            print(
+                f"{workers:>8}  {mode:<16}{result['rss']:>10.1f}{result['pss']:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
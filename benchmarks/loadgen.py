@@ -0,0 +1,294 @@
+"""
+Load generator of the backend.
+
+Drives the application with a number of concurrent clients, each sending a mix of
+`POST /predict` (random ratings) and `GET /data` (first page) requests, either
+in-process through ASGI (the default, with the application's lifespan) or to a
+running server (`--url http://127.0.0.1:8080`). In-process, the predictions are
+saved to the database of `get_database_url` (the SQLite fallback unless
+`POSTGRES_HOST` is set) or to `--database-url`.
+
+Reports the throughput, the latency percentiles and the error rate, overall and
+per endpoint, as JSON with the commit and the settings, so that runs of different
+commits can be compared.
+
+Run from the root folder: `python -m benchmarks.loadgen --concurrency 32 --mix predict=9,data=1`
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+# Requests of the mix, by name
+ENDPOINTS = ("predict", "data")
+
+RATINGS = (
+    "city_services",
+    "housing_costs",
+    "school_quality",
+    "local_policies",
+    "maintenance",
+    "social_events",
+)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """
+    Args:
+        mix (str): Weights of the endpoints, e.g. `predict=9,data=1`.
+
+    Returns:
+        Dict[str, float]: The weight of each endpoint.
+
+    Raises:
+        ValueError: If an endpoint is unknown or no weight is positive.
+
+    >>> parse_mix("predict=9,data=1")
+    {'predict': 9.0, 'data': 1.0}
+    """
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint: {name}")
+        weights[name.strip()] = float(weight or 1)
+    if not any(weight > 0 for weight in weights.values()):
+        raise ValueError(f"No request in the mix: {mix}")
+    return weights
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, rng: random.Random) -> bool:
+    """
+    Send a request of the mix.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        endpoint (str): One of ENDPOINTS.
+        rng (random.Random): Source of the ratings.
+
+    Returns:
+        bool: Whether the request succeeded.
+    """
+    if endpoint == "predict":
+        response = await client.post(
+            "/predict", json={name: rng.randint(1, 5) for name in RATINGS}
+        )
+    else:
+        response = await client.get("/data", params={"limit": 100})
+    return response.status_code < 400
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """
+    Wait for the readiness probe, i.e. for the model to be loaded.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        timeout (float): Maximum wait in seconds.
+
+    Raises:
+        TimeoutError: If the application isn't ready in time.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/health/ready")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    raise TimeoutError("The application is not ready")
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    weights: Dict[str, float],
+    concurrency: int,
+    requests: int,
+    duration: Optional[float],
+    seed: int,
+) -> Tuple[List[Tuple[str, float, bool]], float]:
+    """
+    Send the requests from concurrent clients, each waiting for its response
+    before sending the next request.
+
+    Args:
+        client (httpx.AsyncClient): The client.
+        weights (Dict[str, float]): Weight of each endpoint in the mix.
+        concurrency (int): Number of concurrent clients.
+        requests (int): Number of requests, unless a duration is set.
+        duration (Optional[float]): Send requests for this many seconds instead.
+        seed (int): Seed of the mix and of the ratings.
+
+    Returns:
+        Tuple[List[Tuple[str, float, bool]], float]: The endpoint, latency in seconds
+            and success of each request, and the elapsed time in seconds.
+    """
+    names, cum_weights = list(weights), list(np.cumsum(list(weights.values())))
+    results: List[Tuple[str, float, bool]] = []
+    remaining = requests
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    async def worker(rng: random.Random) -> None:
+        nonlocal remaining
+        while time.perf_counter() < deadline if deadline is not None else remaining > 0:
+            remaining -= 1
+            endpoint = rng.choices(names, cum_weights=cum_weights)[0]
+            sent = time.perf_counter()
+            try:
+                ok = await send(client, endpoint, rng)
+            except httpx.HTTPError:
+                ok = False
+            results.append((endpoint, time.perf_counter() - sent, ok))
+
+    await asyncio.gather(*(worker(random.Random(seed + i)) for i in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+def summarize(results: List[Tuple[str, float, bool]], elapsed: float) -> Dict[str, Any]:
+    """
+    Args:
+        results (List[Tuple[str, float, bool]]): The endpoint, latency in seconds and
+            success of each request.
+        elapsed (float): Duration of the run in seconds.
+
+    Returns:
+        Dict[str, Any]: Number of requests, throughput, error rate and latency
+            percentiles in milliseconds.
+    """
+    latencies = np.array([latency for _, latency, _ in results]) * 1000
+    errors = sum(not ok for _, _, ok in results)
+    summary: Dict[str, Any] = {
+        "requests": len(results),
+        "errors": errors,
+        "error_rate": errors / len(results) if results else 0.0,
+        "rps": len(results) / elapsed if elapsed else 0.0,
+    }
+    if results:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update(
+            p50_ms=p50, p95_ms=p95, p99_ms=p99, max_ms=float(latencies.max())
+        )
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: The commit of the working tree, or None outside a repository.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the load against the application in-process or against the server.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        Dict[str, Any]: The report.
+    """
+    weights = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with AsyncExitStack() as stack:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, limits=limits)
+            database = None
+        else:
+            from src.app import main
+
+            if args.database_url:
+                main.DATABASE_URL = args.database_url
+            database = main.DATABASE_URL.split("://")[0]
+            await stack.enter_async_context(main.app.router.lifespan_context(main.app))
+            client = httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=main.app),
+                base_url="http://loadgen",
+                limits=limits,
+            )
+        await stack.enter_async_context(client)
+        await wait_until_ready(client, args.ready_timeout)
+
+        if args.warmup:
+            await run_load(client, weights, args.concurrency, args.warmup, None, 0)
+        results, elapsed = await run_load(
+            client,
+            weights,
+            args.concurrency,
+            args.requests,
+            args.duration,
+            args.seed,
+        )
+
+    return {
+        "commit": git_commit(),
+        "target": args.url or "asgi",
+        "database": database,
+        "concurrency": args.concurrency,
+        "mix": weights,
+        "elapsed_seconds": elapsed,
+        "overall": summarize(results, elapsed),
+        "endpoints": {
+            name: summarize(
+                [result for result in results if result[0] == name], elapsed
+            )
+            for name in weights
+        },
+    }
+
+
+def main() -> None:
+    """
+    Run the load and print the report as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--url", help="base URL of a running server, in-process ASGI if unset"
+    )
+    parser.add_argument("--database-url", help="database of the in-process application")
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="concurrent clients"
+    )
+    parser.add_argument(
+        "--mix", default="predict=9,data=1", help="weights of the endpoints"
+    )
+    parser.add_argument("--requests", type=int, default=2000, help="number of requests")
+    parser.add_argument(
+        "--duration", type=float, help="seconds of load, instead of --requests"
+    )
+    parser.add_argument("--warmup", type=int, default=200, help="warm-up requests")
+    parser.add_argument(
+        "--ready-timeout", type=float, default=60, help="seconds to wait for readiness"
+    )
+    parser.add_argument("--seed", type=int, default=42, help="seed of the requests")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = json.dumps(asyncio.run(main_async(args)), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Directory of the files written by the tests: the default model and its artifacts,
+# the model registry, and the database of the application
+_tmp_dir = Path(tempfile.mkdtemp(prefix="happymeter-tests-"))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    """
+    Point the application at a temporary directory before the tests import it, so
+    that they don't write the model artifacts, the database and the log file of
+    the repository.
+
+    Args:
+        config (pytest.Config): The pytest configuration.
+    """
+    model_dir = _tmp_dir / "model"
+    model_dir.mkdir()
+    shutil.copy2(
+        Path(__file__).resolve().parent / "src" / "model" / "happy_model.pkl",
+        model_dir,
+    )
+    os.environ["MODEL_DIR"] = str(model_dir)
+    os.environ["MODEL_REGISTRY_DIR"] = str(model_dir / "registry")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir / 'predictions.db'}"
+    os.environ["LOG_FILE"] = ""
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    """
+    Remove the temporary directory of the tests.
+
+    Args:
+        config (pytest.Config): The pytest configuration.
+    """
+    shutil.rmtree(_tmp_dir, ignore_errors=True)
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.app.logger import logger
+
+# Upper bounds of the buckets of the batch size distribution
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# A request waiting in a batch: its ratings, the future of its result and when it arrived
+Pending = Tuple[Tuple[int, ...], "asyncio.Future[Tuple[int, float]]", float]
+
+
+class MicroBatcher:
+    """
+    Group concurrent single predictions into batches: a batch is dispatched when it
+    holds `max_size` requests or when its first request has waited `max_wait_ms`,
+    whichever comes first. Each batch is computed with a single vectorized call and
+    the results are handed back to the waiting requests.
+
+    Attributes:
+        predict (Callable[[np.ndarray], Awaitable[Tuple[np.ndarray, np.ndarray]]]):
+            Computes the predictions and probabilities of a matrix of ratings.
+        max_wait_ms (float): Maximum time a request waits for its batch to fill, in milliseconds.
+        max_size (int): Maximum number of requests of a batch.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[np.ndarray], Awaitable[Tuple[np.ndarray, np.ndarray]]],
+        max_wait_ms: float = 2.0,
+        max_size: int = 64,
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            predict (Callable[[np.ndarray], Awaitable[Tuple[np.ndarray, np.ndarray]]]):
+                Computes the predictions and probabilities of a matrix of ratings.
+            max_wait_ms (float): Maximum time a request waits for its batch to fill, in milliseconds.
+            max_size (int): Maximum number of requests of a batch.
+        """
+        if max_size < 1:
+            raise ValueError(f"Batch size must be positive: {max_size}")
+        self.predict = predict
+        self.max_wait_ms = max_wait_ms
+        self.max_size = max_size
+
+        self._pending: List[Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Counters
+        self.requests = 0
+        self.batches = 0
+        self.failed = 0
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+
+    async def submit(self, ratings: Sequence[int]) -> Tuple[int, float]:
+        """
+        Add a prediction to the next batch and wait for its result.
+
+        Args:
+            ratings (Sequence[int]): The six ratings.
+
+        Returns:
+            Tuple[int, float]: The prediction and its probability.
+        """
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Tuple[int, float]]" = loop.create_future()
+        self._pending.append((tuple(ratings), future, time.perf_counter()))
+        self.requests += 1
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        """
+        Start computing the pending batch.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Pending]) -> None:
+        """
+        Compute a batch and hand the results back to its requests.
+
+        Args:
+            batch (List[Pending]): The requests of the batch.
+        """
+        now = time.perf_counter()
+        for _, _, arrived in batch:
+            self.queue_delay_total += now - arrived
+            self.queue_delay_max = max(self.queue_delay_max, now - arrived)
+        self.batches += 1
+        self.batch_sizes[np.searchsorted(BATCH_SIZE_BUCKETS, len(batch))] += 1
+
+        try:
+            X = np.array([ratings for ratings, _, _ in batch], dtype=np.int64)
+            predictions, probabilities = await self.predict(X)
+        except Exception as e:
+            logger.error(f"Error predicting a batch of {len(batch)} requests: {e}")
+            self.failed += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for i, (_, future, _) in enumerate(batch):
+            # The request may have been cancelled while waiting
+            if not future.done():
+                future.set_result((int(predictions[i]), float(probabilities[i])))
+
+    async def stop(self) -> None:
+        """
+        Dispatch the pending requests and wait for all the batches to complete.
+        """
+        self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the counters of the batcher.
+
+        Returns:
+            Dict[str, Any]: Number of requests and batches, the distribution of the
+                batch sizes and the time spent by the requests waiting for their batch.
+        """
+        labels = [str(bound) for bound in BATCH_SIZE_BUCKETS] + ["+Inf"]
+        dispatched = self.requests - len(self._pending)
+        return {
+            "max_wait_ms": self.max_wait_ms,
+            "max_size": self.max_size,
+            "requests": self.requests,
+            "batches": self.batches,
+            "failed": self.failed,
+            "pending": len(self._pending),
+            "batch_size_mean": dispatched / self.batches if self.batches else 0.0,
+            "batch_sizes": dict(zip(labels, self.batch_sizes)),
+            "queue_delay_total": self.queue_delay_total,
+            "queue_delay_max": self.queue_delay_max,
+            "queue_delay_mean": (
+                self.queue_delay_total / dispatched if dispatched else 0.0
+            ),
+        }
@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple
+
+# A cached prediction and its probability
+Prediction = Tuple[int, float]
+# The key of a cached prediction: the model version and the ratings
+Key = Tuple[Hashable, Tuple[int, ...]]
+
+
+class PredictionCache:
+    """
+    Cache of predictions keyed by the model version and the ratings, with LRU eviction
+    and an optional TTL.
+
+    Entries of a version are only returned for that version: while the model is
+    swapped, requests served by the old and the new version each keep their entries,
+    and the entries of a version which is no longer used are evicted as the least
+    recently used. All methods are thread-safe, so the cache can be shared by
+    concurrent requests and by inference threads.
+
+    Attributes:
+        max_size (int): Maximum number of entries, the least recently used entry is evicted first.
+        ttl (Optional[float]): Lifetime of an entry in seconds, or None if entries don't expire.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None) -> None:
+        """
+        Class constructor.
+
+        Args:
+            max_size (int): Maximum number of entries.
+            ttl (Optional[float]): Lifetime of an entry in seconds, or None if entries don't expire.
+        """
+        if max_size < 1:
+            raise ValueError(f"Cache size must be positive: {max_size}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Key, Tuple[Prediction, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, ratings: Sequence[int], version: Hashable) -> Optional[Prediction]:
+        """
+        Look up the prediction of a combination of ratings.
+
+        Args:
+            ratings (Sequence[int]): The six ratings.
+            version (Hashable): Version of the model in use.
+
+        Returns:
+            Optional[Prediction]: The cached prediction and probability, or None.
+        """
+        key: Key = (version, tuple(ratings))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() >= entry[1]:
+                    del self._entries[key]
+                    self.expirations += 1
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(
+        self, ratings: Sequence[int], version: Hashable, prediction: Prediction
+    ) -> None:
+        """
+        Store the prediction of a combination of ratings.
+
+        Args:
+            ratings (Sequence[int]): The six ratings.
+            version (Hashable): Version of the model which made the prediction.
+            prediction (Prediction): The prediction and its probability.
+        """
+        key: Key = (version, tuple(ratings))
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (prediction, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the counters of the cache.
+
+        Returns:
+            Dict[str, Any]: Size, hits, misses, hit rate, evictions and expirations.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
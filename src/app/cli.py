@@ -0,0 +1,35 @@
+import argparse
+import sys
+from typing import List, Optional
+
+# Commands of the command line interface, and the modules which implement them
+COMMANDS = {
+    "train": ("src.app.search", "search the hyperparameters of the model"),
+    "retrain": ("src.app.retrain", "retrain the model on the stored predictions"),
+    "registry": ("src.app.registry", "manage the versions of the model"),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line interface of happymeter, `python -m src.app.cli <command>`, which
+    hands the arguments of a command over to the module implementing it.
+
+    Args:
+        argv (Optional[List[str]]): The arguments, `sys.argv` if None.
+    """
+    import importlib
+
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="python -m src.app.cli")
+    parser.add_argument(
+        "command",
+        choices=list(COMMANDS),
+        help=", ".join(f"{name}: {help}" for name, (_, help) in COMMANDS.items()),
+    )
+    args = parser.parse_args(argv[:1])
+    importlib.import_module(COMMANDS[args.command][0]).main(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
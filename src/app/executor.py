@@ -0,0 +1,294 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.app.logger import logger
+from src.app.model import HappyModel
+
+# Where the predictions are computed: on the event loop, in a pool of threads,
+# or in a pool of processes each holding its own copy of the model
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+# Model of a process of the pool, loaded by `_init_worker`
+_worker_model: Optional[HappyModel] = None
+
+
+def _init_worker(
+    data_fname: str,
+    model_fname: str,
+    mmap: bool,
+    model_dir: Optional[Path] = None,
+    version: Optional[str] = None,
+    backend: str = "lookup",
+    read_only: bool = False,
+) -> None:
+    """
+    Load the model once in a process of the pool.
+
+    Args:
+        data_fname (str): The filename of the dataset.
+        model_fname (str): The filename of the model.
+        mmap (bool): Whether to memory-map the model artifacts.
+        model_dir (Optional[Path]): The directory of the model, MODEL_DIR if None.
+        version (Optional[str]): Identifier of the model, a digest of the model if None.
+        backend (str): The model backend.
+        read_only (bool): Whether the directory of the model must not be written.
+    """
+    global _worker_model
+    _worker_model = HappyModel(
+        data_fname=data_fname,
+        model_fname=model_fname,
+        mmap=mmap,
+        model_dir=model_dir,
+        version=version,
+        backend=backend,
+        read_only=read_only,
+    )
+
+
+def _get_worker_model() -> HappyModel:
+    """
+    Returns:
+        HappyModel: The model of a process of the pool.
+
+    Raises:
+        RuntimeError: If the process was not initialized by `_init_worker`.
+    """
+    if _worker_model is None:
+        raise RuntimeError("The model of the inference worker is not loaded")
+    return _worker_model
+
+
+def _worker_version() -> str:
+    """
+    Returns:
+        str: Version of the model of a process of the pool.
+    """
+    return _get_worker_model().version_
+
+
+def _timed_predict(
+    model: HappyModel, X: np.ndarray
+) -> Tuple[Tuple[np.ndarray, np.ndarray], float]:
+    """
+    Make predictions and measure how long it took, where they are computed.
+
+    Args:
+        model (HappyModel): The model.
+        X (np.ndarray): Integer array of shape (n_samples, N_FEATURES) with the ratings.
+
+    Returns:
+        Tuple[Tuple[np.ndarray, np.ndarray], float]: The predictions and probabilities,
+            and the execution time in seconds.
+    """
+    start = time.perf_counter()
+    result = model.predict(X)
+    return result, time.perf_counter() - start
+
+
+def _worker_predict(X: np.ndarray) -> Tuple[Tuple[np.ndarray, np.ndarray], float]:
+    """
+    Make predictions with the model of a process of the pool.
+
+    Args:
+        X (np.ndarray): Integer array of shape (n_samples, N_FEATURES) with the ratings.
+
+    Returns:
+        Tuple[Tuple[np.ndarray, np.ndarray], float]: The predictions and probabilities,
+            and the execution time in seconds.
+    """
+    return _timed_predict(_get_worker_model(), X)
+
+
+class InferenceExecutor:
+    """
+    Run the inference of HappyModel outside of the event loop, so that concurrent
+    requests are not serialized behind CPU-bound predictions.
+
+    Attributes:
+        mode (str): One of EXECUTOR_MODES.
+        workers (int): Number of threads or processes of the pool.
+        data_fname (str): The filename of the dataset, loaded by the processes of the pool.
+        model_fname (str): The filename of the model, loaded by the processes of the pool.
+        mmap (bool): Whether the processes of the pool memory-map the model artifacts.
+        model_dir (Optional[Path]): The directory of the model loaded by the processes
+            of the pool, MODEL_DIR if None.
+        version (Optional[str]): Identifier of the model loaded by the processes of the pool.
+        backend (str): The model backend of the processes of the pool.
+        read_only (bool): Whether the processes of the pool must not write the
+            directory of the model.
+    """
+
+    def __init__(
+        self,
+        mode: str = "inline",
+        workers: Optional[int] = None,
+        data_fname: str = "happy_data.csv",
+        model_fname: str = "happy_model.pkl",
+        mmap: bool = False,
+        model_dir: Optional[Path] = None,
+        version: Optional[str] = None,
+        backend: str = "lookup",
+        read_only: bool = False,
+    ) -> None:
+        """
+        Class constructor, the pool is created by `start`.
+
+        Args:
+            mode (str): One of EXECUTOR_MODES.
+            workers (Optional[int]): Number of threads or processes, the number of CPUs by default.
+                Always 1 in inline mode.
+            data_fname (str): The filename of the dataset.
+            model_fname (str): The filename of the model.
+            mmap (bool): Whether the processes of the pool memory-map the model artifacts.
+            model_dir (Optional[Path]): The directory of the model, MODEL_DIR if None.
+            version (Optional[str]): Identifier of the model, a digest of the model if None.
+            backend (str): The model backend.
+            read_only (bool): Whether the directory of the model must not be written.
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode: {mode}")
+        self.mode = mode
+        self.workers = 1 if mode == "inline" else workers or os.cpu_count() or 1
+        self.data_fname = data_fname
+        self.model_fname = model_fname
+        self.mmap = mmap
+        self.model_dir = model_dir
+        self.version = version
+        self.backend = backend
+        self.read_only = read_only
+
+        self._pool: Optional[Executor] = None
+
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.max_queue_depth = 0
+        self.execution_time_total = 0.0
+        self.execution_time_max = 0.0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    async def start(self) -> None:
+        """
+        Create the pool. The processes of a process pool are started and load the model
+        right away, so that the first requests don't pay for it.
+        """
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="inference"
+            )
+        elif self.mode == "process":
+            # Forking a process with running threads is unsafe, start fresh interpreters
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(
+                    self.data_fname,
+                    self.model_fname,
+                    self.mmap,
+                    self.model_dir,
+                    self.version,
+                    self.backend,
+                    self.read_only,
+                ),
+            )
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(self._pool, _worker_version)
+                    for _ in range(self.workers)
+                )
+            )
+        logger.info(f"Inference executor started in {self.mode} mode!")
+
+    def shutdown(self) -> None:
+        """
+        Wait for the running predictions and stop the pool. Predictions submitted
+        meanwhile are computed inline.
+        """
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    async def predict(
+        self, model: HappyModel, X: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for a matrix of ratings with the configured executor.
+
+        Args:
+            model (HappyModel): The model, used by the inline and thread modes.
+            X (np.ndarray): Integer array of shape (n_samples, N_FEATURES) with the ratings.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The predictions and their associated probabilities.
+        """
+        self.submitted += 1
+        self.in_flight += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.in_flight - self.workers)
+        start = time.perf_counter()
+        try:
+            pool = self._pool
+            if pool is not None:
+                loop = asyncio.get_running_loop()
+                try:
+                    if self.mode == "process":
+                        call = loop.run_in_executor(pool, _worker_predict, X)
+                    else:
+                        call = loop.run_in_executor(pool, _timed_predict, model, X)
+                except RuntimeError:
+                    # The pool was shut down since it was read
+                    pool = None
+            if pool is None:
+                result, execution_time = _timed_predict(model, X)
+            else:
+                result, execution_time = await call
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        wait_time = time.perf_counter() - start - execution_time
+        self.completed += 1
+        self.execution_time_total += execution_time
+        self.execution_time_max = max(self.execution_time_max, execution_time)
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the counters of the executor.
+
+        Returns:
+            Dict[str, Any]: Mode, number of workers, predictions submitted, completed,
+                failed and in flight, queue depth, and execution and wait times in seconds.
+        """
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_queue_depth": self.max_queue_depth,
+            "execution_time_total": self.execution_time_total,
+            "execution_time_max": self.execution_time_max,
+            "execution_time_mean": (
+                self.execution_time_total / self.completed if self.completed else 0.0
+            ),
+            "wait_time_total": self.wait_time_total,
+            "wait_time_max": self.wait_time_max,
+        }
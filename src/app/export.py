@@ -0,0 +1,273 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+from sqlalchemy import select
+
+from src.app.database import RATING_COLUMNS, HappyPrediction, get_async_session
+from src.app.logger import logger
+
+# Columns of an exported prediction, in order
+EXPORT_COLUMNS = (
+    ("id",)
+    + RATING_COLUMNS
+    + (
+        "prediction",
+        "probability",
+        "created_at",
+        "model_version",
+        "label",
+    )
+)
+
+# Media types of the export formats
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+async def stream_rows(
+    DATABASE_URL: str,
+    chunk_size: int = 1000,
+    min_id: Optional[int] = None,
+    max_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> AsyncIterator[Sequence[Sequence[Any]]]:
+    """
+    Read the stored predictions through a server-side cursor, a chunk at a time,
+    so that memory use doesn't depend on the number of rows. Errors are logged and
+    end the iteration, as the rows already yielded may have been sent.
+
+    Args:
+        DATABASE_URL (str): Database URL.
+        chunk_size (int): Number of rows fetched at a time.
+        min_id (Optional[int]): Only export the rows with an id greater or equal to this one.
+        max_id (Optional[int]): Only export the rows with an id lower or equal to this one.
+        start (Optional[datetime]): Only export the rows created at or after this time.
+        end (Optional[datetime]): Only export the rows created before this time.
+
+    Yields:
+        Sequence[Sequence[Any]]: Chunks of rows, with the values of EXPORT_COLUMNS.
+    """
+    try:
+        table = HappyPrediction.__table__
+        query = select(*(table.c[column] for column in EXPORT_COLUMNS)).order_by(
+            table.c.id
+        )
+        if min_id is not None:
+            query = query.where(table.c.id >= min_id)
+        if max_id is not None:
+            query = query.where(table.c.id <= max_id)
+        if start is not None:
+            query = query.where(table.c.created_at >= start)
+        if end is not None:
+            query = query.where(table.c.created_at < end)
+
+        session = await get_async_session(DATABASE_URL)
+        try:
+            result = await session.stream(query.execution_options(yield_per=chunk_size))
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await session.close()
+
+        logger.info("Data exported from the database successfully!")
+    except Exception as e:
+        logger.error(f"Error exporting data from database: {e}")
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Convert a value of a row to a JSON compatible value.
+
+    Args:
+        value (Any): The value.
+
+    Returns:
+        Any: The value, with dates in ISO 8601 format.
+    """
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def csv_chunks(
+    chunks: AsyncIterator[Sequence[Sequence[Any]]],
+) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of rows as CSV, with a header line.
+
+    Args:
+        chunks (AsyncIterator[Sequence[Sequence[Any]]]): Chunks of rows.
+
+    Yields:
+        bytes: The CSV encoded chunks.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    async for rows in chunks:
+        writer.writerows([_to_json(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode()
+
+
+async def ndjson_chunks(
+    chunks: AsyncIterator[Sequence[Sequence[Any]]],
+) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of rows as NDJSON, one object per row.
+
+    Args:
+        chunks (AsyncIterator[Sequence[Sequence[Any]]]): Chunks of rows.
+
+    Yields:
+        bytes: The NDJSON encoded chunks.
+    """
+    async for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(EXPORT_COLUMNS, map(_to_json, row)))) + "\n"
+            for row in rows
+        ).encode()
+
+
+class _ChunkSink:
+    """
+    Write-only file which keeps what was written until it is collected,
+    while reporting the total number of bytes written as its position.
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor.
+        """
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def collect(self) -> bytes:
+        """
+        Returns:
+            bytes: What was written since the last call.
+        """
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def parquet_chunks(
+    chunks: AsyncIterator[Sequence[Sequence[Any]]],
+) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of rows as a Parquet file, one row group per chunk.
+    Requires pyarrow.
+
+    Args:
+        chunks (AsyncIterator[Sequence[Sequence[Any]]]): Chunks of rows.
+
+    Yields:
+        bytes: The Parquet file, a row group at a time.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [("id", pa.int64())]
+        + [(column, pa.int64()) for column in RATING_COLUMNS]
+        + [
+            ("prediction", pa.int64()),
+            ("probability", pa.float64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+            ("model_version", pa.string()),
+            ("label", pa.int64()),
+        ]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        async for rows in chunks:
+            columns = list(zip(*rows))
+            writer.write_table(
+                pa.Table.from_arrays(
+                    [
+                        pa.array(values, type=field.type)
+                        for values, field in zip(columns, schema)
+                    ],
+                    schema=schema,
+                )
+            )
+            yield sink.collect()
+    finally:
+        writer.close()
+    yield sink.collect()
+
+
+def parquet_available() -> bool:
+    """
+    Check whether the Parquet format can be exported, it requires the optional pyarrow.
+
+    Returns:
+        bool: True if pyarrow is installed.
+    """
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_chunks(
+    chunks: AsyncIterator[Sequence[Sequence[Any]]], format: str
+) -> AsyncIterator[bytes]:
+    """
+    Encode chunks of rows in an export format.
+
+    Args:
+        chunks (AsyncIterator[Sequence[Sequence[Any]]]): Chunks of rows.
+        format (str): One of the keys of EXPORT_MEDIA_TYPES.
+
+    Returns:
+        AsyncIterator[bytes]: The encoded export.
+    """
+    encoders = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+    return encoders[format](chunks)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Compress a stream of bytes on the fly, in the gzip format.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The stream to compress.
+
+    Yields:
+        bytes: The compressed stream.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
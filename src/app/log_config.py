@@ -1,51 +1,93 @@
-LOGGING_CONFIG = {
-    "version": 1,
-    "disable_existing_loggers": True,
-    "formatters": {
-        "standard": {"format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s"},
-        "custom_formatter": {
-            "format": "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
+import os
+from typing import Any, Dict
+
+from src.app import logger as app_logging
+
+# Level of the uvicorn loggers
+UVICORN_LOG_LEVEL = os.getenv("UVICORN_LOG_LEVEL", "TRACE").upper()
+# Fraction of the access log records which are logged
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+# Message of the access log records of uvicorn, the ones which are sampled
+ACCESS_LOG_MESSAGES = ('%s - "%s %s HTTP/%s" %d',)
+
+
+def get_logging_config() -> Dict[str, Any]:
+    """
+    Build the logging configuration of uvicorn. In queue mode (`LOG_QUEUE`), the
+    uvicorn loggers hand their records over to the background listener of the
+    application logger, which writes them in the format of `LOG_FORMAT`.
+
+    Returns:
+        Dict[str, Any]: The configuration, for `logging.config.dictConfig`.
+    """
+    if app_logging.LOG_QUEUE:
+        handlers: Dict[str, Any] = {
+            "queue_handler": {"()": "src.app.logger.create_queue_handler"},
+        }
+        root_handlers = child_handlers = ["queue_handler"]
+        app_logging.start_listener()
+    else:
+        handlers = {
+            "default": {
+                "formatter": "standard",
+                "class": "logging.StreamHandler",
+                "stream": "ext://sys.stdout",  # Default is stderr
+            },
+            "stream_handler": {
+                "formatter": "custom_formatter",
+                "class": "logging.StreamHandler",
+                "stream": "ext://sys.stdout",  # Default is stderr
+            },
+            "file_handler": {
+                "formatter": "custom_formatter",
+                "class": "logging.handlers.RotatingFileHandler",
+                "filename": "app.log",
+                "maxBytes": 1024 * 1024 * 1,  # = 1MB
+                "backupCount": 3,
+            },
+        }
+        child_handlers = ["stream_handler", "file_handler"]
+        root_handlers = ["default", "file_handler"]
+
+    return {
+        "version": 1,
+        "disable_existing_loggers": True,
+        "formatters": {
+            "standard": {"format": "%(asctime)s [%(levelname)s] %(name)s: %(message)s"},
+            "custom_formatter": {"format": app_logging.TEXT_FORMAT},
         },
-    },
-    "handlers": {
-        "default": {
-            "formatter": "standard",
-            "class": "logging.StreamHandler",
-            "stream": "ext://sys.stdout",  # Default is stderr
+        "filters": {
+            "access_sampling": {
+                "()": "src.app.logger.SamplingFilter",
+                "rate": ACCESS_LOG_SAMPLE_RATE,
+                "messages": ACCESS_LOG_MESSAGES,
+            },
         },
-        "stream_handler": {
-            "formatter": "custom_formatter",
-            "class": "logging.StreamHandler",
-            "stream": "ext://sys.stdout",  # Default is stderr
+        "handlers": handlers,
+        "loggers": {
+            "uvicorn": {
+                "handlers": root_handlers,
+                "level": UVICORN_LOG_LEVEL,
+                "propagate": False,
+            },
+            "uvicorn.access": {
+                "handlers": child_handlers,
+                "level": UVICORN_LOG_LEVEL,
+                "filters": ["access_sampling"],
+                "propagate": False,
+            },
+            "uvicorn.error": {
+                "handlers": child_handlers,
+                "level": UVICORN_LOG_LEVEL,
+                "propagate": False,
+            },
+            "uvicorn.asgi": {
+                "handlers": child_handlers,
+                "level": UVICORN_LOG_LEVEL,
+                "propagate": False,
+            },
         },
-        "file_handler": {
-            "formatter": "custom_formatter",
-            "class": "logging.handlers.RotatingFileHandler",
-            "filename": "app.log",
-            "maxBytes": 1024 * 1024 * 1,  # = 1MB
-            "backupCount": 3,
-        },
-    },
-    "loggers": {
-        "uvicorn": {
-            "handlers": ["default", "file_handler"],
-            "level": "TRACE",
-            "propagate": False,
-        },
-        "uvicorn.access": {
-            "handlers": ["stream_handler", "file_handler"],
-            "level": "TRACE",
-            "propagate": False,
-        },
-        "uvicorn.error": {
-            "handlers": ["stream_handler", "file_handler"],
-            "level": "TRACE",
-            "propagate": False,
-        },
-        "uvicorn.asgi": {
-            "handlers": ["stream_handler", "file_handler"],
-            "level": "TRACE",
-            "propagate": False,
-        },
-    },
-}
+    }
+
+
+LOGGING_CONFIG = get_logging_config()
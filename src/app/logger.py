@@ -1,16 +1,207 @@
+import atexit
+import itertools
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
 
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
+TEXT_FORMAT = "%(asctime)s [%(processName)s: %(process)d] [%(threadName)s: %(thread)d] [%(levelname)s] %(name)s: %(message)s"
+
+# Level of the application logger
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+# Format of the records, "text" or "json" (one JSON object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Log file, rotated when it reaches LOG_FILE_MAX_BYTES, disabled if empty
+LOG_FILE = os.getenv("LOG_FILE", "info.log")
+LOG_FILE_MAX_BYTES = int(os.getenv("LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.getenv("LOG_FILE_BACKUP_COUNT", "3"))
+# Write the records from a background thread instead of the logging thread
+LOG_QUEUE = os.getenv("LOG_QUEUE", "false").lower() in ("1", "true", "yes")
+# Fraction of the high-volume messages (SAMPLED_MESSAGES) which are logged
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+
+# Messages logged for every request, sampled by LOG_SAMPLE_RATE
+SAMPLED_MESSAGES = (
+    "Request handled successfully!",
+    "Batch handled successfully!",
+    "Data saved to the database successfully!",
+    "Data read from the database successfully!",
+    "Measurement rows rendered successfully!",
 )
 
-stream_handler = logging.StreamHandler(sys.stdout)
-stream_handler.setFormatter(formatter)
-file_handler = logging.FileHandler("info.log")
-file_handler.setFormatter(formatter)
 
-logger.addHandler(stream_handler)
-logger.addHandler(file_handler)
+class JsonFormatter(logging.Formatter):
+    """
+    Format a record as a single-line JSON object, for log collectors.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            str: The JSON object.
+        """
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one out of every `1 / rate` records of the sampled messages, so that
+    messages logged for every request don't dominate the cost of logging.
+    Warnings and errors are always kept.
+
+    Attributes:
+        rate (float): Fraction of the records kept, between 0 and 1.
+        messages (Optional[Sequence[str]]): Prefixes of the sampled messages,
+            all the messages if None.
+    """
+
+    def __init__(self, rate: float, messages: Optional[Sequence[str]] = None) -> None:
+        """
+        Class constructor.
+
+        Args:
+            rate (float): Fraction of the records kept, between 0 and 1.
+            messages (Optional[Sequence[str]]): Prefixes of the sampled messages,
+                all the messages if None.
+        """
+        super().__init__()
+        self.rate = rate
+        self.messages = tuple(messages) if messages is not None else None
+        self._period = round(1 / rate) if rate > 0 else 0
+        # Incremented without a lock, counting is atomic in CPython
+        self._counters: Dict[str, "itertools.count[int]"] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            bool: Whether the record is logged.
+        """
+        if self.rate >= 1 or record.levelno >= logging.WARNING:
+            return True
+        message = str(record.msg)
+        key: Optional[str] = message
+        if self.messages is not None:
+            key = next(
+                (prefix for prefix in self.messages if message.startswith(prefix)),
+                None,
+            )
+        if key is None:
+            return True
+        if not self._period:
+            return False
+        counter = self._counters.setdefault(key, itertools.count())
+        return next(counter) % self._period == 0
+
+
+def create_formatter() -> logging.Formatter:
+    """
+    Returns:
+        logging.Formatter: The formatter of LOG_FORMAT.
+    """
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter(TEXT_FORMAT)
+
+
+def create_handlers() -> List[logging.Handler]:
+    """
+    Returns:
+        List[logging.Handler]: The handlers writing the records, to stdout and
+            to the rotating log file.
+    """
+    formatter = create_formatter()
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(
+            logging.handlers.RotatingFileHandler(
+                LOG_FILE,
+                maxBytes=LOG_FILE_MAX_BYTES,
+                backupCount=LOG_FILE_BACKUP_COUNT,
+            )
+        )
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+# Records waiting to be written by the listener, in queue mode
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+listener: Optional[logging.handlers.QueueListener] = None
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler which hands the records over unformatted. The listener lives in
+    the same process, so the message and the traceback are formatted by it, off
+    the logging thread, instead of by `QueueHandler.prepare`.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            logging.LogRecord: The same record.
+        """
+        return record
+
+
+def create_queue_handler() -> logging.Handler:
+    """
+    Create a handler which hands the records over to the background listener,
+    used by the application logger and by the uvicorn loggers in queue mode.
+
+    Returns:
+        logging.Handler: The handler.
+    """
+    return DeferredQueueHandler(log_queue)
+
+
+def start_listener() -> logging.handlers.QueueListener:
+    """
+    Start the background thread writing the queued records, once per process.
+    The records still queued are written when the process exits.
+
+    Returns:
+        logging.handlers.QueueListener: The listener.
+    """
+    global listener
+    if listener is None:
+        listener = logging.handlers.QueueListener(
+            log_queue, *create_handlers(), respect_handler_level=True
+        )
+        listener.start()
+        atexit.register(listener.stop)
+    return listener
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(LOG_LEVEL)
+logger.addFilter(SamplingFilter(LOG_SAMPLE_RATE, SAMPLED_MESSAGES))
+if LOG_QUEUE:
+    start_listener()
+    logger.addHandler(create_queue_handler())
+else:
+    for handler in create_handlers():
+        logger.addHandler(handler)
@@ -1,27 +1,333 @@
+import asyncio
+import json
 import os
+import secrets
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional
 
+import numpy as np
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Query, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from pydantic import ValidationError
 
 from src.app import log_config
-from src.app.database import HappyPrediction, init_db, read_from_db, save_to_db
+from src.app.batcher import MicroBatcher
+from src.app.cache import PredictionCache
+from src.app.database import (
+    dispose_async_engines,
+    get_async_database_url,
+    get_database_url,
+    get_pool_stats,
+    init_db_async,
+    read_page_from_db_async,
+    read_stats_async,
+    rebuild_stats_async,
+    save_label_async,
+    save_many_to_db_async,
+    save_to_db_async,
+    stream_from_db_async,
+)
+from src.app.executor import InferenceExecutor
+from src.app.export import (
+    EXPORT_MEDIA_TYPES,
+    export_chunks,
+    gzip_chunks,
+    parquet_available,
+    stream_rows,
+)
 from src.app.logger import logger
-from src.app.model import HappyModel, SurveyMeasurement
+from src.app.metrics import (
+    CONTENT_TYPE,
+    DB_POOL_CONNECTIONS,
+    EVENT_LOOP_LAG,
+    EVENT_LOOP_LAG_SECONDS,
+    INFERENCE_SECONDS,
+    RENDER_SECONDS,
+    SAVE_TO_DB_SECONDS,
+    EventLoopLagMonitor,
+    MetricsMiddleware,
+)
+from src.app.metrics import registry as metrics_registry
+from src.app.model import HappinessLabel, HappyModel, SurveyMeasurement
+from src.app.registry import default_registry
+from src.app.retrain import retrain_in_process
+from src.app.writer import PredictionWriter
+
+
+async def prepare_model(
+    version: Optional[str] = None, durations: Optional[Dict[str, float]] = None
+) -> HappyModel:
+    """
+    Load a model in a worker thread, so that the server keeps answering meanwhile,
+    then start its inference executor and its micro-batcher, if enabled, and warm
+    them up. The model is not served until it is swapped in.
+
+    Args:
+        version (Optional[str]): Version of the model registry, the default model if None.
+        durations (Optional[Dict[str, float]]): Filled with the durations of the steps.
+
+    Returns:
+        HappyModel: The model, ready to serve.
+    """
+    durations = durations if durations is not None else {}
+    model_dir = registry.model_dir(version) if version is not None else None
+    backend = (
+        registry.backend(version, MODEL_BACKEND)
+        if version is not None
+        else MODEL_BACKEND
+    )
+    started = time.perf_counter()
+    loaded = await asyncio.to_thread(
+        HappyModel,
+        model_fname=registry.model_fname if version is not None else None,
+        mmap=MODEL_MMAP,
+        model_dir=model_dir,
+        version=version,
+        backend=backend,
+        read_only=version is not None,
+    )
+    durations["load_seconds"] = time.perf_counter() - started
+
+    try:
+        loaded.executor_ = InferenceExecutor(
+            mode=INFERENCE_EXECUTOR,
+            workers=INFERENCE_WORKERS,
+            data_fname=loaded.df_fname_,
+            model_fname=loaded.model_fname_,
+            mmap=MODEL_MMAP,
+            model_dir=model_dir,
+            version=version,
+            backend=backend,
+            read_only=version is not None,
+        )
+        await loaded.executor_.start()
+        if MICROBATCH:
+            loaded.batcher_ = MicroBatcher(
+                loaded.predict_happiness_batch,
+                max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+                max_size=MICROBATCH_MAX_SIZE,
+            )
+
+        warm_up_started = time.perf_counter()
+        await warm_up(loaded)
+        durations["warm_up_seconds"] = time.perf_counter() - warm_up_started
+    except BaseException:
+        await retire_model(loaded)
+        raise
+    return loaded
+
+
+async def retire_model(retired: HappyModel) -> None:
+    """
+    Complete the predictions of a model which is no longer served and stop its
+    micro-batcher and its executor. Requests still holding the model are computed inline.
+
+    Args:
+        retired (HappyModel): The model.
+    """
+    if retired.batcher_ is not None:
+        await retired.batcher_.stop()
+    if retired.executor_ is not None:
+        await asyncio.to_thread(retired.executor_.shutdown)
+
+
+def get_model() -> HappyModel:
+    """
+    Returns:
+        HappyModel: The served model. A request keeps the model it got even if
+            another one is swapped in meanwhile.
+
+    Raises:
+        HTTPException: 503 if no model is loaded yet.
+    """
+    if model is None:
+        raise HTTPException(status_code=503, detail="ERR_MODEL_NOT_READY")
+    return model
+
+
+async def swap_model(loaded: HappyModel) -> None:
+    """
+    Serve a prepared model instead of the current one, then retire the current one.
+    The globals are reassigned without yielding to the event loop, so that every
+    request sees either the old model or the new one.
+
+    Args:
+        loaded (HappyModel): The model, see `prepare_model`.
+    """
+    global MODEL_READY, batcher, executor, model
+    retired = model
+    model, executor, batcher = loaded, loaded.executor_, loaded.batcher_
+    MODEL_READY = True
+    if retired is not None:
+        await retire_model(retired)
+
+
+async def activate_version(version: str) -> Dict[str, float]:
+    """
+    Load a version of the model registry, make it the active one and serve it.
+
+    Args:
+        version (str): A published version.
+
+    Returns:
+        Dict[str, float]: The durations of the steps in seconds.
+    """
+    async with model_lock:
+        durations: Dict[str, float] = {}
+        started = time.perf_counter()
+        loaded = await prepare_model(version, durations)
+        try:
+            registry.activate(version)
+        except BaseException:
+            await retire_model(loaded)
+            raise
+        await swap_model(loaded)
+        durations["swap_seconds"] = time.perf_counter() - started
+    logger.info(f"Model {version} served!")
+    return durations
+
+
+async def retrain_periodically() -> None:
+    """
+    Retrain the model every `RETRAIN_INTERVAL` seconds in a separate process, and
+    serve the new version if it was published and `RETRAIN_ACTIVATE` is set.
+    The result of the last run is kept in `retrain_status`.
+    """
+    while True:
+        await asyncio.sleep(RETRAIN_INTERVAL)
+        if not (MODEL_READY and DB_INITIALIZED):
+            continue
+        try:
+            current = get_model()
+            result = await retrain_in_process(
+                database_url=DATABASE_URL,
+                registry_root=registry.root,
+                baseline_path=current.model_dir_ / current.model_fname_,
+                include_predictions=RETRAIN_INCLUDE_PREDICTIONS,
+                min_improvement=RETRAIN_MIN_IMPROVEMENT,
+                backend=MODEL_BACKEND,
+            )
+            retrain_status["runs"] = retrain_status.get("runs", 0) + 1
+            retrain_status["last"] = result
+            if result["published"] is not None and RETRAIN_ACTIVATE:
+                await activate_version(result["published"])
+        except Exception as e:
+            logger.error(f"Error retraining the model: {e}")
+            retrain_status["failures"] = retrain_status.get("failures", 0) + 1
+
+
+async def load_model() -> None:
+    """
+    Load the active version of the model registry, or the default model if no
+    version is active (or the active one cannot be loaded), on startup.
+    The model is ready once this completes, the durations of the steps are kept
+    in `cold_start`.
+    """
+    started = time.perf_counter()
+    version = registry.active_version()
+    try:
+        loaded = await prepare_model(version, cold_start)
+    except Exception as e:
+        if version is None:
+            logger.error(f"Error loading the model: {e}")
+            return
+        logger.error(f"Error loading the model {version}, loading the default one: {e}")
+        try:
+            loaded = await prepare_model(None, cold_start)
+        except Exception as e:
+            logger.error(f"Error loading the model: {e}")
+            return
+
+    async with model_lock:
+        await swap_model(loaded)
+    cold_start["ready_seconds"] = time.perf_counter() - started
+    logger.info(
+        f"Model {get_model().version_} ready in {cold_start['ready_seconds']:.3f}s "
+        f"(load {cold_start['load_seconds']:.3f}s, "
+        f"warm-up {cold_start['warm_up_seconds']:.3f}s)"
+    )
+
+
+async def warm_up(loaded: HappyModel) -> None:
+    """
+    Run a few dummy predictions through every inference path, so that the first
+    requests don't pay for lazy initializations and cold caches.
+
+    Args:
+        loaded (HappyModel): The model to warm up.
+    """
+    for i in range(WARMUP_PREDICTIONS):
+        await loaded.predict_happiness(*(1 + (i + j) % 5 for j in range(6)))
+    await loaded.predict_happiness_batch(np.full((WARMUP_PREDICTIONS, 6), 3))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Start loading the model in the background and create the pooled async database
+    engine (and the write-behind queue, if enabled) on startup, drain the queues,
+    close the connections and stop the executor on shutdown. The event loop lag is
+    measured while the server runs, if the metrics are enabled.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    global DB_INITIALIZED, MODEL_READY, batcher, executor, model, writer
+    if lag_monitor is not None:
+        lag_monitor.start()
+    loading = asyncio.create_task(load_model())
+    retraining = (
+        asyncio.create_task(retrain_periodically()) if RETRAIN_INTERVAL else None
+    )
+    DB_INITIALIZED = await init_db_async(DATABASE_URL)
+    if DB_INITIALIZED and WRITE_BEHIND:
+        writer = PredictionWriter(
+            DATABASE_URL,
+            max_queue_size=WRITE_BEHIND_QUEUE_SIZE,
+            flush_size=WRITE_BEHIND_FLUSH_SIZE,
+            flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+            drop_policy=WRITE_BEHIND_DROP_POLICY,
+        )
+        await writer.start()
+    yield
+    if lag_monitor is not None:
+        await lag_monitor.stop()
+    for task in (loading, retraining):
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    MODEL_READY = False
+    if writer is not None:
+        # Save the predictions still waiting before closing the connections
+        await writer.stop()
+        writer = None
+    await dispose_async_engines()
+    DB_INITIALIZED = False
+    if model is not None:
+        await retire_model(model)
+    model, executor, batcher = None, None, None
+
 
 # Create app and model objects
 app = FastAPI(
     title="Happiness Prediction",
     version="1.0",
     description="Find out how happy you are",
+    lifespan=lifespan,
 )
 
 app.mount(
@@ -30,14 +336,53 @@ app.mount(
     name="static",
 )
 
-model = HappyModel()
+# Loaded on startup, see `load_model`, and replaced by activating another version
+model: Optional[HappyModel] = None
+MODEL_READY = False
 
-# Templates directory setup
+# Versions of the model, the active one is served
+registry = default_registry()
+
+# Serializes the model swaps
+model_lock = asyncio.Lock()
+
+# Scheduled retraining on the stored predictions, see `retrain_periodically`
+RETRAIN_INTERVAL = float(os.getenv("RETRAIN_INTERVAL", "0"))
+RETRAIN_INCLUDE_PREDICTIONS = os.getenv(
+    "RETRAIN_INCLUDE_PREDICTIONS", "false"
+).lower() in ("1", "true", "yes")
+RETRAIN_MIN_IMPROVEMENT = float(os.getenv("RETRAIN_MIN_IMPROVEMENT", "0"))
+RETRAIN_ACTIVATE = os.getenv("RETRAIN_ACTIVATE", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+retrain_status: Dict[str, Any] = {}
+
+# Token of the admin endpoints, which are disabled if unset
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Jinja2 environment setup, templates are compiled once and rendered asynchronously,
+# with the values escaped in HTML
 templates_dir = Path(__file__).resolve().parent.parent.absolute() / "templates"
-templates = Jinja2Templates(directory=templates_dir)
+env = Environment(
+    loader=FileSystemLoader(templates_dir),
+    autoescape=select_autoescape(),
+    enable_async=True,
+)
+index_template = env.get_template("index.html")
+data_template = env.get_template("data.html")
 
-# Jinja2 environment setup
-env = Environment(loader=FileSystemLoader(templates_dir))
+# Prometheus metrics of the requests, their stages and the event loop, see `GET /metrics`
+METRICS = os.getenv("METRICS", "true").lower() in ("1", "true", "yes")
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+lag_monitor: Optional[EventLoopLagMonitor] = (
+    EventLoopLagMonitor(EVENT_LOOP_LAG_INTERVAL, EVENT_LOOP_LAG, EVENT_LOOP_LAG_SECONDS)
+    if METRICS and EVENT_LOOP_LAG_INTERVAL > 0
+    else None
+)
+if METRICS:
+    app.add_middleware(MetricsMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -49,26 +394,65 @@ app.add_middleware(
 )
 
 
-def get_database_url() -> str:
-    """
-    Check what type of database to use. Either local (SQLite) or remote (PostgreSQL).
+DATABASE_URL = get_database_url()
 
-    Returns:
-        str: The database URL to be used by the application.
-    """
-    if "POSTGRES_HOST" in os.environ and os.environ["POSTGRES_HOST"]:
-        return f"postgresql://{os.environ['POSTGRES_USER']}:{os.environ['POSTGRES_PASSWORD']}@{os.environ['POSTGRES_HOST']}/{os.environ['POSTGRES_DB']}"
-    else:
-        DB_PATH = (
-            Path(__file__).resolve().parent.parent.absolute()
-            / "database"
-            / "predictions.db"
-        )
-        return f"sqlite:///{DB_PATH}"
+# Set on startup, see `lifespan`
+DB_INITIALIZED = False
 
+# Opt-in write-behind persistence: predictions are saved in batches by a background task
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv("WRITE_BEHIND_QUEUE_SIZE", "10000"))
+WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5"))
+WRITE_BEHIND_DROP_POLICY = os.getenv("WRITE_BEHIND_DROP_POLICY", "drop_newest")
+writer: Optional[PredictionWriter] = None
 
-DATABASE_URL = get_database_url()
-DB_INITIALIZED = init_db(DATABASE_URL)
+# Estimator of the model and how it is served, a key of `BACKENDS`
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "lookup")
+
+# Memory-map the model artifacts, so that the workers of a node share them
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() in ("1", "true", "yes")
+
+# Number of dummy predictions run before the model is reported ready
+WARMUP_PREDICTIONS = int(os.getenv("WARMUP_PREDICTIONS", "10"))
+
+# Durations of the startup steps, in seconds, see `load_model`
+cold_start: Dict[str, float] = {}
+
+# Where the predictions are computed, see `InferenceExecutor`
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "inline")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or None
+executor: Optional[InferenceExecutor] = None
+
+# Opt-in micro-batching: concurrent predictions are computed together
+MICROBATCH = os.getenv("MICROBATCH", "false").lower() in ("1", "true", "yes")
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+batcher: Optional[MicroBatcher] = None
+
+# Cache of the predictions of /predict, keyed by the ratings and the model version
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "0")) or None
+cache: Optional[PredictionCache] = (
+    PredictionCache(max_size=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+    if PREDICTION_CACHE_SIZE > 0
+    else None
+)
+
+# Default and maximum number of rows of a page of /data
+DATA_PAGE_SIZE = int(os.getenv("DATA_PAGE_SIZE", "100"))
+DATA_MAX_PAGE_SIZE = int(os.getenv("DATA_MAX_PAGE_SIZE", "1000"))
+
+# Maximum number of measurements accepted by a single batch request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+# Maximum size in bytes of the body of a batch request, checked before it is decoded
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", str(512 * MAX_BATCH_SIZE)))
+
+# Number of rows fetched from the database at a time by the exports
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+# Size in characters of the chunks of a streamed HTML page
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", "16384"))
 
 
 # Reuse FastAPI's exception handlers
@@ -98,7 +482,7 @@ logger.info("API is starting up...")
 
 
 @app.get("/")
-async def root(request: Request) -> None:
+async def root(request: Request) -> HTMLResponse:
     """
     Main page for ratings.
 
@@ -106,11 +490,38 @@ async def root(request: Request) -> None:
         request (Request): The incoming request object.
 
     Returns:
-        TemplateResponse: Renders the main index page.
+        HTMLResponse: Renders the main index page.
+    """
+    return HTMLResponse(content=await index_template.render_async(request=request))
+
+
+@app.get("/health/live")
+async def liveness() -> dict:
+    """
+    Liveness probe, answers as soon as the server accepts connections.
+
+    Returns:
+        dict: The status of the server.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness() -> JSONResponse:
+    """
+    Readiness probe, fails with a 503 until the model is loaded and warmed up.
+
+    Returns:
+        JSONResponse: The status of the model and of the database, and the
+            durations of the startup steps in seconds once ready.
     """
-    return templates.TemplateResponse(
-        request=request,
-        name="index.html",
+    if not MODEL_READY:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "loading", "database": DB_INITIALIZED},
+        )
+    return JSONResponse(
+        content={"status": "ready", "database": DB_INITIALIZED, **cold_start}
     )
 
 
@@ -126,9 +537,14 @@ async def predict_happiness(measurement: SurveyMeasurement) -> dict:
     Returns:
         dict: A dictionary containing the prediction and its probability.
     """
+    if not MODEL_READY:
+        raise HTTPException(status_code=503, detail="ERR_MODEL_NOT_READY")
+
+    # The model may be swapped while the request is handled, stick to this one
+    current = get_model()
     try:
         data = measurement.model_dump()
-        prediction, probability = await model.predict_happiness(
+        ratings = (
             data["city_services"],
             data["housing_costs"],
             data["school_quality"],
@@ -136,10 +552,27 @@ async def predict_happiness(measurement: SurveyMeasurement) -> dict:
             data["maintenance"],
             data["social_events"],
         )
+        # Predictions are cached under the version of the model which made them
+        version = current.version_
+        cached = cache.get(ratings, version) if cache is not None else None
+        if cached is not None:
+            prediction, probability = cached
+        else:
+            with INFERENCE_SECONDS.time():
+                prediction, probability = await current.predict_happiness(*ratings)
+            if cache is not None:
+                cache.put(ratings, version, (prediction, probability))
 
-        if DB_INITIALIZED:
+        if writer is not None:
+            # Saved later, in a batch, by the write-behind queue
+            with SAVE_TO_DB_SECONDS.time():
+                await writer.put(data, prediction, probability, version)
+        elif DB_INITIALIZED:
             # Save data to the database
-            save_to_db(DATABASE_URL, data, prediction, probability)
+            with SAVE_TO_DB_SECONDS.time():
+                await save_to_db_async(
+                    DATABASE_URL, data, prediction, probability, version
+                )
 
         logger.info("Request handled successfully!")
         return {"prediction": prediction, "probability": probability}
@@ -149,27 +582,593 @@ async def predict_happiness(measurement: SurveyMeasurement) -> dict:
         raise HTTPException(status_code=500, detail="ERR_UNEXPECTED")
 
 
+async def read_body(request: Request, max_bytes: int) -> bytes:
+    """
+    Read the body of a request, up to a maximum size: a body announced or found
+    to be larger is rejected before the rest of it is read.
+
+    Args:
+        request (Request): The incoming request object.
+        max_bytes (int): The maximum size of the body in bytes.
+
+    Returns:
+        bytes: The raw request body.
+
+    Raises:
+        HTTPException: If the body is larger than `max_bytes`.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(status_code=413, detail="ERR_BATCH_TOO_LARGE")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail="ERR_BATCH_TOO_LARGE")
+    return bytes(body)
+
+
+def parse_batch_body(body: bytes, content_type: str) -> List[Any]:
+    """
+    Decode the body of a batch request, either a JSON array or NDJSON (one object per line).
+    Lines of NDJSON which are not valid JSON are kept as raw strings, so that they
+    are reported as per-item validation errors.
+
+    Args:
+        body (bytes): The raw request body.
+        content_type (str): The content type of the request.
+
+    Returns:
+        List[Any]: The decoded items.
+
+    Raises:
+        HTTPException: If a JSON body is malformed or is not an array.
+    """
+    if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+        items: List[Any] = []
+        for line in body.decode().splitlines():
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except json.JSONDecodeError:
+                    items.append(line)
+        return items
+
+    try:
+        items = json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="ERR_INVALID_JSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="ERR_EXPECTED_ARRAY")
+    return items
+
+
+@app.post(
+    "/predict/batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/SurveyMeasurement"},
+                    }
+                },
+                "application/x-ndjson": {
+                    "schema": {"$ref": "#/components/schemas/SurveyMeasurement"}
+                },
+            },
+        }
+    },
+)
+async def predict_happiness_batch(request: Request) -> dict:
+    """
+    Make predictions for a batch of survey measurements, sent as a JSON array
+    or as NDJSON. Every item is validated on its own: invalid items get their
+    validation errors in the response without failing the rest of the batch.
+
+    Args:
+        request (Request): The incoming request object.
+
+    Returns:
+        dict: A dictionary with one result per item, in the order of the request.
+    """
+    if not MODEL_READY:
+        raise HTTPException(status_code=503, detail="ERR_MODEL_NOT_READY")
+
+    items = parse_batch_body(
+        await read_body(request, MAX_BATCH_BYTES),
+        request.headers.get("content-type", ""),
+    )
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail="ERR_BATCH_TOO_LARGE")
+
+    results: List[dict] = [{} for _ in items]
+    valid_indices: List[int] = []
+    valid_data: List[dict] = []
+    for index, item in enumerate(items):
+        try:
+            valid_data.append(SurveyMeasurement.model_validate(item).model_dump())
+            valid_indices.append(index)
+        except ValidationError as e:
+            results[index] = {"detail": jsonable_encoder(e.errors(include_url=False))}
+
+    current = get_model()
+    try:
+        if valid_data:
+            X = np.array(
+                [
+                    [data[name] for name in SurveyMeasurement.model_fields]
+                    for data in valid_data
+                ]
+            )
+            with INFERENCE_SECONDS.time():
+                predictions, probabilities = await current.predict_happiness_batch(X)
+
+            for index, prediction, probability in zip(
+                valid_indices, predictions, probabilities
+            ):
+                results[index] = {
+                    "prediction": int(prediction),
+                    "probability": float(probability),
+                }
+
+            with SAVE_TO_DB_SECONDS.time():
+                if writer is not None:
+                    for data, prediction, probability in zip(
+                        valid_data, predictions, probabilities
+                    ):
+                        await writer.put(
+                            data, prediction, probability, current.version_
+                        )
+                elif DB_INITIALIZED:
+                    # Save all rows to the database at once
+                    await save_many_to_db_async(
+                        DATABASE_URL,
+                        valid_data,
+                        predictions,
+                        probabilities,
+                        [current.version_] * len(valid_data),
+                    )
+
+        logger.info(
+            f"Batch handled successfully! ({len(valid_data)}/{len(items)} valid)"
+        )
+        return {"results": results}
+    except Exception as e:
+        # Unexpected error handling
+        logger.error(f"Error handling batch request: {e}")
+        raise HTTPException(status_code=500, detail="ERR_UNEXPECTED")
+
+
+async def buffer_chunks(chunks: AsyncIterator[str], size: int) -> AsyncIterator[bytes]:
+    """
+    Group the many small pieces of a rendered template into chunks of about `size`
+    characters, so that a streamed page isn't sent a few bytes at a time.
+
+    Args:
+        chunks (AsyncIterator[str]): The pieces of the page.
+        size (int): Minimum number of characters of a chunk, except the last one.
+
+    Yields:
+        bytes: The UTF-8 encoded chunks.
+    """
+    buffer: List[str] = []
+    buffered = 0
+    async for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer).encode()
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
 @app.get("/data", response_class=HTMLResponse)
-async def read_measurements(request: Request) -> HTMLResponse:
+async def read_measurements(
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0, description="Rows after this id"),
+    before_id: Optional[int] = Query(None, ge=1, description="Rows before this id"),
+    limit: Optional[int] = Query(None, ge=1, description="Number of rows per page"),
+    prediction: Optional[int] = Query(None, description="Filter on the prediction"),
+    city_services: Optional[int] = Query(None, ge=1, le=5),
+    housing_costs: Optional[int] = Query(None, ge=1, le=5),
+    school_quality: Optional[int] = Query(None, ge=1, le=5),
+    local_policies: Optional[int] = Query(None, ge=1, le=5),
+    maintenance: Optional[int] = Query(None, ge=1, le=5),
+    social_events: Optional[int] = Query(None, ge=1, le=5),
+    stream: bool = Query(False, description="Stream all the rows in a single page"),
+) -> Response:
     """
-    Read all saved measurements from the database and display them in an HTML page.
+    Read a page of saved measurements from the database and display them in an HTML page,
+    with links to the previous and next pages. Pages are addressed by the id of the
+    row they start after (or end before), so reading a page doesn't get slower as
+    the table grows.
+
+    In stream mode, the rows after `after_id` (up to `limit`, not capped) are read
+    through a database cursor and the page is sent while it is rendered, so the time
+    to the first byte and the memory use don't depend on the number of rows.
 
     Args:
         request (Request): The incoming request object.
+        after_id (Optional[int]): Show the rows with an id greater than this one.
+        before_id (Optional[int]): Show the rows with an id lower than this one.
+        limit (Optional[int]): Number of rows per page, capped by DATA_MAX_PAGE_SIZE.
+        prediction (Optional[int]): Only show the rows with this prediction.
+        city_services (Optional[int]): Only show the rows with this rating.
+        housing_costs (Optional[int]): Only show the rows with this rating.
+        school_quality (Optional[int]): Only show the rows with this rating.
+        local_policies (Optional[int]): Only show the rows with this rating.
+        maintenance (Optional[int]): Only show the rows with this rating.
+        social_events (Optional[int]): Only show the rows with this rating.
+        stream (bool): Whether to stream all the rows instead of reading a page.
 
     Returns:
-        HTMLResponse: A response containing the HTML representation of all saved measurements.
+        Response: A response containing the HTML representation of a page of saved measurements.
     """
-    rows: List[HappyPrediction] = read_from_db(DATABASE_URL)
+    values = {
+        "prediction": prediction,
+        "city_services": city_services,
+        "housing_costs": housing_costs,
+        "school_quality": school_quality,
+        "local_policies": local_policies,
+        "maintenance": maintenance,
+        "social_events": social_events,
+    }
+    filters = {column: value for column, value in values.items() if value is not None}
+    if stream:
+        rows = stream_from_db_async(
+            DATABASE_URL,
+            chunk_size=EXPORT_CHUNK_SIZE,
+            after_id=after_id,
+            limit=limit,
+            filters=filters,
+        )
+        chunks = data_template.generate_async(
+            rows=rows, filters=filters, next_url=None, prev_url=None, request=request
+        )
+        logger.info("Streaming measurement rows")
+        return StreamingResponse(
+            buffer_chunks(chunks, STREAM_BUFFER_SIZE), media_type="text/html"
+        )
 
-    # Load the HTML template
-    template = env.get_template("data.html")
+    limit = min(limit or DATA_PAGE_SIZE, DATA_MAX_PAGE_SIZE)
+    page = await read_page_from_db_async(
+        DATABASE_URL,
+        limit=limit,
+        after_id=after_id,
+        before_id=before_id,
+        filters=filters,
+    )
+
+    # Links to the neighbouring pages keep the filters and the page size
+    url = request.url.remove_query_params(["after_id", "before_id"])
+    next_url = (
+        url.include_query_params(after_id=page.last_id) if page.has_next else None
+    )
+    prev_url = (
+        url.include_query_params(before_id=page.first_id) if page.has_prev else None
+    )
 
     # Render the template with the rows
-    html_content = template.render(rows=rows, request=request)
+    with RENDER_SECONDS.time():
+        html_content = await data_template.render_async(
+            rows=page.rows,
+            filters=filters,
+            next_url=next_url,
+            prev_url=prev_url,
+            request=request,
+        )
     logger.info("Measurement rows rendered successfully!")
     return HTMLResponse(content=html_content)
 
 
+@app.get("/data/export")
+async def export_measurements(
+    format: Annotated[str, Query(description="One of csv, ndjson or parquet")] = "csv",
+    min_id: Annotated[
+        Optional[int], Query(ge=0, description="Rows from this id")
+    ] = None,
+    max_id: Annotated[
+        Optional[int], Query(ge=0, description="Rows up to this id")
+    ] = None,
+    start: Annotated[
+        Optional[datetime], Query(description="Rows created from this time")
+    ] = None,
+    end: Annotated[
+        Optional[datetime], Query(description="Rows created before this time")
+    ] = None,
+    gzip: Annotated[bool, Query(description="Compress the export with gzip")] = False,
+) -> StreamingResponse:
+    """
+    Export the saved measurements as a file. The rows are read from the database and
+    encoded a chunk at a time while the response is sent, so exports of any size run
+    in constant memory.
+
+    Args:
+        format (str): Format of the export, one of csv, ndjson or parquet.
+        min_id (Optional[int]): Only export the rows with an id greater or equal to this one.
+        max_id (Optional[int]): Only export the rows with an id lower or equal to this one.
+        start (Optional[datetime]): Only export the rows created at or after this time.
+        end (Optional[datetime]): Only export the rows created before this time.
+        gzip (bool): Whether to compress the export with gzip.
+
+    Returns:
+        StreamingResponse: The export, as a file attachment.
+    """
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="ERR_INVALID_FORMAT")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="ERR_PARQUET_UNAVAILABLE")
+
+    chunks = export_chunks(
+        stream_rows(
+            DATABASE_URL,
+            chunk_size=EXPORT_CHUNK_SIZE,
+            min_id=min_id,
+            max_id=max_id,
+            start=start,
+            end=end,
+        ),
+        format,
+    )
+    filename = f"happy_predictions.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    logger.info(f"Exporting measurements as {filename}")
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/db/pool")
+async def read_pool_stats() -> dict:
+    """
+    Report the usage of the database connection pool, to help sizing it.
+
+    Returns:
+        dict: Pool size, connections checked in and out, overflow, and wait times in seconds.
+    """
+    return get_pool_stats(get_async_database_url(DATABASE_URL))
+
+
+@app.get("/inference/executor")
+async def read_executor_stats() -> dict:
+    """
+    Report the counters of the inference executor, to compare the execution modes.
+
+    Returns:
+        dict: Mode, number of workers, predictions in flight, queue depth,
+            and execution and wait times in seconds.
+    """
+    if executor is None:
+        return {"enabled": False}
+    return {"enabled": True, **executor.stats()}
+
+
+@app.get("/inference/batcher")
+async def read_batcher_stats() -> dict:
+    """
+    Report the counters of the micro-batcher.
+
+    Returns:
+        dict: Whether micro-batching is enabled, and its number of requests and batches,
+            the distribution of the batch sizes and the queueing delays in seconds.
+    """
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+@app.get("/cache")
+async def read_cache_stats() -> dict:
+    """
+    Report the counters of the prediction cache.
+
+    Returns:
+        dict: Whether the cache is enabled, and its size, hits, misses, hit rate,
+            evictions and expirations.
+    """
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/db/writer")
+async def read_writer_stats() -> dict:
+    """
+    Report the counters of the write-behind queue.
+
+    Returns:
+        dict: Whether the queue is enabled, and its counters of queued, pending,
+            flushed, dropped and failed predictions and flush latencies in seconds.
+    """
+    if writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **writer.stats()}
+
+
+@app.get("/metrics")
+async def read_metrics() -> Response:
+    """
+    Expose the metrics in the Prometheus text format: requests by route and status,
+    their latencies and the latencies of their stages (validation, inference,
+    saving to the database, rendering of /data), requests in flight, event loop lag
+    and connections of the database pool.
+
+    Returns:
+        Response: The metrics.
+    """
+    if not METRICS:
+        raise HTTPException(status_code=404, detail="ERR_METRICS_DISABLED")
+    pool_stats = get_pool_stats(get_async_database_url(DATABASE_URL))
+    for state in ("size", "checked_in", "checked_out", "overflow"):
+        if pool_stats.get(state) is not None:
+            DB_POOL_CONNECTIONS.labels(state).set(pool_stats[state])
+    return Response(content=metrics_registry.render(), media_type=CONTENT_TYPE)
+
+
+def check_admin_token(request: Request) -> None:
+    """
+    Authorize a request to the admin endpoints, which need the `ADMIN_TOKEN`
+    as a bearer token.
+
+    Args:
+        request (Request): The incoming request object.
+
+    Raises:
+        HTTPException: If the admin endpoints are disabled or the token is wrong.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="ERR_ADMIN_DISABLED")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="ERR_UNAUTHORIZED")
+
+
+@app.get("/admin/models")
+async def list_models(request: Request) -> dict:
+    """
+    List the versions of the model registry.
+
+    Args:
+        request (Request): The incoming request object.
+
+    Returns:
+        dict: The published versions with their metadata, the active version
+            and the version of the served model.
+    """
+    check_admin_token(request)
+    versions = []
+    for version in registry.list_versions():
+        try:
+            versions.append(registry.metadata(version))
+        except Exception as e:
+            logger.error(f"Error reading the metadata of the model {version}: {e}")
+            versions.append({"version": version})
+    return {
+        "versions": versions,
+        "active": registry.active_version(),
+        "serving": model.version_ if model is not None else None,
+    }
+
+
+@app.post("/admin/models/{version}/activate")
+async def activate_model(request: Request, version: str) -> dict:
+    """
+    Load a version of the model registry and serve it instead of the current model,
+    without dropping the requests in flight. The version stays active after a restart.
+
+    Args:
+        request (Request): The incoming request object.
+        version (str): The version to serve.
+
+    Returns:
+        dict: The served version and the durations of the steps in seconds.
+    """
+    check_admin_token(request)
+    try:
+        registry.model_dir(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="ERR_UNKNOWN_VERSION")
+
+    try:
+        durations = await activate_version(version)
+    except Exception as e:
+        logger.error(f"Error activating the model {version}: {e}")
+        raise HTTPException(status_code=500, detail="ERR_MODEL_LOAD_FAILED")
+    return {"serving": version, **durations}
+
+
+@app.post("/predictions/{prediction_id}/label")
+async def label_prediction(
+    request: Request, prediction_id: int, label: HappinessLabel
+) -> dict:
+    """
+    Record the happiness reported for a stored prediction, used as ground truth
+    by the retraining job, hence restricted to the admin token.
+
+    Args:
+        request (Request): The incoming request object.
+        prediction_id (int): Id of the prediction, as listed by `/data`.
+        label (HappinessLabel): The reported happiness.
+
+    Returns:
+        dict: The id of the prediction and the reported happiness.
+    """
+    check_admin_token(request)
+    if not DB_INITIALIZED:
+        raise HTTPException(status_code=503, detail="ERR_DATABASE_UNAVAILABLE")
+    saved = await save_label_async(DATABASE_URL, prediction_id, label.happiness)
+    if saved is None:
+        raise HTTPException(status_code=500, detail="ERR_UNEXPECTED")
+    if not saved:
+        raise HTTPException(status_code=404, detail="ERR_UNKNOWN_PREDICTION")
+    return {"id": prediction_id, "happiness": label.happiness}
+
+
+@app.get("/stats")
+async def read_stats() -> dict:
+    """
+    Report the share of happy predictions overall and for each value of each rating,
+    read from the summary maintained along with the stored predictions, so that it
+    takes the same time whatever the number of predictions.
+
+    Returns:
+        dict: The counts of happy and unhappy predictions, the happy rate and the mean
+            probabilities, in total and by rating column and value.
+    """
+    if not DB_INITIALIZED:
+        raise HTTPException(status_code=503, detail="ERR_DATABASE_UNAVAILABLE")
+    stats = await read_stats_async(DATABASE_URL)
+    if stats is None:
+        raise HTTPException(status_code=500, detail="ERR_UNEXPECTED")
+    return stats
+
+
+@app.post("/admin/stats/rebuild")
+async def rebuild_stats(request: Request) -> dict:
+    """
+    Recompute the summary behind `/stats` from the stored predictions, e.g. after
+    they were edited or deleted directly in the database.
+
+    Args:
+        request (Request): The incoming request object.
+
+    Returns:
+        dict: The rebuilt summary.
+    """
+    check_admin_token(request)
+    if not DB_INITIALIZED:
+        raise HTTPException(status_code=503, detail="ERR_DATABASE_UNAVAILABLE")
+    if not await rebuild_stats_async(DATABASE_URL):
+        raise HTTPException(status_code=500, detail="ERR_UNEXPECTED")
+    return await read_stats()
+
+
+@app.get("/retrain")
+async def read_retrain_status() -> dict:
+    """
+    Report the last run of the scheduled retraining job.
+
+    Returns:
+        dict: Whether retraining is scheduled, and the number of runs and the result
+            of the last one: published version, accuracies, durations and peak memory.
+    """
+    if not RETRAIN_INTERVAL:
+        return {"enabled": False}
+    return {"enabled": True, **retrain_status}
+
+
 if __name__ == "__main__":  # pragma: no cover
     uvicorn.run(app, host="127.0.0.1", port=8000, log_config=log_config.LOGGING_CONFIG)
@@ -0,0 +1,615 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds of the latency buckets, from 50us to 10s
+LATENCY_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    """
+    Args:
+        value (float): A sample value.
+
+    Returns:
+        str: The value in the exposition format.
+
+    >>> format_value(3.0), format_value(0.25), format_value(float("inf"))
+    ('3', '0.25', '+Inf')
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def escape_label_value(value: str) -> str:
+    """
+    Args:
+        value (str): A label value.
+
+    Returns:
+        str: The value with backslashes, quotes and newlines escaped.
+
+    >>> escape_label_value('say "hi"')
+    'say \\\\"hi\\\\"'
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """
+    Args:
+        names (Sequence[str]): The label names.
+        values (Sequence[str]): The label values.
+
+    Returns:
+        str: The labels of a sample, empty if there are none.
+
+    >>> format_labels(("stage", "le"), ("inference", "0.5"))
+    '{stage="inference",le="0.5"}'
+    """
+    if not names:
+        return ""
+    pairs = (
+        f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """
+    Base class of the metrics, a family of samples sharing a name and label names.
+    Children (one per combination of label values) are created on first use and
+    kept, so that the hot path only updates preallocated numbers.
+
+    The metrics are updated from the event loop thread without locks: each update
+    is a few bytecodes on a number the other coroutines can't interleave with.
+
+    Attributes:
+        name (str): The name of the metric.
+        help (str): Its description.
+        label_names (Tuple[str, ...]): The names of its labels.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()) -> None:
+        """
+        Class constructor.
+
+        Args:
+            name (str): The name of the metric.
+            help (str): Its description.
+            label_names (Sequence[str]): The names of its labels.
+        """
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._children: Dict[LabelValues, Any] = {}
+
+    def _new_child(self) -> Any:
+        """
+        Returns:
+            Any: The child of a combination of label values.
+        """
+        raise NotImplementedError
+
+    def labels(self, *values: str) -> Any:
+        """
+        Args:
+            *values (str): The label values, in the order of the label names.
+
+        Returns:
+            Any: The child of these label values, bound once and reused in the hot path.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"Expected labels {self.label_names}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> List[Tuple[str, LabelValues, LabelValues, float]]:
+        """
+        Returns:
+            List[Tuple[str, LabelValues, LabelValues, float]]: The samples, as name
+                suffix, extra label names, label values and value.
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The lines of the metric in the exposition format.
+        """
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for suffix, extra_names, values, value in self.samples():
+            labels = format_labels(self.label_names + extra_names, values)
+            lines.append(f"{self.name}{suffix}{labels} {format_value(value)}")
+        return lines
+
+
+class Value:
+    """
+    The value of a counter or a gauge for a combination of label values.
+
+    Attributes:
+        value (float): The value.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        """
+        Class constructor.
+        """
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Args:
+            amount (float): The increment.
+        """
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """
+        Args:
+            amount (float): The decrement, for gauges only.
+        """
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        """
+        Args:
+            value (float): The new value, for gauges only.
+        """
+        self.value = value
+
+
+class Counter(Metric):
+    """
+    Monotonic count, e.g. of requests. Its name ends with `_total`.
+    """
+
+    type_name = "counter"
+
+    def _new_child(self) -> Value:
+        """
+        Returns:
+            Value: A new count.
+        """
+        return Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Increment the counter of a metric without labels.
+
+        Args:
+            amount (float): The increment.
+        """
+        self.labels().inc(amount)
+
+    def samples(self) -> List[Tuple[str, LabelValues, LabelValues, float]]:
+        """
+        Returns:
+            List[Tuple[str, LabelValues, LabelValues, float]]: The count of each child.
+        """
+        return [
+            ("", (), values, child.value) for values, child in self._children.items()
+        ]
+
+
+class Gauge(Metric):
+    """
+    Value which goes up and down, e.g. requests in flight.
+    """
+
+    type_name = "gauge"
+
+    def _new_child(self) -> Value:
+        """
+        Returns:
+            Value: A new value.
+        """
+        return Value()
+
+    def set(self, value: float) -> None:
+        """
+        Args:
+            value (float): The value of a gauge without labels.
+        """
+        self.labels().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Args:
+            amount (float): The increment of a gauge without labels.
+        """
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        """
+        Args:
+            amount (float): The decrement of a gauge without labels.
+        """
+        self.labels().dec(amount)
+
+    def samples(self) -> List[Tuple[str, LabelValues, LabelValues, float]]:
+        """
+        Returns:
+            List[Tuple[str, LabelValues, LabelValues, float]]: The value of each child.
+        """
+        return [
+            ("", (), values, child.value) for values, child in self._children.items()
+        ]
+
+
+class HistogramChild:
+    """
+    Distribution of the observations of a combination of label values, counted in
+    buckets allocated up front.
+
+    Attributes:
+        bounds (Tuple[float, ...]): Upper bounds of the buckets, increasing.
+        counts (List[int]): Number of observations per bucket (not cumulative),
+            the last one counting the observations above all the bounds.
+        sum (float): Sum of the observations.
+    """
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        """
+        Class constructor.
+
+        Args:
+            bounds (Tuple[float, ...]): Upper bounds of the buckets, increasing.
+        """
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Args:
+            value (float): The observation, e.g. a duration in seconds.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "Timer":
+        """
+        Returns:
+            Timer: Context manager observing the duration of its block.
+        """
+        return Timer(self)
+
+
+class Timer:
+    """
+    Context manager observing the duration of its block in a histogram.
+
+    Attributes:
+        histogram (HistogramChild): The histogram.
+    """
+
+    __slots__ = ("histogram", "_start")
+
+    def __init__(self, histogram: HistogramChild) -> None:
+        """
+        Class constructor.
+
+        Args:
+            histogram (HistogramChild): The histogram.
+        """
+        self.histogram = histogram
+
+    def __enter__(self) -> "Timer":
+        """
+        Returns:
+            Timer: The timer, started.
+        """
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """
+        Observe the duration of the block, whether it raised or not.
+
+        Args:
+            *exc_info (Any): The exception raised by the block, if any.
+        """
+        self.histogram.observe(time.perf_counter() - self._start)
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations, e.g. latencies, counted in fixed buckets.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        """
+        Class constructor.
+
+        Args:
+            name (str): The name of the metric.
+            help (str): Its description.
+            label_names (Sequence[str]): The names of its labels.
+            buckets (Sequence[float]): Upper bounds of the buckets, increasing.
+        """
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        """
+        Returns:
+            HistogramChild: A new histogram.
+        """
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """
+        Args:
+            value (float): An observation of a histogram without labels.
+        """
+        self.labels().observe(value)
+
+    def samples(self) -> List[Tuple[str, LabelValues, LabelValues, float]]:
+        """
+        Returns:
+            List[Tuple[str, LabelValues, LabelValues, float]]: The cumulative bucket
+                counts, sum and count of each child.
+        """
+        samples: List[Tuple[str, LabelValues, LabelValues, float]] = []
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                samples.append(
+                    ("_bucket", ("le",), values + (format_value(bound),), cumulative)
+                )
+            samples.append(("_sum", (), values, child.sum))
+            samples.append(("_count", (), values, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Collection of the metrics exposed by `GET /metrics`.
+
+    Attributes:
+        metrics (Dict[str, Metric]): The metrics, by name.
+    """
+
+    def __init__(self) -> None:
+        """
+        Class constructor.
+        """
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Any:
+        """
+        Args:
+            metric (Metric): A metric.
+
+        Returns:
+            Any: The metric.
+
+        Raises:
+            ValueError: If another metric has the same name.
+        """
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns:
+            str: The metrics in the Prometheus text exposition format.
+        """
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class EventLoopLagMonitor:
+    """
+    Measure how late the event loop wakes up a sleeping task, i.e. how long
+    callbacks wait for the loop because of blocking code.
+
+    Attributes:
+        interval (float): Seconds between two measurements.
+        gauge (Gauge): Set to the last lag, in seconds.
+        histogram (Histogram): Distribution of the lags, in seconds.
+    """
+
+    def __init__(self, interval: float, gauge: Gauge, histogram: Histogram) -> None:
+        """
+        Class constructor.
+
+        Args:
+            interval (float): Seconds between two measurements.
+            gauge (Gauge): Set to the last lag, in seconds.
+            histogram (Histogram): Distribution of the lags, in seconds.
+        """
+        self.interval = interval
+        self.gauge = gauge
+        self.histogram = histogram
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def _run(self) -> None:
+        """
+        Sleep for the interval and record how late the loop woke up, forever.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.gauge.set(lag)
+            self.histogram.observe(lag)
+
+    def start(self) -> None:
+        """
+        Start measuring, on the running event loop.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Stop measuring.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting the HTTP requests by route, method and status, timing
+    them, and tracking the requests in flight. Routes are labelled by their path
+    template (e.g. `/admin/models/{version}/activate`), so that the number of
+    label values stays bounded.
+
+    Attributes:
+        app (Any): The wrapped ASGI application.
+    """
+
+    def __init__(self, app: Any) -> None:
+        """
+        Class constructor.
+
+        Args:
+            app (Any): The wrapped ASGI application.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        """
+        Args:
+            scope (Dict[str, Any]): The connection scope.
+            receive (Any): The receive channel.
+            send (Any): The send channel.
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            REQUESTS.labels(path, method, str(status_code)).inc()
+            REQUEST_SECONDS.labels(path, method).observe(time.perf_counter() - start)
+
+
+registry = MetricsRegistry()
+
+REQUESTS: Counter = registry.register(
+    Counter(
+        "happymeter_http_requests_total",
+        "Number of HTTP requests, by route, method and status code.",
+        ("route", "method", "status"),
+    )
+)
+REQUEST_SECONDS: Histogram = registry.register(
+    Histogram(
+        "happymeter_http_request_duration_seconds",
+        "Duration of the HTTP requests in seconds, by route and method.",
+        ("route", "method"),
+    )
+)
+REQUESTS_IN_FLIGHT: Gauge = registry.register(
+    Gauge("happymeter_http_requests_in_flight", "Number of HTTP requests in flight.")
+)
+REQUESTS_IN_FLIGHT.set(0)
+
+# Stages of the request handling, timed separately
+STAGES = ("validation", "inference", "save_to_db", "render")
+STAGE_SECONDS: Histogram = registry.register(
+    Histogram(
+        "happymeter_stage_duration_seconds",
+        "Duration of the stages of the request handling in seconds: validation of "
+        "the measurements, inference, saving to the database and rendering of /data.",
+        ("stage",),
+    )
+)
+VALIDATION_SECONDS, INFERENCE_SECONDS, SAVE_TO_DB_SECONDS, RENDER_SECONDS = (
+    STAGE_SECONDS.labels(stage) for stage in STAGES
+)
+
+EVENT_LOOP_LAG: Gauge = registry.register(
+    Gauge(
+        "happymeter_event_loop_lag_seconds",
+        "Last measured delay of the event loop in waking up a task, in seconds.",
+    )
+)
+EVENT_LOOP_LAG_SECONDS: Histogram = registry.register(
+    Histogram(
+        "happymeter_event_loop_lag_duration_seconds",
+        "Distribution of the delays of the event loop in waking up a task, in seconds.",
+    )
+)
+
+DB_POOL_CONNECTIONS: Gauge = registry.register(
+    Gauge(
+        "happymeter_db_pool_connections",
+        "Connections of the database pool, by state: size of the pool, checked in "
+        "(idle), checked out (in use) and overflow. Read when the metrics are scraped.",
+        ("state",),
+    )
+)
@@ -1,9 +1,257 @@
+import hashlib
+import os
+import struct
+import uuid
+import zipfile
+from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Sequence, Tuple
 
 import joblib
-import pandas as pd
-from pydantic import BaseModel, ConfigDict, Field
-from sklearn.ensemble import GradientBoostingClassifier
+import numpy as np
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    ModelWrapValidatorHandler,
+    model_validator,
+)
+
+from src.app.logger import logger
+from src.app.metrics import VALIDATION_SECONDS
+
+# pandas and scikit-learn are imported when they are first needed, so that importing
+# this module (and the application) stays fast
+if TYPE_CHECKING:
+    import pandas as pd
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    from src.app.batcher import MicroBatcher
+    from src.app.executor import InferenceExecutor
+
+# Directory of the default model and of its artifacts unless `MODEL_DIR` is set
+MODEL_DIR = Path(
+    os.getenv("MODEL_DIR", Path(__file__).resolve().parent.parent.absolute() / "model")
+)
+
+# Every survey answer is a rating from 1 to 5, so the whole input space is small
+# enough (5 ** 6 = 15,625 points) to be enumerated and precomputed.
+N_FEATURES = 6
+N_LEVELS = 5
+LOOKUP_SIZE = N_LEVELS**N_FEATURES
+
+# Number of table entries checked against the model whenever a persisted table is loaded
+LOOKUP_VERIFY_SAMPLE = 1024
+
+# Arrays of a compiled model, see `CompiledModel`
+COMPILED_ARRAYS = (
+    "feature",
+    "threshold",
+    "left",
+    "right",
+    "value",
+    "roots",
+    "columns",
+    "init",
+    "learning_rate",
+    "classes",
+    "depth",
+)
+
+# Weights of the mixed-radix index, the first feature being the most significant digit
+_RADIX = N_LEVELS ** np.arange(N_FEATURES - 1, -1, -1)
+
+
+def lookup_index(ratings: Sequence[int]) -> int:
+    """
+    Compute the position of a combination of ratings in the lookup table.
+
+    Args:
+        ratings (Sequence[int]): The six ratings, each between 1 and 5.
+
+    Returns:
+        int: The mixed-radix index of the ratings, between 0 and LOOKUP_SIZE - 1.
+
+    Examples:
+        >>> lookup_index([1, 1, 1, 1, 1, 1])
+        0
+        >>> lookup_index([5, 5, 5, 5, 5, 5])
+        15624
+    """
+    index = 0
+    for rating in ratings:
+        if not 1 <= rating <= N_LEVELS:
+            raise ValueError(f"Rating out of range: {rating}")
+        index = index * N_LEVELS + (rating - 1)
+    return index
+
+
+def input_space() -> np.ndarray:
+    """
+    Enumerate all possible survey inputs, ordered by their lookup index.
+
+    Returns:
+        np.ndarray: Array of shape (LOOKUP_SIZE, N_FEATURES) holding every combination of ratings.
+    """
+    return np.indices((N_LEVELS,) * N_FEATURES).reshape(N_FEATURES, -1).T + 1
+
+
+def file_digest(path: Path) -> str:
+    """
+    Compute the digest of a file, to tell whether an artifact was derived from it.
+
+    Args:
+        path (Path): The file.
+
+    Returns:
+        str: The SHA-256 digest of the content of the file.
+    """
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def load_arrays(path: Path, mmap: bool = False) -> Dict[str, np.ndarray]:
+    """
+    Load the arrays of a .npz file saved by `np.savez`. With `mmap`, the arrays are
+    read-only memory maps of the file instead of copies, so that the processes which
+    load the same file share its pages.
+
+    Args:
+        path (Path): The .npz file, which must not be compressed to be memory-mapped.
+        mmap (bool): Whether to memory-map the arrays.
+
+    Returns:
+        Dict[str, np.ndarray]: The arrays, by name.
+    """
+    if not mmap:
+        with np.load(path) as stored:
+            return {name: stored[name] for name in stored}
+
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(
+                    f"Cannot memory-map a compressed array: {info.filename}"
+                )
+            # Skip the local header of the member, then the header of the .npy content
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack("<HH", f.read(4))
+            f.seek(name_length + extra_length, os.SEEK_CUR)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            name = info.filename.removesuffix(".npy")
+            if dtype.hasobject or not shape:
+                # Scalars are not worth a map
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                arrays[name] = np.lib.format.read_array(f)
+            else:
+                arrays[name] = np.memmap(
+                    path,
+                    dtype=dtype,
+                    mode="r",
+                    offset=f.tell(),
+                    shape=shape,
+                    order="F" if fortran_order else "C",
+                )
+    return arrays
+
+
+def _gradient_boosting() -> "GradientBoostingClassifier":
+    """
+    Returns:
+        GradientBoostingClassifier: The gradient boosting ensemble of the default model.
+    """
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    return GradientBoostingClassifier(
+        n_estimators=10,
+        learning_rate=0.1,
+        max_depth=3,
+        max_features="sqrt",
+        loss="log_loss",
+        criterion="friedman_mse",
+        subsample=1.0,
+        random_state=42,
+    )
+
+
+def _hist_gradient_boosting() -> Any:
+    """
+    Returns:
+        HistGradientBoostingClassifier: A histogram-based gradient boosting ensemble.
+    """
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    return HistGradientBoostingClassifier(
+        max_iter=10, max_depth=3, early_stopping=False, random_state=42
+    )
+
+
+def _logistic_regression() -> Any:
+    """
+    Returns:
+        LogisticRegression: A logistic regression on the ratings.
+    """
+    from sklearn.linear_model import LogisticRegression
+
+    return LogisticRegression(max_iter=1000)
+
+
+@dataclass(frozen=True)
+class ModelBackend:
+    """
+    An estimator which HappyModel can train and serve. Whatever the backend, the
+    model is used through `HappyModel.predict_array` and `HappyModel.predict_proba_array`.
+
+    Attributes:
+        name (str): The name of the backend, see `MODEL_BACKEND`.
+        model_fname (str): The default filename of the model.
+        estimator (Callable[[], Any]): Creates an unfitted estimator.
+        compiled (bool): Whether the model can be served from its compiled form.
+        lookup (bool): Whether the predictions are served from the lookup table,
+            precomputed with the model for the whole input space.
+    """
+
+    name: str
+    model_fname: str
+    estimator: Callable[[], Any]
+    compiled: bool = False
+    lookup: bool = False
+
+
+# Backends which can be selected with `MODEL_BACKEND`
+BACKENDS: Dict[str, ModelBackend] = {
+    backend.name: backend
+    for backend in (
+        ModelBackend(
+            "lookup", "happy_model.pkl", _gradient_boosting, compiled=True, lookup=True
+        ),
+        ModelBackend("gbc", "happy_model.pkl", _gradient_boosting, compiled=True),
+        ModelBackend("hgbc", "happy_model_hgbc.pkl", _hist_gradient_boosting),
+        ModelBackend("logreg", "happy_model_logreg.pkl", _logistic_regression),
+    )
+}
+
+
+def train_estimator(X: np.ndarray, y: np.ndarray, backend: str = "gbc") -> Any:
+    """
+    Train the estimator of a backend, with the hyperparameters of the served model.
+
+    Args:
+        X (np.ndarray): Array of shape (n_samples, N_FEATURES) with the ratings.
+        y (np.ndarray): The happiness of the samples.
+        backend (str): A key of BACKENDS.
+
+    Returns:
+        Any: The trained model.
+    """
+    return BACKENDS[backend].estimator().fit(X, y)
 
 
 class SurveyMeasurement(BaseModel):
@@ -62,6 +310,41 @@ class SurveyMeasurement(BaseModel):
         description="Must be between 1 and 5",
     )
 
+    @model_validator(mode="wrap")
+    @classmethod
+    def time_validation(
+        cls, data: Any, handler: ModelWrapValidatorHandler["SurveyMeasurement"]
+    ) -> "SurveyMeasurement":
+        """
+        Observe the duration of the validation, in the "validation" stage metrics.
+
+        Args:
+            data (Any): The raw measurement.
+            handler (ModelWrapValidatorHandler[SurveyMeasurement]): The validation.
+
+        Returns:
+            SurveyMeasurement: The validated measurement.
+        """
+        with VALIDATION_SECONDS.time():
+            return handler(data)
+
+
+class HappinessLabel(BaseModel):
+    """
+    Class which describes the happiness reported for a stored prediction,
+    used as ground truth to retrain the model.
+
+    Attributes:
+        happiness (int): Reported happiness, 0 (unhappy) or 1 (happy).
+    """
+
+    happiness: int = Field(
+        title="Reported happiness",
+        ge=0,
+        le=1,
+        description="Must be 0 (unhappy) or 1 (happy)",
+    )
+
 
 class HappyPrediction(SurveyMeasurement):
     """
@@ -78,69 +361,503 @@ class HappyPrediction(SurveyMeasurement):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CompiledModel:
+    """
+    Gradient boosting ensemble compiled to flat arrays, evaluated with NumPy only.
+
+    The nodes of all the trees are concatenated: for node `i`, `feature[i]` and
+    `threshold[i]` hold its split, `left[i]` and `right[i]` its children (a leaf is
+    its own child, so walking down a tree stops there), and `value[i]` its output.
+    Tree `t` starts at node `roots[t]` and adds to the raw score of class column
+    `columns[t]`. Probabilities follow from the raw scores as in scikit-learn's log loss.
+
+    Attributes:
+        arrays (Dict[str, np.ndarray]): The arrays of the ensemble, see COMPILED_ARRAYS.
+        classes_ (np.ndarray): The class labels.
+        depth (int): Depth of the deepest tree.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Class constructor.
+
+        Args:
+            arrays (Dict[str, np.ndarray]): The arrays of the ensemble, see COMPILED_ARRAYS.
+        """
+        missing = set(COMPILED_ARRAYS) - set(arrays)
+        if missing:
+            raise ValueError(f"Missing arrays of the compiled model: {sorted(missing)}")
+        self.arrays = arrays
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.columns = arrays["columns"]
+        self.init = arrays["init"]
+        self.learning_rate = float(arrays["learning_rate"])
+        self.classes_ = arrays["classes"]
+        self.depth = int(arrays["depth"])
+
+    @classmethod
+    def from_estimator(cls, estimator: "GradientBoostingClassifier") -> "CompiledModel":
+        """
+        Compile a fitted GradientBoostingClassifier.
+
+        Args:
+            estimator (GradientBoostingClassifier): The fitted ensemble, its initial
+                estimator must predict a constant (the default prior, or "zero").
+
+        Returns:
+            CompiledModel: The compiled ensemble.
+        """
+        # The initial raw scores are the raw scores of the ensemble without its trees
+        n_features = estimator.n_features_in_
+        probe = np.zeros((2, n_features), dtype=np.float32)
+        probe[1] = 1e9
+        init = estimator.decision_function(probe).reshape(len(probe), -1)
+        for stage in estimator.estimators_:
+            for column, tree in enumerate(stage):
+                init[:, column] -= estimator.learning_rate * tree.predict(probe)
+        if not np.allclose(init[0], init[1]):
+            raise ValueError("Only constant initial estimators can be compiled")
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        roots, columns = [], []
+        offset = depth = 0
+        for stage in estimator.estimators_:
+            for column, tree in enumerate(stage):
+                tree = tree.tree_
+                nodes = np.arange(tree.node_count)
+                leaf = tree.children_left == -1
+                features.append(np.where(leaf, 0, tree.feature))
+                thresholds.append(np.where(leaf, np.inf, tree.threshold))
+                lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+                rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+                values.append(tree.value[:, 0, 0])
+                roots.append(offset)
+                columns.append(column)
+                offset += tree.node_count
+                depth = max(depth, tree.max_depth)
+
+        return cls(
+            {
+                "feature": np.concatenate(features).astype(np.int32),
+                "threshold": np.concatenate(thresholds).astype(np.float64),
+                "left": np.concatenate(lefts).astype(np.int32),
+                "right": np.concatenate(rights).astype(np.int32),
+                "value": np.concatenate(values).astype(np.float64),
+                "roots": np.array(roots, dtype=np.int32),
+                "columns": np.array(columns, dtype=np.int32),
+                "init": np.asarray(init[0], dtype=np.float64),
+                "learning_rate": np.float64(estimator.learning_rate),
+                "classes": np.asarray(estimator.classes_),
+                "depth": np.int32(depth),
+            }
+        )
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = False) -> "CompiledModel":
+        """
+        Load a compiled model saved by `save`.
+
+        Args:
+            path (Path): The .npz file.
+            mmap (bool): Whether to memory-map the arrays, see `load_arrays`.
+
+        Returns:
+            CompiledModel: The compiled ensemble.
+        """
+        return cls(load_arrays(path, mmap=mmap))
+
+    def save(self, path: Path) -> None:
+        """
+        Save the compiled model, atomically.
+
+        Args:
+            path (Path): The .npz file.
+        """
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **self.arrays)
+        os.replace(tmp_path, path)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """
+        Compute the raw scores of the ensemble.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, n_features).
+
+        Returns:
+            np.ndarray: Array of shape (n_samples, n_columns) with the raw scores,
+                a single column for binary classification.
+        """
+        # Same precision as scikit-learn, which compares float32 inputs to float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat = X.ravel()
+        offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, None]
+
+        # Walk down all the trees for all the samples at once, a level at a time
+        nodes = np.broadcast_to(self.roots, (n_samples, len(self.roots)))
+        for _ in range(self.depth):
+            go_left = flat[offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+        contributions = self.learning_rate * self.value[nodes]
+        if len(self.init) == 1:
+            return (self.init[0] + contributions.sum(axis=1))[:, None]
+        raw = np.tile(self.init, (n_samples, 1))
+        for column in range(len(self.init)):
+            raw[:, column] += contributions[:, self.columns == column].sum(axis=1)
+        return raw
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Compute class probabilities.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, n_features).
+
+        Returns:
+            np.ndarray: Array of shape (n_samples, n_classes) with the class probabilities.
+        """
+        raw = self.decision_function(X)
+        if raw.shape[1] == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        exp = np.exp(raw - raw.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Predict class labels.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, n_features).
+
+        Returns:
+            np.ndarray: The predicted labels.
+        """
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
 class HappyModel:
     """
     Class for training the model and making predictions.
 
     Attributes:
         df_fname_ (str): The filename of the dataset.
-        df (DataFrame): The loaded dataset.
+        df (DataFrame): The dataset, loaded when first used (to train the model).
+        backend_ (ModelBackend): The estimator and how it is served.
         model_fname_ (str): The filename of the model.
-        model (GradientBoostingClassifier): The trained machine learning model.
+        model_dir_ (Path): The directory of the model and its artifacts.
+        compiled_fname_ (str): The filename of the compiled model.
+        mmap_ (bool): Whether the artifacts are memory-mapped.
+        read_only_ (bool): Whether the directory of the model is not written.
+        model (Any): The trained machine learning model, compiled unless disabled
+            or unsupported by the backend.
+        version_ (str): Identifier of the model, its registry version if it was loaded
+            from the registry, else a digest which changes when the model is retrained.
+        executor_ (Optional[InferenceExecutor]): Where the predictions are computed,
+            on the event loop if None.
+        batcher_ (Optional[MicroBatcher]): Groups concurrent single predictions into
+            batches, if set.
+        lookup_fname_ (str): The filename of the precomputed lookup table.
+        lookup_ (Optional[Tuple[np.ndarray, np.ndarray]]): Predictions and probabilities
+            for the whole input space, or None if the table is not available or
+            not served by the backend.
     """
 
     def __init__(
-        self, data_fname: str = "happy_data.csv", model_fname: str = "happy_model.pkl"
+        self,
+        data_fname: str = "happy_data.csv",
+        model_fname: Optional[str] = None,
+        compiled: bool = True,
+        mmap: bool = False,
+        model_dir: Optional[Path] = None,
+        version: Optional[str] = None,
+        backend: str = "lookup",
+        read_only: bool = False,
     ) -> None:
         """
-        Class constructor, loads the dataset and the model if it exists.
-        If the model does not exist, it trains a new model and saves it.
+        Class constructor, loads the model if it exists.
+        If the model does not exist, it loads the dataset, trains a new model and saves it.
+        Unless disabled, the model is served from its compiled form, which is loaded
+        without importing scikit-learn as long as it matches the saved model.
+        Finally, if the backend serves it, the lookup table of all predictions is loaded
+        (or built) and verified.
 
         Args:
             data_fname (str): The filename of the dataset.
-            model_fname (str): The filename of the model.
+            model_fname (Optional[str]): The filename of the model, the default one of
+                the backend if None.
+            compiled (bool): Whether to serve the model from its compiled form.
+            mmap (bool): Whether to memory-map the compiled model and the lookup table
+                read-only, so that the processes serving the same model share them.
+            model_dir (Optional[Path]): The directory of the model, e.g. a version of the
+                model registry, MODEL_DIR if None.
+            version (Optional[str]): Identifier of the model, a digest of the model if None.
+            backend (str): The backend, a key of BACKENDS.
+            read_only (bool): Whether the directory of the model must not be written,
+                e.g. a published version of the model registry: the model is not
+                trained if it cannot be loaded, and the compiled model and the lookup
+                table are built in memory if they are missing or stale.
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {backend}")
+        self.backend_ = BACKENDS[backend]
+        compiled = compiled and self.backend_.compiled
+        self.mmap_ = mmap
+        self.read_only_ = read_only
+        self.model_dir_ = Path(model_dir) if model_dir is not None else MODEL_DIR
         self.df_fname_ = data_fname
-        self.df = pd.read_csv(
+        self.model_fname_ = model_fname or self.backend_.model_fname
+        self.compiled_fname_ = Path(self.model_fname_).stem + ".trees.npz"
+        model_path = self.model_dir_ / self.model_fname_
+        # A compiled model, or the estimator of the backend
+        self.model: Any = self._load_compiled_model(model_path) if compiled else None
+        if self.model is None:
+            try:
+                self.model = joblib.load(model_path)
+            except Exception:
+                if read_only:
+                    raise
+                self.model = self._train_model()
+                joblib.dump(self.model, model_path)
+            if compiled:
+                self.model = self._compile_model(model_path)
+        self.version_ = version or self._model_version()
+        self.executor_: Optional["InferenceExecutor"] = None
+        self.batcher_: Optional["MicroBatcher"] = None
+        self.lookup_fname_ = Path(self.model_fname_).stem + ".lut.npz"
+        self.lookup_ = self._load_lookup_table() if self.backend_.lookup else None
+
+    def _load_compiled_model(self, model_path: Path) -> Optional[CompiledModel]:
+        """
+        Load the compiled model saved next to the model, if it was compiled
+        from the current model file.
+
+        Args:
+            model_path (Path): The model file.
+
+        Returns:
+            Optional[CompiledModel]: The compiled model, or None if it is missing or stale.
+        """
+        compiled_path = model_path.with_name(self.compiled_fname_)
+        try:
+            compiled = CompiledModel.load(compiled_path, mmap=self.mmap_)
+            if str(compiled.arrays.get("source")) == file_digest(model_path):
+                return compiled
+            logger.warning("Compiled model does not match the model, recompiling it")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Compiled model could not be read, recompiling it: {e}")
+        return None
+
+    def _compile_model(self, model_path: Path) -> Any:
+        """
+        Compile the loaded model and save it next to the model file, unless the
+        directory of the model is read-only.
+
+        Args:
+            model_path (Path): The model file.
+
+        Returns:
+            Any: The compiled model, or the model itself if it cannot be compiled.
+        """
+        try:
+            compiled = CompiledModel.from_estimator(self.model)
+        except Exception as e:
+            logger.warning(f"Model could not be compiled, serving it as is: {e}")
+            return self.model
+        if self.read_only_:
+            return compiled
+        try:
+            compiled.arrays["source"] = np.array(file_digest(model_path))
+            compiled.save(model_path.with_name(self.compiled_fname_))
+        except Exception as e:
+            logger.warning(f"Compiled model could not be saved: {e}")
+            return compiled
+        if self.mmap_:
+            # Serve the saved copy, shared with the other processes
+            return self._load_compiled_model(model_path) or compiled
+        return compiled
+
+    @cached_property
+    def df(self) -> "pd.DataFrame":
+        """
+        Load the dataset on first use: serving predictions with a trained model doesn't
+        need it, nor pandas.
+
+        Returns:
+            DataFrame: The dataset.
+        """
+        import pandas as pd
+
+        return pd.read_csv(
             Path(__file__).resolve().parent.parent.absolute() / "data" / self.df_fname_
         )
-        self.model_fname_ = model_fname
+
+    def _model_version(self) -> str:
+        """
+        Identify the loaded model, so that results computed with another model
+        (before a retraining or a reload) can be told apart.
+
+        Returns:
+            str: A digest of the model parameters, or a random identifier
+                if the model cannot be hashed.
+        """
         try:
-            self.model = joblib.load(
-                Path(__file__).resolve().parent.parent.absolute()
-                / "model"
-                / self.model_fname_
-            )
+            if isinstance(self.model, CompiledModel):
+                # Same version whether the arrays are memory-mapped or not
+                return joblib.hash(
+                    {
+                        name: np.asarray(array)
+                        for name, array in self.model.arrays.items()
+                    }
+                )
+            return joblib.hash(self.model)
         except Exception:
-            self.model = self._train_model()
-            joblib.dump(
-                self.model,
-                Path(__file__).resolve().parent.parent.absolute()
-                / "model"
-                / self.model_fname_,
-            )
+            return uuid.uuid4().hex
 
-    def _train_model(self) -> GradientBoostingClassifier:
+    def _train_model(self) -> Any:
         """
-        Train a GradientBoostingClassifier model using the dataset.
+        Train the estimator of the backend using the dataset.
 
         Returns:
-            GradientBoostingClassifier: The trained model.
+            Any: The trained model.
         """
         X = self.df.drop("happiness", axis=1)
         y = self.df["happiness"]
-        gfc = GradientBoostingClassifier(
-            n_estimators=10,
-            learning_rate=0.1,
-            max_depth=3,
-            max_features="sqrt",
-            loss="log_loss",
-            criterion="friedman_mse",
-            subsample=1.0,
-            random_state=42,
+        return train_estimator(X.values, y.values, self.backend_.name)
+
+    def predict_proba_array(self, X: np.ndarray) -> np.ndarray:
+        """
+        Compute class probabilities for a matrix of ratings.
+        A compiled model is evaluated with NumPy. A fitted GradientBoostingClassifier
+        is given a float32 C-contiguous array, which its input validation doesn't copy.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, N_FEATURES) with the ratings.
+
+        Returns:
+            np.ndarray: Array of shape (n_samples, n_classes) with the class probabilities.
+        """
+        if isinstance(self.model, CompiledModel):
+            return self.model.predict_proba(X)
+
+        from sklearn.ensemble import GradientBoostingClassifier
+
+        if isinstance(self.model, GradientBoostingClassifier):
+            X = np.ascontiguousarray(X, dtype=np.float32)
+        return np.asarray(self.model.predict_proba(X), dtype=np.float64)
+
+    def predict_array(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for a matrix of ratings in a single pass: the class probabilities
+        are computed once, and both the label and its confidence are derived from them.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, N_FEATURES) with the ratings.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Predictions and maximum probabilities for each row.
+        """
+        proba = self.predict_proba_array(X)
+        predictions = np.asarray(self.model.classes_)[proba.argmax(axis=1)]
+        return predictions.astype(np.int64), proba.max(axis=1)
+
+    def _verify_lookup_table(
+        self, predictions: np.ndarray, probabilities: np.ndarray
+    ) -> bool:
+        """
+        Check a lookup table against the model on a fixed sample of the input space.
+
+        Args:
+            predictions (np.ndarray): Precomputed predictions.
+            probabilities (np.ndarray): Precomputed probabilities.
+
+        Returns:
+            bool: True if the table has the right shape and agrees with the model.
+        """
+        if predictions.shape != (LOOKUP_SIZE,) or probabilities.shape != (LOOKUP_SIZE,):
+            return False
+        sample = np.random.default_rng(42).choice(
+            LOOKUP_SIZE, size=LOOKUP_VERIFY_SAMPLE, replace=False
         )
-        model = gfc.fit(X.values, y.values)
-        return model
+        try:
+            expected_predictions, expected_probabilities = self.predict_array(
+                input_space()[sample]
+            )
+        except Exception:
+            return False
+        return np.array_equal(
+            predictions[sample], expected_predictions
+        ) and np.allclose(probabilities[sample], expected_probabilities)
+
+    def _load_lookup_table(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Load the persisted lookup table and verify it against the model.
+        If the table is missing or stale, it is rebuilt and saved next to the model,
+        unless the directory of the model is read-only.
+
+        Returns:
+            Optional[Tuple[np.ndarray, np.ndarray]]: Predictions and probabilities
+                for the whole input space, or None if the table could not be built.
+        """
+        lookup_path = self.model_dir_ / self.lookup_fname_
+        try:
+            stored = load_arrays(lookup_path, mmap=self.mmap_)
+            predictions, probabilities = stored["prediction"], stored["probability"]
+            if self._verify_lookup_table(predictions, probabilities):
+                return predictions, probabilities
+            logger.warning("Lookup table does not match the model, rebuilding it")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Lookup table could not be read, rebuilding it: {e}")
+
+        try:
+            predictions, probabilities = self.predict_array(input_space())
+        except Exception as e:
+            logger.warning(f"Lookup table disabled, could not evaluate the model: {e}")
+            return None
+        if self.read_only_:
+            return predictions, probabilities
+
+        self._save_lookup_table(lookup_path, predictions, probabilities)
+        if self.mmap_:
+            try:
+                stored = load_arrays(lookup_path, mmap=True)
+                return stored["prediction"], stored["probability"]
+            except Exception as e:
+                logger.warning(f"Lookup table could not be memory-mapped: {e}")
+        return predictions, probabilities
+
+    @staticmethod
+    def _save_lookup_table(
+        lookup_path: Path, predictions: np.ndarray, probabilities: np.ndarray
+    ) -> None:
+        """
+        Persist the lookup table next to the model.
+
+        Args:
+            lookup_path (Path): Destination of the table.
+            predictions (np.ndarray): Precomputed predictions.
+            probabilities (np.ndarray): Precomputed probabilities.
+        """
+        try:
+            # Write to a temporary file first so that concurrent workers never read a partial table
+            tmp_path = lookup_path.with_name(lookup_path.name + ".tmp")
+            with open(tmp_path, "wb") as f:
+                np.savez(f, prediction=predictions, probability=probabilities)
+            os.replace(tmp_path, lookup_path)
+        except Exception as e:
+            logger.warning(f"Lookup table could not be saved: {e}")
 
     async def predict_happiness(
         self,
@@ -166,17 +883,61 @@ class HappyModel:
         Returns:
             tuple[int, float]: The prediction (happiness value) and the associated probability.
         """
-        data_in = [
-            [
-                city_services,
-                housing_costs,
-                school_quality,
-                local_policies,
-                maintenance,
-                social_events,
-            ]
+        ratings = [
+            city_services,
+            housing_costs,
+            school_quality,
+            local_policies,
+            maintenance,
+            social_events,
         ]
 
-        prediction = self.model.predict(data_in)
-        probability = self.model.predict_proba(data_in).max()
-        return int(prediction[0]), float(probability)
+        if self.batcher_ is not None:
+            return await self.batcher_.submit(ratings)
+
+        if self.executor_ is not None:
+            predictions, probabilities = await self.executor_.predict(
+                self, np.array([ratings], dtype=np.int64)
+            )
+            return int(predictions[0]), float(probabilities[0])
+
+        if self.lookup_ is not None:
+            index = lookup_index(ratings)
+            return int(self.lookup_[0][index]), float(self.lookup_[1][index])
+
+        predictions, probabilities = self.predict_array(np.array([ratings]))
+        return int(predictions[0]), float(probabilities[0])
+
+    async def predict_happiness_batch(
+        self, X: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for many survey measurements at once.
+
+        Args:
+            X (np.ndarray): Array of shape (n_samples, N_FEATURES) with the ratings,
+                columns ordered as in SurveyMeasurement.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The predictions and their associated probabilities.
+        """
+        X = np.asarray(X, dtype=np.int64).reshape(-1, N_FEATURES)
+        if self.executor_ is not None:
+            return await self.executor_.predict(self, X)
+        return self.predict(X)
+
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Make predictions for a matrix of ratings synchronously, from the lookup table
+        if it is available. This is the unit of work run by the inference executors.
+
+        Args:
+            X (np.ndarray): Integer array of shape (n_samples, N_FEATURES) with the ratings.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The predictions and their associated probabilities.
+        """
+        if self.lookup_ is not None:
+            index = (X - 1) @ _RADIX
+            return self.lookup_[0][index], self.lookup_[1][index]
+        return self.predict_array(X)
@@ -0,0 +1,268 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+from src.app.logger import logger
+from src.app.model import BACKENDS, HappyModel, file_digest
+
+# Name of the file holding the active version, and of the metadata of a version
+ACTIVE_FNAME = "ACTIVE"
+METADATA_FNAME = "metadata.json"
+
+_VERSION_PATTERN = re.compile(r"^v(\d+)$")
+
+# Directory of the registry unless `MODEL_REGISTRY_DIR` is set
+DEFAULT_REGISTRY_DIR = Path(__file__).resolve().parent.parent / "model" / "registry"
+
+
+class ModelRegistry:
+    """
+    Versioned store of trained models on the filesystem.
+
+    Each version is an immutable directory `v<n>` holding the model file, its metadata
+    and the artifacts derived from it (compiled model, lookup table), which are
+    built when it is published. The active version is named by the `ACTIVE` file.
+    Versions are published and activated atomically (rename and replace), so that
+    a server loading the registry never sees a partial version.
+
+    Attributes:
+        root (Path): The directory of the registry.
+        model_fname (str): The filename of the model in a version.
+    """
+
+    def __init__(self, root: Path, model_fname: str = "happy_model.pkl") -> None:
+        """
+        Class constructor, the directory is created on the first publication.
+
+        Args:
+            root (Path): The directory of the registry.
+            model_fname (str): The filename of the model in a version.
+        """
+        self.root = Path(root)
+        self.model_fname = model_fname
+
+    def list_versions(self) -> List[str]:
+        """
+        Returns:
+            List[str]: The published versions, oldest first.
+        """
+        if not self.root.is_dir():
+            return []
+        versions = [
+            path.name
+            for path in self.root.iterdir()
+            if path.is_dir() and _VERSION_PATTERN.match(path.name)
+        ]
+        return sorted(versions, key=lambda name: int(name[1:]))
+
+    def model_dir(self, version: str) -> Path:
+        """
+        Args:
+            version (str): A published version.
+
+        Returns:
+            Path: The directory of the version.
+
+        Raises:
+            KeyError: If the version is not published.
+        """
+        path = self.root / version
+        if not _VERSION_PATTERN.match(version) or not path.is_dir():
+            raise KeyError(version)
+        return path
+
+    def metadata(self, version: str) -> Dict[str, Any]:
+        """
+        Args:
+            version (str): A published version.
+
+        Returns:
+            Dict[str, Any]: The metadata of the version.
+
+        Raises:
+            KeyError: If the version is not published.
+        """
+        with open(self.model_dir(version) / METADATA_FNAME) as f:
+            return json.load(f)
+
+    def publish(
+        self,
+        model_path: Path,
+        metadata: Optional[Dict[str, Any]] = None,
+        backend: Optional[str] = None,
+    ) -> str:
+        """
+        Copy a trained model into a new version, with its artifacts. The version is
+        not activated.
+
+        Args:
+            model_path (Path): The model file.
+            metadata (Optional[Dict[str, Any]]): Additional metadata, e.g. evaluation metrics.
+            backend (Optional[str]): The backend of the model, a key of BACKENDS,
+                recorded in the metadata so that the model is served accordingly.
+
+        Returns:
+            str: The new version.
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.root))
+        try:
+            shutil.copy2(model_path, staging / self.model_fname)
+            self._build_artifacts(staging)
+            while True:
+                versions = self.list_versions()
+                version = f"v{int(versions[-1][1:]) + 1 if versions else 1}"
+                with open(staging / METADATA_FNAME, "w") as f:
+                    json.dump(
+                        {
+                            **(metadata or {}),
+                            **({"backend": backend} if backend is not None else {}),
+                            "version": version,
+                            "created_at": datetime.now(timezone.utc).isoformat(),
+                            "digest": file_digest(staging / self.model_fname),
+                        },
+                        f,
+                        indent=2,
+                    )
+                try:
+                    # Fails if another publication took the version meanwhile
+                    os.rename(staging, self.root / version)
+                    break
+                except OSError:
+                    if not (self.root / version).exists():
+                        raise
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logger.info(f"Model {version} published!")
+        return version
+
+    def _build_artifacts(self, model_dir: Path) -> None:
+        """
+        Build the compiled model and the lookup table of a gradient boosting model,
+        served by the `gbc` and `lookup` backends, next to the model file.
+
+        Args:
+            model_dir (Path): The directory of the model, before it is published.
+        """
+        from sklearn.ensemble import GradientBoostingClassifier
+
+        try:
+            estimator = joblib.load(model_dir / self.model_fname)
+        except Exception as e:
+            logger.warning(f"Model artifacts not built, the model can't be loaded: {e}")
+            return
+        if isinstance(estimator, GradientBoostingClassifier):
+            HappyModel(model_fname=self.model_fname, model_dir=model_dir)
+
+    def backend(self, version: str, default: str) -> str:
+        """
+        Args:
+            version (str): A published version.
+            default (str): The backend of the server, a key of BACKENDS.
+
+        Returns:
+            str: The backend serving the version: the default one if it serves the
+                same estimator as the recorded backend (e.g. `lookup` for a `gbc`
+                model) or if none was recorded, else the recorded one.
+
+        Raises:
+            KeyError: If the version is not published.
+        """
+        recorded = self.metadata(version).get("backend")
+        if recorded not in BACKENDS or (
+            BACKENDS[recorded].estimator is BACKENDS[default].estimator
+        ):
+            return default
+        return recorded
+
+    def active_version(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The active version, or None if no version was activated.
+        """
+        try:
+            version = (self.root / ACTIVE_FNAME).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def activate(self, version: str) -> None:
+        """
+        Make a published version the active one.
+
+        Args:
+            version (str): A published version.
+
+        Raises:
+            KeyError: If the version is not published.
+        """
+        self.model_dir(version)
+        tmp_path = self.root / (ACTIVE_FNAME + ".tmp")
+        tmp_path.write_text(version + "\n")
+        os.replace(tmp_path, self.root / ACTIVE_FNAME)
+        logger.info(f"Model {version} activated!")
+
+
+def default_registry() -> ModelRegistry:
+    """
+    Returns:
+        ModelRegistry: The registry of the server, in `MODEL_REGISTRY_DIR`.
+    """
+    return ModelRegistry(Path(os.getenv("MODEL_REGISTRY_DIR", DEFAULT_REGISTRY_DIR)))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line interface of the model registry.
+
+    Args:
+        argv (Optional[List[str]]): The arguments, `sys.argv` if None.
+    """
+    parser = argparse.ArgumentParser(description="Manage the versions of the model")
+    parser.add_argument(
+        "--root",
+        default=str(default_registry().root),
+        help="directory of the registry",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list the published versions")
+    publish = commands.add_parser("publish", help="publish a trained model")
+    publish.add_argument("model_path", type=Path, help="the model file")
+    publish.add_argument(
+        "--activate", action="store_true", help="activate the new version"
+    )
+    publish.add_argument(
+        "--backend", choices=sorted(BACKENDS), help="the backend of the model"
+    )
+    activate = commands.add_parser("activate", help="activate a published version")
+    activate.add_argument("version")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(Path(args.root))
+    if args.command == "list":
+        active = registry.active_version()
+        for version in registry.list_versions():
+            print(f"{'*' if version == active else ' '} {version}")
+    elif args.command == "publish":
+        version = registry.publish(args.model_path, backend=args.backend)
+        if args.activate:
+            registry.activate(version)
+        print(version)
+    else:
+        try:
+            registry.activate(args.version)
+        except KeyError:
+            parser.error(f"unknown version: {args.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+from src.app.database import RATING_COLUMNS, get_database_url, stream_training_rows
+from src.app.logger import logger
+from src.app.model import BACKENDS, MODEL_DIR, train_estimator
+from src.app.registry import ModelRegistry, default_registry
+
+# Directory of the dataset
+DATA_DIR = Path(__file__).resolve().parent.parent.absolute() / "data"
+
+
+def in_holdout(ids: np.ndarray, fraction: float) -> np.ndarray:
+    """
+    Assign stored predictions to the holdout set by a hash of their id, so that a
+    prediction is held out by every run: a version published by the retraining never
+    saw the holdout rows it is evaluated on.
+
+    Args:
+        ids (np.ndarray): Ids of the predictions.
+        fraction (float): Fraction of the predictions held out.
+
+    Returns:
+        np.ndarray: Whether each prediction is held out.
+
+    >>> in_holdout(np.arange(1, 11), 0.2).tolist()
+    [False, False, False, False, True, False, False, False, False, True]
+    """
+    hashes = (ids.astype(np.uint64) * np.uint64(2654435761)) % np.uint64(2**32)
+    return hashes < np.uint64(fraction * 2**32)
+
+
+def load_training_data(
+    database_url: str,
+    data_fname: str = "happy_data.csv",
+    chunk_size: int = 10000,
+    include_predictions: bool = False,
+    holdout: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Gather the training data: the survey dataset, followed by the stored predictions
+    with a reported happiness, read from the database a chunk at a time into
+    compact arrays. Only predictions with a reported happiness are held out for
+    the evaluation: the survey dataset is the training data of the default model,
+    and predicted labels are no ground truth.
+
+    Args:
+        database_url (str): Database URL.
+        data_fname (str): The filename of the survey dataset.
+        chunk_size (int): Number of rows read from the database at a time.
+        include_predictions (bool): Also train on the stored predictions without
+            a reported happiness, labelled with their prediction.
+        holdout (float): Fraction of the predictions with a reported happiness
+            held out, see `in_holdout`.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: The ratings, of shape
+            (n_samples, N_FEATURES), the happiness and whether each row is held out.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(DATA_DIR / data_fname)
+    chunks = [df[list(RATING_COLUMNS) + ["happiness"]].to_numpy(dtype=np.int8)]
+    held_out = [np.zeros(len(df), dtype=bool)]
+    for rows in stream_training_rows(database_url, chunk_size, include_predictions):
+        chunk = np.asarray(rows, dtype=np.int64)
+        chunks.append(chunk[:, 1:-1].astype(np.int8))
+        held_out.append(chunk[:, -1].astype(bool) & in_holdout(chunk[:, 0], holdout))
+    data = np.concatenate(chunks)
+    return data[:, :-1], data[:, -1], np.concatenate(held_out)
+
+
+def current_model_path(registry: ModelRegistry) -> Path:
+    """
+    Args:
+        registry (ModelRegistry): The model registry.
+
+    Returns:
+        Path: The model file of the active version, or of the default model if no
+            version is active.
+    """
+    version = registry.active_version()
+    if version is None:
+        return MODEL_DIR / registry.model_fname
+    return registry.model_dir(version) / registry.model_fname
+
+
+def peak_memory_mb() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: Peak resident memory of the current process in MiB, or None
+            where it is not available (the `resource` module is Unix only).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def retrain(
+    database_url: str,
+    registry_root: Path,
+    baseline_path: Optional[Path] = None,
+    chunk_size: int = 10000,
+    include_predictions: bool = False,
+    holdout: float = 0.2,
+    min_improvement: float = 0.0,
+    activate: bool = False,
+    backend: str = "gbc",
+) -> Dict[str, Any]:
+    """
+    Train a model on the survey dataset and the stored predictions, evaluate it
+    against the current model on the held out predictions with a reported
+    happiness, and publish it as a new version of the registry only if it is more
+    accurate. Nothing is published until some predictions are held out.
+
+    Args:
+        database_url (str): Database URL.
+        registry_root (Path): The directory of the model registry.
+        baseline_path (Optional[Path]): The model file to beat, the active version
+            (or the default model) if None.
+        chunk_size (int): Number of rows read from the database at a time.
+        include_predictions (bool): Also train on the stored predictions without
+            a reported happiness, labelled with their prediction.
+        holdout (float): Fraction of the predictions with a reported happiness
+            kept for the evaluation.
+        min_improvement (float): Accuracy the new model must gain to be published.
+        activate (bool): Whether to activate the published version.
+        backend (str): The backend of the trained model, a key of BACKENDS, recorded
+            in the metadata of the published version.
+
+    Returns:
+        Dict[str, Any]: The published version (None if the model was not published),
+            the accuracies (None without holdout rows), the number of rows, the
+            durations of the steps in seconds and the peak memory in MiB (None if
+            not available).
+    """
+    registry = ModelRegistry(registry_root)
+    baseline_path = baseline_path or current_model_path(registry)
+    started = time.perf_counter()
+
+    X, y, held_out = load_training_data(
+        database_url,
+        chunk_size=chunk_size,
+        include_predictions=include_predictions,
+        holdout=holdout,
+    )
+    X_train, y_train = X[~held_out], y[~held_out]
+    X_holdout, y_holdout = X[held_out], y[held_out]
+    loaded = time.perf_counter()
+
+    candidate = train_estimator(X_train, y_train, backend)
+    trained = time.perf_counter()
+
+    accuracy: Optional[float] = None
+    baseline_accuracy: Optional[float] = None
+    if len(y_holdout):
+        accuracy = float(np.mean(candidate.predict(X_holdout) == y_holdout))
+        baseline = joblib.load(baseline_path)
+        baseline_accuracy = float(np.mean(baseline.predict(X_holdout) == y_holdout))
+
+    result: Dict[str, Any] = {
+        "published": None,
+        "accuracy": accuracy,
+        "baseline_accuracy": baseline_accuracy,
+        "train_rows": len(y_train),
+        "holdout_rows": len(y_holdout),
+        "load_seconds": loaded - started,
+        "train_seconds": trained - loaded,
+        "evaluation_seconds": time.perf_counter() - trained,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    if (
+        accuracy is not None
+        and baseline_accuracy is not None
+        and accuracy > baseline_accuracy + min_improvement
+    ):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = Path(tmp_dir) / registry.model_fname
+            joblib.dump(candidate, model_path)
+            result["published"] = registry.publish(
+                model_path, {**result, "baseline": str(baseline_path)}, backend
+            )
+        if activate:
+            registry.activate(result["published"])
+    logger.info(
+        f"Retrained in {result['train_seconds']:.3f}s: accuracy {accuracy} "
+        f"(current {baseline_accuracy}) on {len(y_holdout)} rows, "
+        f"{'published ' + result['published'] if result['published'] else 'not published'}"
+    )
+    return result
+
+
+async def retrain_in_process(**kwargs: Any) -> Dict[str, Any]:
+    """
+    Run `retrain` in a separate process, so that training doesn't compete with
+    the event loop for the interpreter.
+
+    Args:
+        **kwargs (Any): The arguments of `retrain`.
+
+    Returns:
+        Dict[str, Any]: The result of `retrain`.
+    """
+    # Forking a process with running threads is unsafe, start a fresh interpreter
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return await asyncio.get_running_loop().run_in_executor(
+            pool, partial(retrain, **kwargs)
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line interface of the retraining job.
+
+    Args:
+        argv (Optional[List[str]]): The arguments, `sys.argv` if None.
+    """
+    parser = argparse.ArgumentParser(
+        description="Retrain the model on the stored predictions"
+    )
+    parser.add_argument("--database-url", default=get_database_url())
+    parser.add_argument("--registry", default=str(default_registry().root))
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument(
+        "--include-predictions",
+        action="store_true",
+        help="also train on the predictions without a reported happiness",
+    )
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--min-improvement", type=float, default=0.0)
+    parser.add_argument(
+        "--activate", action="store_true", help="activate the published version"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default=os.getenv("MODEL_BACKEND", "lookup"),
+        help="the backend of the model (default: MODEL_BACKEND)",
+    )
+    args = parser.parse_args(argv)
+
+    result = retrain(
+        args.database_url,
+        Path(args.registry),
+        chunk_size=args.chunk_size,
+        include_predictions=args.include_predictions,
+        holdout=args.holdout,
+        min_improvement=args.min_improvement,
+        activate=args.activate,
+        backend=args.backend,
+    )
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+import argparse
+import json
+import pickle
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.logger import logger
+from src.app.model import BACKENDS, HappyModel, input_space
+
+# Estimator families of the search and their hyperparameter distributions
+SEARCH_SPACES: Dict[str, Dict[str, List[Any]]] = {
+    "gbc": {
+        "n_estimators": [10, 25, 50, 100, 200],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_depth": [1, 2, 3, 4, 5],
+        "max_features": ["sqrt", None],
+        "subsample": [0.7, 1.0],
+    },
+    "hgbc": {
+        "max_iter": [10, 25, 50, 100, 200],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_depth": [None, 2, 3, 5],
+        "max_leaf_nodes": [7, 15, 31],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+}
+
+
+@dataclass
+class Candidate:
+    """
+    A model of the search with its quality and its serving costs.
+
+    Attributes:
+        family (str): The estimator family, a key of SEARCH_SPACES or "current".
+        params (Dict[str, Any]): The hyperparameters.
+        accuracy (float): Mean cross-validated accuracy.
+        accuracy_std (float): Standard deviation of the accuracy across the folds.
+        latency_us (float): Median latency of a single-row prediction in microseconds.
+        latency_p99_us (float): 99th percentile latency of a single-row prediction.
+        batch_latency_us (float): Latency per row of a prediction for the whole input space.
+        size_bytes (int): Size of the pickled model.
+        pareto (bool): Whether no other candidate is both more accurate and faster.
+        estimator (Any): The model, fitted on the whole dataset.
+    """
+
+    family: str
+    params: Dict[str, Any]
+    accuracy: float
+    accuracy_std: float
+    latency_us: float = 0.0
+    latency_p99_us: float = 0.0
+    batch_latency_us: float = 0.0
+    size_bytes: int = 0
+    pareto: bool = False
+    estimator: Any = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: The candidate without its model, JSON compatible.
+        """
+        result = asdict(self)
+        del result["estimator"]
+        result["params"] = {key: _to_json(value) for key, value in self.params.items()}
+        return result
+
+
+def _to_json(value: Any) -> Any:
+    """
+    Convert a hyperparameter to a JSON compatible value.
+
+    Args:
+        value (Any): The hyperparameter.
+
+    Returns:
+        Any: The value, NumPy scalars converted to Python ones.
+    """
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def make_estimator(family: str, random_state: int = 42) -> Any:
+    """
+    Args:
+        family (str): A key of SEARCH_SPACES.
+        random_state (int): Seed of the estimator.
+
+    Returns:
+        Any: An unfitted estimator of the family.
+    """
+    from sklearn.ensemble import (
+        GradientBoostingClassifier,
+        HistGradientBoostingClassifier,
+    )
+
+    if family == "gbc":
+        return GradientBoostingClassifier(random_state=random_state)
+    if family == "hgbc":
+        return HistGradientBoostingClassifier(
+            early_stopping=False, random_state=random_state
+        )
+    raise ValueError(f"Unknown estimator family: {family}")
+
+
+def measure_latency(
+    estimator: Any, X: np.ndarray, repeats: int = 200
+) -> Tuple[float, float, float]:
+    """
+    Measure the prediction latency of a fitted model, one row at a time (as
+    `/predict` does without the lookup table) and for a large batch.
+
+    Args:
+        estimator (Any): The fitted model.
+        X (np.ndarray): Rows to predict, the whole input space.
+        repeats (int): Number of single-row predictions.
+
+    Returns:
+        Tuple[float, float, float]: Median and 99th percentile latency of a single-row
+            prediction, and latency per row of a batch, in microseconds.
+    """
+    rows = X[np.random.default_rng(0).integers(len(X), size=repeats)]
+    estimator.predict_proba(rows[:1])
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        estimator.predict_proba(rows[i : i + 1])
+        timings[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    estimator.predict_proba(X)
+    batch_time = time.perf_counter() - start
+
+    latency, latency_p99 = np.percentile(timings, [50, 99]) * 1e6
+    return float(latency), float(latency_p99), batch_time / len(X) * 1e6
+
+
+def mark_pareto_front(candidates: Sequence[Candidate]) -> None:
+    """
+    Mark the candidates which are not dominated: no other candidate is at least
+    as accurate and as fast, and better on one of them.
+
+    Args:
+        candidates (Sequence[Candidate]): The measured candidates.
+    """
+    for candidate in candidates:
+        candidate.pareto = not any(
+            other.accuracy >= candidate.accuracy
+            and other.latency_us <= candidate.latency_us
+            and (
+                other.accuracy > candidate.accuracy
+                or other.latency_us < candidate.latency_us
+            )
+            for other in candidates
+        )
+
+
+def search(
+    X: np.ndarray,
+    y: np.ndarray,
+    families: Sequence[str] = ("gbc", "hgbc"),
+    method: str = "halving",
+    n_iter: int = 20,
+    cv: int = 5,
+    n_jobs: Optional[int] = -1,
+    top: int = 5,
+    current: Optional[Any] = None,
+    random_state: int = 42,
+) -> List[Candidate]:
+    """
+    Search the hyperparameters of each estimator family with cross-validation,
+    in parallel, then refit the best configurations on the whole dataset and
+    measure their serving costs.
+
+    Args:
+        X (np.ndarray): Array of shape (n_samples, N_FEATURES) with the ratings.
+        y (np.ndarray): The happiness of the samples.
+        families (Sequence[str]): Keys of SEARCH_SPACES.
+        method (str): "random" (randomized search) or "halving" (successive halving,
+            the candidates which score worst on few samples are dropped early).
+        n_iter (int): Number of configurations drawn per family.
+        cv (int): Number of cross-validation folds.
+        n_jobs (Optional[int]): Number of parallel jobs, all the CPUs if -1.
+        top (int): Number of best configurations kept per family.
+        current (Optional[Any]): The current model, evaluated with the same folds.
+        random_state (int): Seed of the search.
+
+    Returns:
+        List[Candidate]: The candidates, most accurate first.
+    """
+    from sklearn.base import clone
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import (
+        HalvingRandomSearchCV,
+        RandomizedSearchCV,
+        StratifiedKFold,
+        cross_val_score,
+    )
+
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    candidates: List[Candidate] = []
+    for family in families:
+        started = time.perf_counter()
+        if method == "halving":
+            searcher = HalvingRandomSearchCV(
+                make_estimator(family, random_state),
+                SEARCH_SPACES[family],
+                n_candidates=n_iter,
+                cv=folds,
+                n_jobs=n_jobs,
+                random_state=random_state,
+                refit=False,
+            )
+        elif method == "random":
+            searcher = RandomizedSearchCV(
+                make_estimator(family, random_state),
+                SEARCH_SPACES[family],
+                n_iter=n_iter,
+                cv=folds,
+                n_jobs=n_jobs,
+                random_state=random_state,
+                refit=False,
+            )
+        else:
+            raise ValueError(f"Unknown search method: {method}")
+        searcher.fit(X, y)
+        logger.info(
+            f"Searched {family} in {time.perf_counter() - started:.1f}s "
+            f"({len(searcher.cv_results_['params'])} configurations evaluated)"
+        )
+
+        results = searcher.cv_results_
+        if method == "halving":
+            # Only the configurations of the last round were scored on all the samples
+            last = results["iter"] == results["iter"].max()
+        else:
+            last = np.ones(len(results["params"]), dtype=bool)
+        ranked = sorted(
+            np.flatnonzero(last), key=lambda i: -results["mean_test_score"][i]
+        )
+        for i in ranked[:top]:
+            candidates.append(
+                Candidate(
+                    family=family,
+                    params=results["params"][i],
+                    accuracy=float(results["mean_test_score"][i]),
+                    accuracy_std=float(results["std_test_score"][i]),
+                    estimator=clone(make_estimator(family, random_state)).set_params(
+                        **results["params"][i]
+                    ),
+                )
+            )
+
+    if current is not None:
+        scores = cross_val_score(clone(current), X, y, cv=folds, n_jobs=n_jobs)
+        candidates.append(
+            Candidate(
+                family="current",
+                params={},
+                accuracy=float(scores.mean()),
+                accuracy_std=float(scores.std()),
+                estimator=clone(current),
+            )
+        )
+
+    # Measured one at a time, so that the latencies don't include contention
+    space = input_space()
+    for candidate in candidates:
+        candidate.estimator.fit(X, y)
+        (
+            candidate.latency_us,
+            candidate.latency_p99_us,
+            candidate.batch_latency_us,
+        ) = measure_latency(candidate.estimator, space)
+        candidate.size_bytes = len(
+            pickle.dumps(candidate.estimator, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+    mark_pareto_front(candidates)
+    return sorted(candidates, key=lambda candidate: -candidate.accuracy)
+
+
+def select(
+    candidates: Sequence[Candidate], max_latency_us: Optional[float] = None
+) -> Optional[Candidate]:
+    """
+    Choose the most accurate candidate of the Pareto front within a latency budget.
+
+    Args:
+        candidates (Sequence[Candidate]): The measured candidates.
+        max_latency_us (Optional[float]): Maximum median single-row latency, no limit if None.
+
+    Returns:
+        Optional[Candidate]: The chosen candidate, or None if none fits the budget.
+    """
+    eligible = [
+        candidate
+        for candidate in candidates
+        if candidate.pareto
+        and candidate.family != "current"
+        and (max_latency_us is None or candidate.latency_us <= max_latency_us)
+    ]
+    return max(eligible, key=lambda candidate: candidate.accuracy, default=None)
+
+
+def format_table(candidates: Sequence[Candidate]) -> str:
+    """
+    Args:
+        candidates (Sequence[Candidate]): The measured candidates.
+
+    Returns:
+        str: A text table of the candidates, the Pareto front marked with a star.
+    """
+    header = (
+        f"  {'family':<8}{'accuracy':>14}{'latency us':>12}{'p99 us':>10}"
+        f"{'batch us/row':>14}{'size KiB':>10}  params"
+    )
+    lines = [header]
+    for candidate in candidates:
+        lines.append(
+            f"{'*' if candidate.pareto else ' '} {candidate.family:<8}"
+            f"{candidate.accuracy:>8.3f} ±{candidate.accuracy_std:.3f}"
+            f"{candidate.latency_us:>12.1f}{candidate.latency_p99_us:>10.1f}"
+            f"{candidate.batch_latency_us:>14.2f}{candidate.size_bytes / 1024:>10.1f}"
+            f"  {json.dumps(candidate.to_dict()['params'])}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line interface of the hyperparameter search.
+
+    Args:
+        argv (Optional[List[str]]): The arguments, `sys.argv` if None.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m src.app.cli train",
+        description="Search the hyperparameters of the model and compare the "
+        "candidates on accuracy, latency and size",
+    )
+    parser.add_argument(
+        "--family",
+        action="append",
+        choices=sorted(SEARCH_SPACES),
+        help="estimator family to search, repeatable (default: all)",
+    )
+    parser.add_argument("--method", choices=("halving", "random"), default="halving")
+    parser.add_argument("--n-iter", type=int, default=20)
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument(
+        "--max-latency-us",
+        type=float,
+        help="latency budget of the selected candidate",
+    )
+    parser.add_argument("--output", type=Path, help="write the results as JSON")
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="publish the selected candidate to the model registry",
+    )
+    args = parser.parse_args(argv)
+
+    happy_model = HappyModel(compiled=False)
+    X = happy_model.df.drop("happiness", axis=1).values
+    y = happy_model.df["happiness"].values
+    candidates = search(
+        X,
+        y,
+        families=args.family or sorted(SEARCH_SPACES),
+        method=args.method,
+        n_iter=args.n_iter,
+        cv=args.cv,
+        n_jobs=args.n_jobs,
+        top=args.top,
+        current=happy_model.model,
+    )
+    selected = select(candidates, args.max_latency_us)
+
+    print(format_table(candidates))
+    if selected is None:
+        print("No candidate fits the latency budget")
+    else:
+        print(f"Selected: {selected.family} {json.dumps(selected.to_dict()['params'])}")
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "candidates": [candidate.to_dict() for candidate in candidates],
+                    "selected": selected.to_dict() if selected else None,
+                },
+                f,
+                indent=2,
+            )
+
+    if args.publish and selected is not None:
+        import joblib
+
+        from src.app.registry import default_registry
+
+        registry = default_registry()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_path = Path(tmp_dir) / registry.model_fname
+            joblib.dump(selected.estimator, model_path)
+            backend = selected.family if selected.family in BACKENDS else None
+            version = registry.publish(model_path, selected.to_dict(), backend)
+            print(f"Published {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.app.database import save_many_to_db_async
+from src.app.logger import logger
+
+# What to do with a new prediction when the queue is full
+DROP_POLICIES = ("drop_newest", "drop_oldest", "block")
+
+Record = Tuple[Dict[str, int], int, float, Optional[str]]
+
+
+class PredictionWriter:
+    """
+    Write-behind buffer for predictions: requests enqueue their prediction in memory
+    and a background task saves them in batches with multi-row inserts, either when
+    enough predictions are waiting or when the oldest one has waited long enough.
+
+    Attributes:
+        database_url (str): Database URL.
+        max_queue_size (int): Maximum number of predictions waiting to be saved.
+        flush_size (int): Number of predictions which triggers a flush.
+        flush_interval (float): Maximum time a prediction waits before a flush, in seconds.
+        drop_policy (str): What to do when the queue is full, one of DROP_POLICIES:
+            reject the new prediction, evict the oldest one, or wait for room (backpressure).
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        max_queue_size: int = 10000,
+        flush_size: int = 500,
+        flush_interval: float = 0.5,
+        drop_policy: str = "drop_newest",
+    ) -> None:
+        """
+        Class constructor, the background task is started by `start`.
+
+        Args:
+            database_url (str): Database URL.
+            max_queue_size (int): Maximum number of predictions waiting to be saved.
+            flush_size (int): Number of predictions which triggers a flush.
+            flush_interval (float): Maximum time a prediction waits before a flush, in seconds.
+            drop_policy (str): What to do when the queue is full, one of DROP_POLICIES.
+        """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.database_url = database_url
+        self.max_queue_size = max_queue_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Counters
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+
+    async def start(self) -> None:
+        """
+        Start the background task which flushes the queue.
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._closing = False
+        self._task = asyncio.create_task(self._run(self._queue))
+        logger.info("Write-behind queue started!")
+
+    async def put(
+        self,
+        data: Dict[str, int],
+        prediction: int,
+        probability: float,
+        model_version: Optional[str] = None,
+    ) -> bool:
+        """
+        Enqueue a prediction to be saved.
+
+        Args:
+            data (Dict[str, int]): Input data containing survey measurements.
+            prediction (int): The predicted happiness value.
+            probability (float): The prediction probability.
+            model_version (Optional[str]): Version of the model which made the prediction.
+
+        Returns:
+            bool: True if the prediction was enqueued, False if it was dropped.
+        """
+        if self._queue is None or self._closing:
+            self.dropped += 1
+            return False
+
+        record: Record = (data, int(prediction), float(probability), model_version)
+        if self._queue.full():
+            if self.drop_policy == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.drop_policy == "drop_oldest":
+                self._queue.get_nowait()
+                self.dropped += 1
+            else:
+                # Backpressure: wait until the background task makes room
+                await self._queue.put(record)
+                self.queued += 1
+                return True
+
+        self._queue.put_nowait(record)
+        self.queued += 1
+        return True
+
+    async def stop(self) -> None:
+        """
+        Stop accepting predictions, save the ones still waiting and stop the background task.
+        """
+        if self._queue is None or self._task is None:
+            return
+        self._closing = True
+        # Wake up the background task, it drains the queue before exiting
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Write-behind queue drained and stopped!")
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """
+        Background task: collect predictions into batches and flush them.
+
+        Args:
+            queue (asyncio.Queue): The queue of predictions, None marks the end.
+        """
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            record = await queue.get()
+            if record is None:
+                break
+
+            # Wait for more predictions, until the batch is full or the oldest one is due
+            batch: List[Record] = [record]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            await self._flush(batch)
+
+        # Predictions enqueued while stopping
+        batch = []
+        while not queue.empty():
+            record = queue.get_nowait()
+            if record is not None:
+                batch.append(record)
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Record]) -> None:
+        """
+        Save a batch of predictions with a single multi-row insert.
+
+        Args:
+            batch (List[Record]): The predictions to save.
+        """
+        data, predictions, probabilities, model_versions = zip(*batch)
+        start = time.perf_counter()
+        saved = await save_many_to_db_async(
+            self.database_url,
+            list(data),
+            list(predictions),
+            list(probabilities),
+            list(model_versions),
+        )
+        flush_time = time.perf_counter() - start
+
+        self.flushes += 1
+        self.flush_time_total += flush_time
+        self.flush_time_max = max(self.flush_time_max, flush_time)
+        if saved:
+            self.flushed += len(batch)
+        else:
+            self.failed += len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the counters of the queue.
+
+        Returns:
+            Dict[str, Any]: Predictions queued, waiting, flushed, dropped and failed,
+                and the number and latency (in seconds) of the flushes.
+        """
+        return {
+            "queued": self.queued,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "flush_time_total": self.flush_time_total,
+            "flush_time_max": self.flush_time_max,
+        }
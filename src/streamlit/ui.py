@@ -1,10 +1,26 @@
 import os
+import time
+from typing import Dict, List
 
 import requests
+from requests.adapters import HTTPAdapter
 from streamlit_star_rating import st_star_rating
+from urllib3.util.retry import Retry
 
 import streamlit as st
 
+# Scheme of the backend, "https" or "http", probed in this order if unset
+BACKEND_SCHEME = os.getenv("BACKEND_SCHEME", "")
+# Seconds to wait for the connection and for the response
+BACKEND_CONNECT_TIMEOUT = float(os.getenv("BACKEND_CONNECT_TIMEOUT", "3.05"))
+BACKEND_READ_TIMEOUT = float(os.getenv("BACKEND_READ_TIMEOUT", "10"))
+# Retries of the failed connections and of the 503 responses (model loading),
+# waiting BACKEND_BACKOFF * 2^n seconds in between
+BACKEND_RETRIES = int(os.getenv("BACKEND_RETRIES", "3"))
+BACKEND_BACKOFF = float(os.getenv("BACKEND_BACKOFF", "0.3"))
+# Show the round trip time of the predictions
+UI_DEBUG = os.getenv("UI_DEBUG", "false").lower() in ("1", "true", "yes")
+
 
 def get_backend_host() -> str:
     """
@@ -16,9 +32,68 @@ def get_backend_host() -> str:
     return os.getenv("BACKEND_HOST", "127.0.0.1:8080")
 
 
+@st.cache_resource
+def get_session() -> requests.Session:
+    """
+    Create the HTTP session shared by the reruns and the users of the app, which keeps
+    the connections to the backend alive and retries the failed connections.
+
+    Returns:
+        requests.Session: The session.
+    """
+    retry = Retry(
+        total=BACKEND_RETRIES,
+        connect=BACKEND_RETRIES,
+        read=0,
+        # TLS errors mean the backend speaks plain HTTP, fall back right away
+        other=0,
+        status=BACKEND_RETRIES,
+        status_forcelist=(503,),
+        # Only requests which the backend did not handle are retried, POST included
+        allowed_methods=None,
+        backoff_factor=BACKEND_BACKOFF,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+@st.cache_resource
+def known_schemes() -> Dict[str, str]:
+    """
+    Returns:
+        Dict[str, str]: The scheme which worked for each backend host, shared by the
+            reruns and the users of the app.
+    """
+    return {}
+
+
+def get_schemes(backend_host: str) -> List[str]:
+    """
+    Args:
+        backend_host (str): The host of the backend server.
+
+    Returns:
+        List[str]: The schemes to try, the one which worked last first.
+    """
+    if BACKEND_SCHEME:
+        return [BACKEND_SCHEME]
+    schemes = ["https", "http"]
+    known = known_schemes().get(backend_host)
+    if known is not None:
+        schemes.remove(known)
+        schemes.insert(0, known)
+    return schemes
+
+
 def predict(backend_host: str, data: dict, predict_button: bool) -> None:
     """
     Send a prediction request to the backend and display the results in the Streamlit app.
+    The scheme of the backend is probed on the first request (HTTPS, then HTTP) and
+    remembered, so that the next requests reuse a kept-alive connection.
 
     Args:
         backend_host (str): The URL of the backend server.
@@ -26,20 +101,37 @@ def predict(backend_host: str, data: dict, predict_button: bool) -> None:
         predict_button (bool): Whether the prediction button was clicked.
     """
     if predict_button:
+        session = get_session()
+        schemes = get_schemes(backend_host)
         response = None
-        try:
-            # Attempt HTTPS connection
-            response = requests.post(f"https://{backend_host}/predict", json=data)
-            response.raise_for_status()  # Check if the request was successful
-        except (requests.exceptions.SSLError, requests.exceptions.ConnectionError):
+        for scheme in schemes:
             try:
-                # Fallback to HTTP
-                response = requests.post(f"http://{backend_host}/predict", json=data)
-                response.raise_for_status()  # Check if the fallback request was successful
+                start = time.perf_counter()
+                response = session.post(
+                    f"{scheme}://{backend_host}/predict",
+                    json=data,
+                    timeout=(BACKEND_CONNECT_TIMEOUT, BACKEND_READ_TIMEOUT),
+                )
+                round_trip = time.perf_counter() - start
+                known_schemes()[backend_host] = scheme
+                response.raise_for_status()  # Check if the request was successful
+                break
+            except (
+                requests.exceptions.SSLError,
+                requests.exceptions.ConnectionError,
+            ) as e:
+                response = None
+                known_schemes().pop(backend_host, None)
+                if scheme == schemes[-1]:
+                    st.error(f"Failed to connect to the prediction service: {e}")
             except requests.exceptions.RequestException as e:
+                response = None
                 st.error(f"Failed to connect to the prediction service: {e}")
+                break
 
         if response:
+            if UI_DEBUG:
+                st.caption(f"Round trip: {round_trip * 1000:.1f} ms ({scheme})")
             response_dict = response.json()
             prediction = response_dict["prediction"]
             probability = response_dict["probability"]
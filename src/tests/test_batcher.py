@@ -0,0 +1,118 @@
+import asyncio
+from typing import Tuple
+from unittest.mock import AsyncMock
+
+import numpy as np
+import pytest
+
+from src.app.batcher import MicroBatcher
+from src.app.model import HappyModel
+
+
+async def predict_sum(X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fake vectorized model: the prediction is the sum of the ratings.
+
+    Args:
+        X (np.ndarray): The ratings.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The sums and constant probabilities.
+    """
+    return X.sum(axis=1), np.full(len(X), 0.5)
+
+
+def test_batcher_invalid_size() -> None:
+    """
+    Test that batches without room are rejected.
+    """
+    with pytest.raises(ValueError):
+        MicroBatcher(predict_sum, max_size=0)
+
+
+@pytest.mark.asyncio
+async def test_batcher_fills_batches() -> None:
+    """
+    Test that concurrent requests are grouped into full batches and get their own result.
+    """
+    predict = AsyncMock(side_effect=predict_sum)
+    batcher = MicroBatcher(predict, max_wait_ms=1000, max_size=4)
+
+    results = await asyncio.gather(*(batcher.submit([i] * 6) for i in range(8)))
+
+    assert results == [(6 * i, 0.5) for i in range(8)]
+    assert predict.await_count == 2
+    stats = batcher.stats()
+    assert (stats["requests"], stats["batches"], stats["pending"]) == (8, 2, 0)
+    assert stats["batch_size_mean"] == 4
+    assert stats["batch_sizes"]["4"] == 2
+
+
+@pytest.mark.asyncio
+async def test_batcher_dispatches_after_max_wait() -> None:
+    """
+    Test that a partial batch is dispatched once its first request waited long enough.
+    """
+    batcher = MicroBatcher(predict_sum, max_wait_ms=5, max_size=100)
+
+    results = await asyncio.gather(*(batcher.submit([1] * 6) for _ in range(3)))
+
+    assert results == [(6, 0.5)] * 3
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_sizes"]["4"] == 1
+    assert stats["queue_delay_max"] >= 0.004
+
+
+@pytest.mark.asyncio
+async def test_batcher_failure() -> None:
+    """
+    Test that an error of a batch is raised in every request of the batch.
+    """
+    batcher = MicroBatcher(
+        AsyncMock(side_effect=RuntimeError("boom")), max_wait_ms=1, max_size=2
+    )
+
+    results = await asyncio.gather(
+        *(batcher.submit([1] * 6) for _ in range(2)), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert batcher.stats()["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_batcher_stop_flushes_pending() -> None:
+    """
+    Test that stopping the batcher dispatches the requests still waiting.
+    """
+    batcher = MicroBatcher(predict_sum, max_wait_ms=60000, max_size=100)
+
+    request = asyncio.ensure_future(batcher.submit([2] * 6))
+    await asyncio.sleep(0)
+    await batcher.stop()
+
+    assert await request == (12, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_happy_model_uses_batcher() -> None:
+    """
+    Test that the model's single predictions go through its batcher and match the
+    predictions made without it.
+    """
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    ratings = [[4, 3, 5, 2, 4, 1], [1, 1, 1, 1, 1, 1], [5, 5, 5, 5, 5, 5]]
+    expected = [await model.predict_happiness(*row) for row in ratings]
+
+    batcher = MicroBatcher(model.predict_happiness_batch, max_wait_ms=1, max_size=8)
+    model.batcher_ = batcher
+    try:
+        results = await asyncio.gather(
+            *(model.predict_happiness(*row) for row in ratings)
+        )
+    finally:
+        model.batcher_ = None
+
+    assert results == expected
+    assert batcher.stats()["batches"] == 1
@@ -0,0 +1,104 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from src.app.cache import PredictionCache
+
+RATINGS = (3, 3, 3, 3, 3, 3)
+
+
+def test_cache_hit_and_miss() -> None:
+    """
+    Test that stored predictions are returned and that lookups are counted.
+    """
+    cache = PredictionCache(max_size=10)
+
+    assert cache.get(RATINGS, "v1") is None
+    cache.put(RATINGS, "v1", (1, 0.8))
+    assert cache.get(RATINGS, "v1") == (1, 0.8)
+    assert cache.get([3, 3, 3, 3, 3, 3], "v1") == (1, 0.8)
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_cache_lru_eviction() -> None:
+    """
+    Test that the least recently used entry is evicted first.
+    """
+    cache = PredictionCache(max_size=2)
+    cache.put((1,) * 6, "v1", (0, 0.5))
+    cache.put((2,) * 6, "v1", (0, 0.6))
+    assert cache.get((1,) * 6, "v1") is not None  # (2,) * 6 is now the oldest
+
+    cache.put((3,) * 6, "v1", (1, 0.7))
+
+    assert cache.get((2,) * 6, "v1") is None
+    assert cache.get((1,) * 6, "v1") == (0, 0.5)
+    assert cache.get((3,) * 6, "v1") == (1, 0.7)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_ttl() -> None:
+    """
+    Test that entries expire after their time to live.
+    """
+    cache = PredictionCache(max_size=2, ttl=10)
+    with patch("src.app.cache.time.monotonic", return_value=100.0):
+        cache.put(RATINGS, "v1", (1, 0.8))
+    with patch("src.app.cache.time.monotonic", return_value=109.0):
+        assert cache.get(RATINGS, "v1") == (1, 0.8)
+    with patch("src.app.cache.time.monotonic", return_value=110.0):
+        assert cache.get(RATINGS, "v1") is None
+
+    stats = cache.stats()
+    assert (stats["expirations"], stats["size"]) == (1, 0)
+
+
+def test_cache_versions() -> None:
+    """
+    Test that entries are only returned for their model version, and that the
+    versions served during a model swap keep their entries.
+    """
+    cache = PredictionCache(max_size=2)
+    cache.put(RATINGS, "v1", (1, 0.8))
+
+    assert cache.get(RATINGS, "v2") is None
+    cache.put(RATINGS, "v2", (0, 0.6))
+    assert cache.get(RATINGS, "v1") == (1, 0.8)
+    assert cache.get(RATINGS, "v2") == (0, 0.6)
+
+    # The entries of the old version are evicted first once it is no longer used
+    cache.put((1,) * 6, "v2", (0, 0.5))
+    assert cache.get(RATINGS, "v1") is None
+    assert cache.get(RATINGS, "v2") == (0, 0.6)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_invalid_size() -> None:
+    """
+    Test that a cache without room is rejected.
+    """
+    with pytest.raises(ValueError):
+        PredictionCache(max_size=0)
+
+
+def test_cache_concurrent_access() -> None:
+    """
+    Test that the counters and the size bound hold under concurrent access.
+    """
+    cache = PredictionCache(max_size=50)
+
+    def work(i: int) -> None:
+        ratings = (1 + i % 5,) * 5 + (1 + i % 3,)
+        if cache.get(ratings, "v1") is None:
+            cache.put(ratings, "v1", (i % 2, 0.5))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(2000)))
+
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == 2000
+    assert stats["size"] <= 15
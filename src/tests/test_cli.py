@@ -0,0 +1,23 @@
+from pathlib import Path
+
+import pytest
+
+from src.app.cli import main
+
+
+def test_main(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    """
+    Test that the commands of the command line are handed over to their module.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        capsys (pytest.CaptureFixture[str]): Captured output.
+    """
+    model_path = tmp_path / "model.pkl"
+    model_path.write_bytes(b"model")
+
+    main(["registry", "--root", str(tmp_path / "registry"), "publish", str(model_path)])
+    assert capsys.readouterr().out == "v1\n"
+
+    with pytest.raises(SystemExit):
+        main(["unknown"])
@@ -0,0 +1,122 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from src.app.executor import InferenceExecutor, _worker_version
+from src.app.model import HappyModel, input_space
+
+
+@pytest.fixture(scope="module")
+def model() -> HappyModel:
+    """
+    Fixture providing the model.
+
+    Returns:
+        HappyModel: The model.
+    """
+    return HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+
+
+def test_executor_invalid_mode() -> None:
+    """
+    Test that an unknown executor mode is rejected.
+    """
+    with pytest.raises(ValueError):
+        InferenceExecutor(mode="gpu")
+
+
+def test_worker_not_initialized() -> None:
+    """
+    Test that a process which didn't load the model reports it.
+    """
+    with pytest.raises(RuntimeError):
+        _worker_version()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "mode, workers",
+    [("inline", None), ("thread", 2), ("process", 1)],
+)
+async def test_executor_predict(model: HappyModel, mode: str, workers: int) -> None:
+    """
+    Test that every executor mode gives the predictions of the model, and counts them.
+
+    Args:
+        model (HappyModel): The model.
+        mode (str): The executor mode.
+        workers (int): Number of threads or processes.
+    """
+    X = input_space()[::1001]
+    expected_predictions, expected_probabilities = model.predict(X)
+
+    executor = InferenceExecutor(mode=mode, workers=workers)
+    await executor.start()
+    try:
+        results = await asyncio.gather(*(executor.predict(model, X) for _ in range(4)))
+    finally:
+        executor.shutdown()
+
+    for predictions, probabilities in results:
+        assert np.array_equal(predictions, expected_predictions)
+        assert np.allclose(probabilities, expected_probabilities)
+
+    stats = executor.stats()
+    assert stats["mode"] == mode
+    assert (stats["submitted"], stats["completed"], stats["in_flight"]) == (4, 4, 0)
+    assert stats["execution_time_total"] > 0
+    if mode == "inline":
+        assert stats["workers"] == 1
+        assert stats["max_queue_depth"] == 0
+    else:
+        assert stats["max_queue_depth"] == 4 - workers
+
+
+@pytest.mark.asyncio
+async def test_executor_predict_after_shutdown(model: HappyModel) -> None:
+    """
+    Test that predictions submitted while the pool is shut down are computed inline.
+
+    Args:
+        model (HappyModel): The model.
+    """
+    X = input_space()[::1001]
+    expected_predictions, _ = model.predict(X)
+
+    executor = InferenceExecutor(mode="thread", workers=1)
+    await executor.start()
+    # The pool is shut down between the moment it is read and the submission
+    assert executor._pool is not None
+    executor._pool.shutdown(wait=True)
+    predictions, _ = await executor.predict(model, X)
+    executor.shutdown()
+    predictions_after, _ = await executor.predict(model, X)
+
+    assert np.array_equal(predictions, expected_predictions)
+    assert np.array_equal(predictions_after, expected_predictions)
+    assert executor.stats()["failed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_happy_model_uses_executor(model: HappyModel) -> None:
+    """
+    Test that the model computes its predictions with its executor when it has one.
+
+    Args:
+        model (HappyModel): The model.
+    """
+    expected = await model.predict_happiness(4, 3, 5, 2, 4, 1)
+
+    executor = InferenceExecutor(mode="thread", workers=1)
+    await executor.start()
+    model.executor_ = executor
+    try:
+        assert await model.predict_happiness(4, 3, 5, 2, 4, 1) == expected
+        predictions, _ = await model.predict_happiness_batch(input_space()[:10])
+    finally:
+        model.executor_ = None
+        executor.shutdown()
+
+    assert len(predictions) == 10
+    assert executor.stats()["completed"] == 2
@@ -0,0 +1,203 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, List
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import pytest_asyncio
+
+from src.app.database import (
+    RATING_COLUMNS,
+    dispose_async_engines,
+    init_db_async,
+    save_many_to_db_async,
+)
+from src.app.export import (
+    EXPORT_COLUMNS,
+    export_chunks,
+    gzip_chunks,
+    stream_rows,
+)
+
+
+async def collect(chunks: AsyncIterator[bytes]) -> bytes:
+    """
+    Collect a stream of bytes.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The stream.
+
+    Returns:
+        bytes: The concatenated stream.
+    """
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest_asyncio.fixture
+async def database_url(tmp_path: Path) -> AsyncIterator[str]:
+    """
+    Fixture providing a SQLite database with 12 predictions.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Yields:
+        str: URL of the database.
+    """
+    database_url = f"sqlite:///{tmp_path / 'predictions.db'}"
+    data = [{column: 1 + i % 5 for column in RATING_COLUMNS} for i in range(12)]
+    assert await init_db_async(database_url)
+    await save_many_to_db_async(
+        database_url, data, [i % 2 for i in range(12)], [0.75] * 12
+    )
+    try:
+        yield database_url
+    finally:
+        await dispose_async_engines()
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_chunks(database_url: str) -> None:
+    """
+    Test that the rows are read in chunks, in the order of their ids.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    chunks = [rows async for rows in stream_rows(database_url, chunk_size=5)]
+
+    assert [len(rows) for rows in chunks] == [5, 5, 2]
+    assert [row[0] for rows in chunks for row in rows] == list(range(1, 13))
+    assert len(chunks[0][0]) == len(EXPORT_COLUMNS)
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_error(database_url: str) -> None:
+    """
+    Test that a database error during the export is logged and ends the stream.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+
+    async def partitions() -> AsyncIterator[List[tuple]]:
+        yield [(1,) * len(EXPORT_COLUMNS)]
+        raise RuntimeError("connection lost")
+
+    session = AsyncMock()
+    session.stream.return_value = MagicMock(partitions=partitions)
+    with (
+        patch("src.app.export.get_async_session", return_value=session),
+        patch("src.app.export.logger") as mock_logger,
+    ):
+        chunks = [rows async for rows in stream_rows(database_url)]
+
+    assert len(chunks) == 1
+    session.close.assert_awaited_once()
+    mock_logger.error.assert_called_once_with(
+        "Error exporting data from database: connection lost"
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_rows_filters(database_url: str) -> None:
+    """
+    Test the id and creation time ranges of the export.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    rows: List = []
+    async for chunk in stream_rows(database_url, min_id=3, max_id=6):
+        rows.extend(chunk)
+    assert [row[0] for row in rows] == [3, 4, 5, 6]
+
+    now = datetime.now(timezone.utc)
+    rows = []
+    async for chunk in stream_rows(database_url, start=now - timedelta(hours=1)):
+        rows.extend(chunk)
+    assert len(rows) == 12
+
+    rows = []
+    async for chunk in stream_rows(database_url, end=now - timedelta(hours=1)):
+        rows.extend(chunk)
+    assert rows == []
+
+
+@pytest.mark.asyncio
+async def test_export_csv(database_url: str) -> None:
+    """
+    Test the CSV export.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    content = await collect(
+        export_chunks(stream_rows(database_url, chunk_size=5), "csv")
+    )
+
+    lines = list(csv.reader(io.StringIO(content.decode())))
+    assert lines[0] == list(EXPORT_COLUMNS)
+    assert len(lines) == 13
+    assert lines[2][:8] == ["2", "2", "2", "2", "2", "2", "2", "1"]
+    assert float(lines[2][8]) == 0.75
+    assert datetime.fromisoformat(lines[2][9])
+
+
+@pytest.mark.asyncio
+async def test_export_csv_empty(database_url: str) -> None:
+    """
+    Test that an empty CSV export still has its header.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    content = await collect(export_chunks(stream_rows(database_url, min_id=100), "csv"))
+
+    assert content.decode() == ",".join(EXPORT_COLUMNS) + "\n"
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_gzip(database_url: str) -> None:
+    """
+    Test the NDJSON export, compressed with gzip.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    content = await collect(
+        gzip_chunks(export_chunks(stream_rows(database_url, chunk_size=5), "ndjson"))
+    )
+
+    records = [json.loads(line) for line in gzip.decompress(content).splitlines()]
+    assert len(records) == 12
+    assert list(records[0]) == list(EXPORT_COLUMNS)
+    assert records[0]["id"] == 1
+    assert records[0]["city_services"] == 1
+    assert records[0]["probability"] == 0.75
+
+
+@pytest.mark.asyncio
+async def test_export_parquet(database_url: str) -> None:
+    """
+    Test the Parquet export, which writes a row group per chunk.
+
+    Args:
+        database_url (str): URL of the test database.
+    """
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    content = await collect(
+        export_chunks(stream_rows(database_url, chunk_size=5), "parquet")
+    )
+
+    parquet_file = pq.ParquetFile(io.BytesIO(content))
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == list(EXPORT_COLUMNS)
+    assert table.column("id").to_pylist() == list(range(1, 13))
+    assert table.column("prediction").to_pylist() == [i % 2 for i in range(12)]
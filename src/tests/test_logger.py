@@ -0,0 +1,95 @@
+import json
+import logging
+import logging.handlers
+import queue
+from unittest.mock import MagicMock, patch
+
+from src.app import log_config
+from src.app.logger import DeferredQueueHandler, JsonFormatter, SamplingFilter
+
+
+def make_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    """
+    Create a log record.
+
+    Args:
+        message (str): The message.
+        level (int): The level.
+
+    Returns:
+        logging.LogRecord: The record.
+    """
+    return logging.LogRecord("test", level, __file__, 1, message, None, None)
+
+
+def test_sampling_filter() -> None:
+    """
+    Test that only the sampled messages are sampled, one out of every `1 / rate`,
+    and that warnings are always kept.
+    """
+    sampling = SamplingFilter(0.25, ["Request handled"])
+
+    kept = [
+        sampling.filter(make_record("Request handled successfully!")) for _ in range(8)
+    ]
+    assert kept == [True, False, False, False] * 2
+    assert all(sampling.filter(make_record("Model ready")) for _ in range(4))
+    assert all(
+        sampling.filter(make_record("Request handled", logging.WARNING))
+        for _ in range(4)
+    )
+
+    assert SamplingFilter(1).filter(make_record("Request handled successfully!"))
+    assert not SamplingFilter(0).filter(make_record("Request handled successfully!"))
+
+
+def test_json_formatter() -> None:
+    """
+    Test that records are formatted as single-line JSON objects.
+    """
+    record = make_record("Model %s served!")
+    record.args = ("v1",)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Model v1 served!"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "test"
+
+
+def test_queue_handler() -> None:
+    """
+    Test that queued records are written by the background listener.
+    """
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    handler = MagicMock(spec=logging.Handler, level=logging.NOTSET)
+    listener = logging.handlers.QueueListener(records, handler)
+    test_logger = logging.getLogger("test_queue_handler")
+    test_logger.addHandler(DeferredQueueHandler(records))
+
+    listener.start()
+    try:
+        test_logger.warning("Model %s served!", "v1")
+    finally:
+        listener.stop()
+
+    handler.handle.assert_called_once()
+    assert handler.handle.call_args[0][0].getMessage() == "Model v1 served!"
+
+
+def test_logging_config_queue() -> None:
+    """
+    Test that the uvicorn loggers go through the queue in queue mode.
+    """
+    with (
+        patch("src.app.logger.LOG_QUEUE", True),
+        patch("src.app.logger.start_listener") as mock_start_listener,
+    ):
+        config = log_config.get_logging_config()
+
+    mock_start_listener.assert_called_once()
+    assert list(config["handlers"]) == ["queue_handler"]
+    assert config["loggers"]["uvicorn.access"]["handlers"] == ["queue_handler"]
+    assert config["loggers"]["uvicorn.access"]["filters"] == ["access_sampling"]
+    assert config["filters"]["access_sampling"]["messages"] == (
+        log_config.ACCESS_LOG_MESSAGES
+    )
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.app.metrics import (
+    REQUESTS,
+    Counter,
+    EventLoopLagMonitor,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+)
+
+
+def test_histogram() -> None:
+    """Tests that the observations are counted in cumulative buckets."""
+    histogram = Histogram("test_seconds", "Test durations.", ("stage",), (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.labels("inference").observe(value)
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test durations.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{stage="inference",le="0.1"} 2',
+        'test_seconds_bucket{stage="inference",le="1"} 3',
+        'test_seconds_bucket{stage="inference",le="+Inf"} 4',
+        'test_seconds_sum{stage="inference"} 5.65',
+        'test_seconds_count{stage="inference"} 4',
+    ]
+
+
+def test_histogram_time() -> None:
+    """Tests that the timer observes the duration of its block, even if it raises."""
+    histogram = Histogram("test_seconds", "Test durations.")
+
+    with pytest.raises(ValueError), histogram.labels().time():
+        time.sleep(0.01)
+        raise ValueError
+
+    child = histogram.labels()
+    assert sum(child.counts) == 1
+    assert child.sum >= 0.01
+
+
+def test_registry_render() -> None:
+    """Tests the exposition format of counters and gauges."""
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("test_total", "Test count.", ("route",)))
+    gauge = registry.register(Gauge("test_in_flight", "Test gauge."))
+    counter.labels('/say "hi"').inc()
+    counter.labels('/say "hi"').inc(2)
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+
+    assert registry.render().splitlines() == [
+        "# HELP test_total Test count.",
+        "# TYPE test_total counter",
+        'test_total{route="/say \\"hi\\""} 3',
+        "# HELP test_in_flight Test gauge.",
+        "# TYPE test_in_flight gauge",
+        "test_in_flight 1",
+    ]
+    with pytest.raises(ValueError):
+        registry.register(Gauge("test_in_flight", "Duplicate."))
+    with pytest.raises(ValueError):
+        counter.labels()
+
+
+def test_middleware() -> None:
+    """Tests that the requests are counted by route template and status."""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int) -> dict:
+        return {"item_id": item_id}
+
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+    assert REQUESTS.labels("/items/{item_id}", "GET", "200").value == 2
+    assert REQUESTS.labels("unmatched", "GET", "404").value >= 1
+
+
+def block_event_loop(seconds: float) -> None:
+    """Blocks the running event loop, as a synchronous handler would."""
+    time.sleep(seconds)
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_monitor() -> None:
+    """Tests that the lag of the event loop is measured when it is blocked."""
+    gauge = Gauge("test_lag_seconds", "Test lag.")
+    histogram = Histogram("test_lag_duration_seconds", "Test lags.")
+    monitor = EventLoopLagMonitor(0.01, gauge, histogram)
+
+    monitor.start()
+    await asyncio.sleep(0)
+    block_event_loop(0.05)
+    await asyncio.sleep(0.02)
+    await monitor.stop()
+
+    assert gauge.labels().value >= 0
+    assert histogram.labels().sum >= 0.03
@@ -1,10 +1,26 @@
+import subprocess
+import sys
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import joblib
 import numpy as np
 import pandas as pd
 import pytest
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
 
-from src.app.model import HappyModel, SurveyMeasurement
+from src.app.model import (
+    BACKENDS,
+    LOOKUP_SIZE,
+    MODEL_DIR,
+    CompiledModel,
+    HappyModel,
+    SurveyMeasurement,
+    input_space,
+    load_arrays,
+    lookup_index,
+)
 
 
 # Test SurveyMeasurement
@@ -50,20 +66,30 @@ def test_happy_model_initialization_load_model(
     mock_model = MagicMock()
     mock_load.return_value = mock_model
 
-    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    model = HappyModel(
+        data_fname="happy_data.csv", model_fname="happy_model.pkl", compiled=False
+    )
 
     # Assertions
-    mock_read_csv.assert_called_once()
+    mock_read_csv.assert_not_called()  # The dataset is not needed to serve a trained model
     mock_load.assert_called_once()
-    assert model.df.equals(mock_df)
     assert model.model == mock_model
 
+    # The dataset is loaded once, on first use
+    assert model.df.equals(mock_df)
+    assert model.df is model.df
+    mock_read_csv.assert_called_once()
+
 
+@patch("src.app.model.HappyModel._save_lookup_table")
 @patch("pandas.read_csv")
 @patch("joblib.load")
 @patch("joblib.dump")
 def test_happy_model_initialization_train_model(
-    mock_dump: MagicMock, mock_load: MagicMock, mock_read_csv: MagicMock
+    mock_dump: MagicMock,
+    mock_load: MagicMock,
+    mock_read_csv: MagicMock,
+    mock_save_lookup_table: MagicMock,
 ) -> None:
     # Mock DataFrame returned by read_csv
     mock_df = pd.DataFrame(
@@ -82,28 +108,31 @@ def test_happy_model_initialization_train_model(
     # Simulate the model loading failure
     mock_load.side_effect = Exception("Model not found")
 
-    model = HappyModel(data_fname="test_data.csv", model_fname="test_model.pkl")  # noqa: F841
+    model = HappyModel(  # noqa: F841
+        data_fname="test_data.csv", model_fname="test_model.pkl", compiled=False
+    )
 
     # Assertions
     mock_read_csv.assert_called_once()
     mock_load.assert_called_once()
     mock_dump.assert_called_once()  # Ensure model is trained and saved
+    mock_save_lookup_table.assert_called_once()  # Ensure lookup table is built and saved
 
 
 # Test predict_happiness
-@patch("sklearn.ensemble.GradientBoostingClassifier")
 @pytest.mark.asyncio(loop_scope="session")
-async def test_predict_happiness(mock_gbc: MagicMock) -> None:
+async def test_predict_happiness() -> None:
     # Mock the GradientBoostingClassifier and its methods
-    mock_model = mock_gbc.return_value
-    mock_model.predict.return_value = [0]  # Simulate model prediction
+    mock_model = MagicMock()
+    mock_model.classes_ = np.array([0, 1])
     mock_model.predict_proba.return_value = np.array(
-        [[0.2, 0.8]]
+        [[0.8, 0.2]]
     )  # Simulate probabilities
 
     # Create HappyModel instance
     model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
     model.model = mock_model  # Inject the mock model
+    model.lookup_ = None  # Bypass the lookup table
 
     # Call the predict_happiness method
     prediction, probability = await model.predict_happiness(4, 3, 5, 2, 4, 1)
@@ -111,3 +140,252 @@ async def test_predict_happiness(mock_gbc: MagicMock) -> None:
     # Assertions
     assert prediction == 0
     assert probability == 0.8
+    # The label is derived from the probabilities, in a single pass
+    mock_model.predict_proba.assert_called_once()
+    mock_model.predict.assert_not_called()
+
+
+def test_predict_proba_array_matches_sklearn() -> None:
+    model = HappyModel(
+        data_fname="happy_data.csv", model_fname="happy_model.pkl", compiled=False
+    )
+    X = input_space()
+
+    proba = model.predict_proba_array(X)
+    predictions, probabilities = model.predict_array(X)
+
+    assert np.allclose(proba, model.model.predict_proba(X))
+    assert np.array_equal(predictions, model.model.predict(X))
+    assert np.allclose(probabilities, proba.max(axis=1))
+
+
+# Test the lookup table
+def test_lookup_index_matches_input_space() -> None:
+    space = input_space()
+    assert space.shape == (LOOKUP_SIZE, 6)
+    for index in [0, 1, 4, 5, 3124, 7812, LOOKUP_SIZE - 1]:
+        assert lookup_index(space[index].tolist()) == index
+
+    with pytest.raises(ValueError):
+        lookup_index([0, 1, 1, 1, 1, 1])
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_predict_happiness_lookup_table() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    assert model.lookup_ is not None
+
+    ratings = [4, 3, 5, 2, 4, 1]
+    prediction, probability = await model.predict_happiness(*ratings)
+
+    # The table must agree with the underlying model
+    assert prediction == int(model.model.predict([ratings])[0])
+    assert probability == pytest.approx(model.model.predict_proba([ratings]).max())
+
+
+def test_lookup_table_rebuilt_when_stale() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    assert model.lookup_ is not None
+    predictions, probabilities = model.lookup_
+
+    with (
+        patch.object(model, "_save_lookup_table") as mock_save,
+        patch("numpy.load") as mock_np_load,
+    ):
+        mock_np_load.return_value.__enter__.return_value = {
+            "prediction": 1 - predictions,
+            "probability": probabilities,
+        }
+        rebuilt = model._load_lookup_table()
+
+    mock_save.assert_called_once()
+    assert rebuilt is not None
+    assert np.array_equal(rebuilt[0], predictions)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_predict_happiness_batch() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    X = input_space()[::997]
+
+    predictions, probabilities = await model.predict_happiness_batch(X)
+
+    # Same answers with and without the lookup table, and as single predictions
+    lookup = model.lookup_
+    model.lookup_ = None
+    expected_predictions, expected_probabilities = await model.predict_happiness_batch(
+        X
+    )
+    model.lookup_ = lookup
+    assert np.array_equal(predictions, expected_predictions)
+    assert np.allclose(probabilities, expected_probabilities)
+    assert (predictions[3], probabilities[3]) == await model.predict_happiness(*X[3])
+
+
+# Test the model version
+def test_model_version() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    assert model.version_ == HappyModel().version_
+
+    # A retrained model gets another version
+    model.model = GradientBoostingClassifier(n_estimators=5).fit(
+        model.df.drop("happiness", axis=1).values, model.df["happiness"].values
+    )
+    assert model._model_version() != model.version_
+
+
+# Test the compiled model
+def test_compiled_model_matches_sklearn() -> None:
+    estimator = joblib.load(MODEL_DIR / "happy_model.pkl")
+    compiled = CompiledModel.from_estimator(estimator)
+    X = input_space()
+
+    assert np.allclose(
+        compiled.decision_function(X)[:, 0], estimator.decision_function(X)
+    )
+    assert np.allclose(compiled.predict_proba(X), estimator.predict_proba(X))
+    assert np.array_equal(compiled.predict(X), estimator.predict(X))
+
+
+def test_compiled_model_matches_sklearn_multiclass() -> None:
+    rng = np.random.default_rng(0)
+    X = rng.integers(1, 6, size=(300, 6))
+    y = rng.integers(0, 3, size=300)
+    estimator = GradientBoostingClassifier(n_estimators=20, max_depth=4).fit(X, y)
+    compiled = CompiledModel.from_estimator(estimator)
+
+    assert np.allclose(
+        compiled.predict_proba(input_space()), estimator.predict_proba(input_space())
+    )
+
+    # Initial estimators which depend on the input cannot be compiled
+    estimator = GradientBoostingClassifier(
+        n_estimators=2, init=LogisticRegression()
+    ).fit(X, y)
+    with pytest.raises(ValueError):
+        CompiledModel.from_estimator(estimator)
+
+
+def test_compiled_model_save_load(tmp_path: Path) -> None:
+    compiled = CompiledModel.from_estimator(joblib.load(MODEL_DIR / "happy_model.pkl"))
+    compiled.save(tmp_path / "model.trees.npz")
+
+    loaded = CompiledModel.load(tmp_path / "model.trees.npz")
+
+    assert np.array_equal(
+        loaded.predict_proba(input_space()), compiled.predict_proba(input_space())
+    )
+
+
+def test_happy_model_serves_compiled_model() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    assert isinstance(model.model, CompiledModel)
+
+    # A compiled model which doesn't match the model file is ignored
+    with patch("src.app.model.file_digest", return_value="stale"):
+        assert model._load_compiled_model(MODEL_DIR / "happy_model.pkl") is None
+
+    # Serving the compiled model doesn't import scikit-learn
+    script = (
+        "import sys; from src.app.model import HappyModel; HappyModel(); "
+        "print('sklearn' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        cwd=Path(__file__).resolve().parent.parent.parent,
+        check=True,
+    )
+    assert output.stdout.strip().splitlines()[-1] == "False"
+
+
+# Test the memory-mapped artifacts
+def test_load_arrays_mmap(tmp_path: Path) -> None:
+    arrays = {
+        "vector": np.arange(10, dtype=np.int32),
+        "matrix": np.asfortranarray(np.arange(12, dtype=np.float64).reshape(3, 4)),
+        "scalar": np.float64(0.1),
+        "text": np.array("digest"),
+    }
+    np.savez(tmp_path / "arrays.npz", **arrays)
+
+    loaded = load_arrays(tmp_path / "arrays.npz", mmap=True)
+
+    assert set(loaded) == set(arrays)
+    for name, array in arrays.items():
+        assert np.array_equal(loaded[name], array)
+    assert isinstance(loaded["matrix"], np.memmap)
+    assert not loaded["matrix"].flags.writeable
+    assert str(loaded["text"]) == "digest"
+
+    # Compressed arrays cannot be mapped
+    np.savez_compressed(tmp_path / "compressed.npz", **arrays)
+    with pytest.raises(ValueError):
+        load_arrays(tmp_path / "compressed.npz", mmap=True)
+    assert np.array_equal(
+        load_arrays(tmp_path / "compressed.npz")["vector"], arrays["vector"]
+    )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_happy_model_mmap() -> None:
+    model = HappyModel(data_fname="happy_data.csv", model_fname="happy_model.pkl")
+    mapped = HappyModel(
+        data_fname="happy_data.csv", model_fname="happy_model.pkl", mmap=True
+    )
+
+    assert mapped.lookup_ is not None
+    assert isinstance(mapped.lookup_[0], np.memmap)
+    assert isinstance(mapped.model.value, np.memmap)
+    assert mapped.version_ == model.version_
+    X = input_space()
+    assert np.array_equal(mapped.predict_proba_array(X), model.predict_proba_array(X))
+    assert await mapped.predict_happiness(
+        4, 3, 5, 2, 4, 1
+    ) == await model.predict_happiness(4, 3, 5, 2, 4, 1)
+
+
+@pytest.mark.parametrize("backend", ["gbc", "hgbc", "logreg"])
+@pytest.mark.asyncio(loop_scope="session")
+async def test_happy_model_backends(tmp_path: Path, backend: str) -> None:
+    model = HappyModel(model_dir=tmp_path, backend=backend)
+
+    # The model of the backend is trained, saved under its own name and served
+    # without the lookup table
+    assert (tmp_path / BACKENDS[backend].model_fname).exists()
+    assert model.lookup_ is None
+    assert not list(tmp_path.glob("*.lut.npz"))
+    assert isinstance(model.model, CompiledModel) == (backend == "gbc")
+
+    X = input_space()[::97]
+    predictions, probabilities = model.predict(X)
+    estimator = joblib.load(tmp_path / BACKENDS[backend].model_fname)
+    assert np.array_equal(predictions, estimator.predict(X))
+    assert np.allclose(probabilities, estimator.predict_proba(X).max(axis=1))
+    assert await model.predict_happiness(*X[0]) == (
+        int(predictions[0]),
+        pytest.approx(float(probabilities[0])),
+    )
+
+
+def test_happy_model_read_only(tmp_path: Path) -> None:
+    (tmp_path / "happy_model.pkl").write_bytes(
+        (MODEL_DIR / "happy_model.pkl").read_bytes()
+    )
+
+    # The artifacts are built in memory, nothing is written
+    model = HappyModel(model_dir=tmp_path, mmap=True, read_only=True)
+    assert isinstance(model.model, CompiledModel)
+    assert model.lookup_ is not None
+    assert [path.name for path in tmp_path.iterdir()] == ["happy_model.pkl"]
+
+    # A model which cannot be loaded is not replaced by a trained one
+    with pytest.raises(FileNotFoundError):
+        HappyModel(model_dir=tmp_path, backend="logreg", read_only=True)
+    assert [path.name for path in tmp_path.iterdir()] == ["happy_model.pkl"]
+
+
+def test_happy_model_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        HappyModel(backend="unknown")
@@ -0,0 +1,144 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.app.model import HappyModel, file_digest
+from src.app.registry import ModelRegistry, main
+
+
+@pytest.fixture
+def model_path(tmp_path: Path) -> Path:
+    """Fixture of a model file to publish.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Returns:
+        Path: The model file.
+    """
+    path = tmp_path / "trained.pkl"
+    path.write_bytes(b"model")
+    return path
+
+
+def test_publish(tmp_path: Path, model_path: Path) -> None:
+    """
+    Test that published models get increasing versions with their metadata,
+    and are not activated.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        model_path (Path): Model file to publish.
+    """
+    registry = ModelRegistry(tmp_path / "registry")
+    assert registry.list_versions() == []
+
+    assert registry.publish(model_path, {"accuracy": 0.7}) == "v1"
+    assert registry.publish(model_path) == "v2"
+
+    assert registry.list_versions() == ["v1", "v2"]
+    assert registry.active_version() is None
+    assert (registry.model_dir("v1") / "happy_model.pkl").read_bytes() == b"model"
+    metadata = registry.metadata("v1")
+    assert metadata["version"] == "v1"
+    assert metadata["accuracy"] == 0.7
+    assert metadata["digest"] == file_digest(model_path)
+    # No staging directory is left behind
+    assert sorted(path.name for path in registry.root.iterdir()) == ["v1", "v2"]
+
+
+def test_publish_artifacts(tmp_path: Path) -> None:
+    """
+    Test that the artifacts of a gradient boosting model are built when it is
+    published, and that the version is not written when it is loaded.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+    """
+    model_path = tmp_path / "trained.pkl"
+    shutil.copy(
+        Path(__file__).resolve().parent.parent / "model" / "happy_model.pkl",
+        model_path,
+    )
+    registry = ModelRegistry(tmp_path / "registry")
+    version = registry.publish(model_path)
+
+    model_dir = registry.model_dir(version)
+    published = {path.name: path.stat().st_mtime_ns for path in model_dir.iterdir()}
+    assert set(published) == {
+        "happy_model.pkl",
+        "happy_model.trees.npz",
+        "happy_model.lut.npz",
+        "metadata.json",
+    }
+
+    for backend in ("lookup", "gbc"):
+        HappyModel(model_dir=model_dir, backend=backend, read_only=True)
+    assert {
+        path.name: path.stat().st_mtime_ns for path in model_dir.iterdir()
+    } == published
+
+
+def test_activate(tmp_path: Path, model_path: Path) -> None:
+    """
+    Test that only published versions can be activated.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        model_path (Path): Model file to publish.
+    """
+    registry = ModelRegistry(tmp_path)
+    version = registry.publish(model_path)
+
+    registry.activate(version)
+    assert registry.active_version() == version
+
+    with pytest.raises(KeyError):
+        registry.activate("v2")
+    with pytest.raises(KeyError):
+        registry.model_dir("../registry")
+    assert registry.active_version() == version
+
+
+def test_backend(tmp_path: Path, model_path: Path) -> None:
+    """
+    Test that a version is served by its recorded backend, unless the backend of
+    the server serves the same estimator.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        model_path (Path): Model file to publish.
+    """
+    registry = ModelRegistry(tmp_path)
+    unrecorded = registry.publish(model_path)
+    gbc = registry.publish(model_path, backend="gbc")
+    logreg = registry.publish(model_path, backend="logreg")
+
+    assert registry.metadata(logreg)["backend"] == "logreg"
+    assert registry.backend(unrecorded, "hgbc") == "hgbc"
+    assert registry.backend(gbc, "lookup") == "lookup"
+    assert registry.backend(gbc, "hgbc") == "gbc"
+    assert registry.backend(logreg, "lookup") == "logreg"
+
+
+def test_main(
+    tmp_path: Path, model_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """
+    Test the command line interface of the registry.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        model_path (Path): Model file to publish.
+        capsys (pytest.CaptureFixture[str]): Captured output.
+    """
+    root = str(tmp_path / "registry")
+    main(["--root", root, "publish", str(model_path)])
+    main(["--root", root, "publish", str(model_path), "--activate"])
+    main(["--root", root, "activate", "v1"])
+    main(["--root", root, "list"])
+
+    assert capsys.readouterr().out.splitlines() == ["v1", "v2", "* v1", "  v2"]
+    with pytest.raises(SystemExit):
+        main(["--root", root, "activate", "v3"])
@@ -0,0 +1,170 @@
+import builtins
+from pathlib import Path
+from typing import Any, Generator
+from unittest.mock import patch
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.dummy import DummyClassifier
+from sqlalchemy import text
+
+from src.app.database import (
+    RATING_COLUMNS,
+    dispose_engines,
+    get_engine,
+    init_db,
+    save_many_to_db,
+)
+from src.app.registry import ModelRegistry
+from src.app.retrain import (
+    in_holdout,
+    load_training_data,
+    peak_memory_mb,
+    retrain,
+    retrain_in_process,
+)
+
+
+@pytest.fixture
+def database_url(tmp_path: Path) -> Generator[str, None, None]:
+    """Fixture of a database with 20 labelled predictions, happy if the ratings are 5,
+    and two unlabelled predictions.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Yields:
+        str: The database URL.
+    """
+    database_url = f"sqlite:///{tmp_path / 'predictions.db'}"
+    assert init_db(database_url)
+    ratings = [1, 5] * 10 + [5, 5]
+    save_many_to_db(
+        database_url,
+        [{column: rating for column in RATING_COLUMNS} for rating in ratings],
+        [0] * len(ratings),
+        [0.9] * len(ratings),
+    )
+    with get_engine(database_url).begin() as connection:
+        connection.execute(
+            text(
+                "UPDATE happy_predictions SET label = (city_services = 5) WHERE id <= 20"
+            )
+        )
+    yield database_url
+    dispose_engines()
+
+
+@pytest.fixture
+def baseline_path(tmp_path: Path) -> Path:
+    """Fixture of a model which always predicts the most frequent class.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+
+    Returns:
+        Path: The model file.
+    """
+    path = tmp_path / "baseline.pkl"
+    joblib.dump(
+        DummyClassifier(strategy="most_frequent").fit(np.zeros((2, 6)), [0, 0]), path
+    )
+    return path
+
+
+def test_load_training_data(database_url: str) -> None:
+    """
+    Test that the training data is the dataset followed by the labelled predictions.
+
+    Args:
+        database_url (str): Database URL.
+    """
+    X, y, held_out = load_training_data(database_url, chunk_size=1)
+    assert X.shape == (163, 6)
+    assert X[-1].tolist() == [5] * 6
+    assert y[-2:].tolist() == [0, 1]
+    assert not held_out.any()
+
+    X, y, held_out = load_training_data(
+        database_url, include_predictions=True, holdout=0.2
+    )
+    assert X.shape == (165, 6)
+    assert y[-3:].tolist() == [1, 0, 0]
+    # Only labelled predictions are held out
+    assert held_out.tolist() == [False] * 143 + in_holdout(
+        np.arange(1, 21), 0.2
+    ).tolist() + [False, False]
+
+
+def test_retrain(tmp_path: Path, database_url: str, baseline_path: Path) -> None:
+    """
+    Test that a retrained model is published only if it beats the current model.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        database_url (str): Database URL.
+        baseline_path (Path): A model which is easy to beat.
+    """
+    registry = ModelRegistry(tmp_path / "registry")
+
+    result = retrain(database_url, registry.root, baseline_path, activate=True)
+    assert result["published"] == "v1"
+    assert result["accuracy"] > result["baseline_accuracy"]
+    assert result["holdout_rows"] == in_holdout(np.arange(1, 21), 0.2).sum() > 0
+    assert result["train_rows"] + result["holdout_rows"] == 163
+    assert result["peak_memory_mb"] > 0
+    assert registry.active_version() == "v1"
+    assert registry.metadata("v1")["accuracy"] == result["accuracy"]
+
+    # The same training doesn't beat the active version
+    result = retrain(database_url, registry.root)
+    assert result["published"] is None
+    assert registry.list_versions() == ["v1"]
+
+    # The backend of the trained model is recorded
+    result = retrain(database_url, registry.root, baseline_path, backend="logreg")
+    assert registry.metadata(result["published"])["backend"] == "logreg"
+
+    # Nothing is published without labelled predictions to evaluate on
+    result = retrain(database_url, registry.root, baseline_path, holdout=0.0)
+    assert result["published"] is None
+    assert result["accuracy"] is None
+
+
+@pytest.mark.asyncio
+async def test_retrain_in_process(
+    tmp_path: Path, database_url: str, baseline_path: Path
+) -> None:
+    """
+    Test that the retraining job runs in a separate process.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+        database_url (str): Database URL.
+        baseline_path (Path): A model which is easy to beat.
+    """
+    result = await retrain_in_process(
+        database_url=database_url,
+        registry_root=tmp_path / "registry",
+        baseline_path=baseline_path,
+    )
+    assert result["published"] == "v1"
+    assert not ModelRegistry(tmp_path / "registry").active_version()
+
+
+def test_peak_memory_mb_unavailable() -> None:
+    """
+    Test that the peak memory is not reported where `resource` is missing (Windows).
+    """
+    import_module = builtins.__import__
+
+    def import_without_resource(name: str, *args: Any, **kwargs: Any) -> Any:
+        if name == "resource":
+            raise ImportError(name)
+        return import_module(name, *args, **kwargs)
+
+    with patch("builtins.__import__", side_effect=import_without_resource):
+        assert peak_memory_mb() is None
+    peak = peak_memory_mb()
+    assert peak is not None and peak > 0
@@ -0,0 +1,77 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.app.search import Candidate, main, mark_pareto_front, search, select
+
+DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "happy_data.csv"
+
+
+def test_mark_pareto_front_and_select() -> None:
+    """
+    Test that only the candidates which are not both less accurate and slower
+    than another one are on the Pareto front, and the selection within a budget.
+    """
+    candidates = [
+        Candidate("gbc", {}, accuracy=0.7, accuracy_std=0.0, latency_us=100.0),
+        Candidate("gbc", {}, accuracy=0.6, accuracy_std=0.0, latency_us=50.0),
+        Candidate("hgbc", {}, accuracy=0.6, accuracy_std=0.0, latency_us=80.0),
+        Candidate("current", {}, accuracy=0.8, accuracy_std=0.0, latency_us=200.0),
+    ]
+    mark_pareto_front(candidates)
+
+    assert [candidate.pareto for candidate in candidates] == [True, True, False, True]
+    # The current model is never selected
+    assert select(candidates) is candidates[0]
+    assert select(candidates, max_latency_us=60) is candidates[1]
+    assert select(candidates, max_latency_us=10) is None
+
+
+@pytest.mark.parametrize("method", ["random", "halving"])
+def test_search(method: str) -> None:
+    """
+    Test that the search returns the best configurations of each family,
+    measured and sorted by accuracy.
+
+    Args:
+        method (str): The search method.
+    """
+    df = pd.read_csv(DATA_PATH)
+    X, y = df.drop("happiness", axis=1).values, df["happiness"].values
+
+    candidates = search(X, y, method=method, n_iter=4, cv=3, n_jobs=1, top=2)
+
+    assert {candidate.family for candidate in candidates} == {"gbc", "hgbc"}
+    assert len(candidates) <= 4
+    accuracies = [candidate.accuracy for candidate in candidates]
+    assert accuracies == sorted(accuracies, reverse=True)
+    for candidate in candidates:
+        assert candidate.latency_us > 0
+        assert candidate.size_bytes > 0
+        assert candidate.estimator.predict(X[:1]).shape == (1,)
+    assert any(candidate.pareto for candidate in candidates)
+
+
+def test_main(tmp_path: Path) -> None:
+    """
+    Test that the command writes the candidates and the selected one as JSON.
+
+    Args:
+        tmp_path (Path): Temporary directory provided by pytest.
+    """
+    output = tmp_path / "search.json"
+    main(
+        ["--family", "gbc", "--method", "random", "--n-iter", "2", "--cv", "3"]
+        + ["--n-jobs", "1", "--top", "1", "--output", str(output)]
+    )
+
+    with open(output) as f:
+        results = json.load(f)
+    assert [candidate["family"] for candidate in results["candidates"]] in (
+        ["gbc", "current"],
+        ["current", "gbc"],
+    )
+    assert np.isfinite(results["candidates"][0]["accuracy"])
@@ -6,7 +6,12 @@ import pytest
 import requests
 
 import streamlit as st
-from src.streamlit.ui import get_backend_host, predict, rating_section
+from src.streamlit.ui import (
+    get_backend_host,
+    get_session,
+    predict,
+    rating_section,
+)
 from streamlit.testing.v1 import AppTest
 
 
@@ -24,13 +29,28 @@ def mock_st() -> Generator[Tuple[MagicMock, MagicMock], None, None]:
         yield mock_success, mock_error
 
 
+@pytest.fixture(scope="function")
+def mock_post() -> Generator[MagicMock, None, None]:
+    """Provides a mocked `post` method of the HTTP session, with no known scheme.
+
+    Yields:
+        MagicMock: Mocked `requests.Session.post` method.
+    """
+    session = MagicMock()
+    with (
+        patch("src.streamlit.ui.get_session", return_value=session),
+        patch("src.streamlit.ui.known_schemes", return_value={}),
+    ):
+        yield session.post
+
+
 def setup_mock_response(
     mock_post: MagicMock, prediction: bool, probability: float
 ) -> None:
     """Helper function to set up the mocked response for requests.post.
 
     Args:
-        mock_post (MagicMock): The mocked `requests.post` method.
+        mock_post (MagicMock): The mocked `requests.Session.post` method.
         prediction (bool): The prediction value to mock.
         probability (float): The probability value to mock.
     """
@@ -83,7 +103,6 @@ def test_get_backend_host(env_var_value: Optional[str], expected_output: str) ->
         os.environ.update(original_env)
 
 
-@patch("requests.post")
 @pytest.mark.parametrize(
     "data, prediction, probability, expected_message, is_success",
     [
@@ -116,7 +135,7 @@ def test_predict(
     """Tests the `predict` function with various scenarios.
 
     Args:
-        mock_post (MagicMock): Mocked `requests.post` method.
+        mock_post (MagicMock): Mocked `requests.Session.post` method.
         mock_st (Tuple[MagicMock, MagicMock]): Mocked Streamlit methods.
         data (Dict[str, Any]): Input data for the `predict` function.
         prediction (bool): The mocked prediction value.
@@ -134,7 +153,6 @@ def test_predict(
         mock_st[1].assert_called_once_with(expected_message)
 
 
-@patch("requests.post")
 def test_predict_http_fallback(
     mock_post: MagicMock, mock_st: Tuple[MagicMock, MagicMock]
 ) -> None:
@@ -142,7 +160,7 @@ def test_predict_http_fallback(
 
     Args:
         mock_st: The mocked Streamlit success and error methods.
-        mock_post: The mocked requests.post method.
+        mock_post: The mocked requests.Session.post method.
     """
 
     # Simulate SSL error for the first call (HTTPS request)
@@ -164,8 +182,14 @@ def test_predict_http_fallback(
     # Assert that the success method was called with the correct message
     mock_st[0].assert_called_once_with("Good news - you are happy! We're 75% sure 😃")
 
+    # The next prediction goes straight to HTTP
+    mock_post.side_effect = None
+    mock_post.return_value = mock_response
+    predict(backend_host="backend_host", data=data, predict_button=True)
+    assert mock_post.call_args[0][0] == "http://backend_host/predict"
+    assert mock_post.call_count == 3
+
 
-@patch("requests.post")
 def test_predict_failure(
     mock_post: MagicMock, mock_st: Tuple[MagicMock, MagicMock]
 ) -> None:
@@ -173,7 +197,7 @@ def test_predict_failure(
 
     Args:
         mock_st: The mocked Streamlit success and error methods.
-        mock_post: The mocked requests.post method.
+        mock_post: The mocked requests.Session.post method.
     """
     mock_post.side_effect = [
         requests.exceptions.SSLError("SSL Error"),  # Simulate SSL error on HTTPS
@@ -192,14 +216,13 @@ def test_predict_failure(
     )
 
 
-@patch("requests.post")
 def test_predict_no_button_pressed(
     mock_post: MagicMock, mock_st: Tuple[MagicMock, MagicMock]
 ) -> None:
     """Tests the `predict` function when the prediction button is not pressed.
 
     Args:
-        mock_post (MagicMock): Mocked `requests.post` method.
+        mock_post (MagicMock): Mocked `requests.Session.post` method.
         mock_st (Tuple[MagicMock, MagicMock]): Mocked Streamlit methods.
     """
     data = {"key": "value"}
@@ -242,3 +265,61 @@ def test_rating_section() -> None:
         )
 
         assert result == 4
+
+
+def test_predict_http_error(
+    mock_post: MagicMock, mock_st: Tuple[MagicMock, MagicMock]
+) -> None:
+    """Tests the predict function when the backend answers with an error status.
+
+    Args:
+        mock_post (MagicMock): Mocked `requests.Session.post` method.
+        mock_st (Tuple[MagicMock, MagicMock]): Mocked Streamlit methods.
+    """
+    mock_response = MagicMock()
+    mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+        "503 Server Error"
+    )
+    mock_post.return_value = mock_response
+
+    predict(backend_host="backend_host", data={}, predict_button=True)
+
+    # The backend answered over HTTPS, HTTP is not tried
+    mock_post.assert_called_once()
+    mock_st[1].assert_called_once_with(
+        "Failed to connect to the prediction service: 503 Server Error"
+    )
+
+
+def test_predict_debug_round_trip(
+    mock_post: MagicMock, mock_st: Tuple[MagicMock, MagicMock]
+) -> None:
+    """Tests that the round trip time is shown in debug mode.
+
+    Args:
+        mock_post (MagicMock): Mocked `requests.Session.post` method.
+        mock_st (Tuple[MagicMock, MagicMock]): Mocked Streamlit methods.
+    """
+    setup_mock_response(mock_post, True, 0.9)
+
+    with (
+        patch("src.streamlit.ui.UI_DEBUG", True),
+        patch.object(st, "caption") as mock_caption,
+    ):
+        predict(backend_host="backend_host", data={}, predict_button=True)
+
+    assert mock_caption.call_args[0][0].startswith("Round trip: ")
+    assert mock_caption.call_args[0][0].endswith(" ms (https)")
+    _, kwargs = mock_post.call_args
+    assert kwargs["timeout"] == (3.05, 10.0)
+
+
+def test_get_session() -> None:
+    """Tests that the session is shared and retries the failed connections."""
+    session = get_session()
+
+    assert get_session() is session
+    retry = session.get_adapter("http://backend_host").max_retries
+    assert retry.total == 3
+    assert retry.status_forcelist == (503,)
+    assert retry.other == 0
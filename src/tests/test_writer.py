@@ -0,0 +1,165 @@
+import asyncio
+from typing import Generator
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.app.writer import PredictionWriter
+
+DATA = {
+    "city_services": 3,
+    "housing_costs": 3,
+    "school_quality": 3,
+    "local_policies": 3,
+    "maintenance": 3,
+    "social_events": 3,
+}
+
+
+@pytest.fixture
+def mock_save_many_to_db() -> Generator[AsyncMock, None, None]:
+    """
+    Fixture to mock the bulk insert used by the writer.
+
+    Yields:
+        AsyncMock: Mocked `save_many_to_db_async` function, reporting success.
+    """
+    with patch(
+        "src.app.writer.save_many_to_db_async", new_callable=AsyncMock
+    ) as mock_save:
+        mock_save.return_value = True
+        yield mock_save
+
+
+def test_writer_invalid_drop_policy() -> None:
+    """
+    Test that an unknown drop policy is rejected.
+    """
+    with pytest.raises(ValueError):
+        PredictionWriter("sqlite:///:memory:", drop_policy="ignore")
+
+
+@pytest.mark.asyncio
+async def test_writer_flush_by_size(mock_save_many_to_db: AsyncMock) -> None:
+    """
+    Test that a full batch is flushed without waiting for the flush interval.
+
+    Args:
+        mock_save_many_to_db (AsyncMock): Mocked bulk insert.
+    """
+    writer = PredictionWriter("sqlite:///:memory:", flush_size=3, flush_interval=60)
+    await writer.start()
+
+    for prediction in (0, 1, 1):
+        assert await writer.put(DATA, prediction, 0.5)
+    await asyncio.sleep(0.05)
+
+    mock_save_many_to_db.assert_awaited_once_with(
+        "sqlite:///:memory:", [DATA] * 3, [0, 1, 1], [0.5] * 3, [None] * 3
+    )
+    await writer.stop()
+    assert writer.stats()["flushed"] == 3
+    assert writer.stats()["flushes"] == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_flush_by_time(mock_save_many_to_db: AsyncMock) -> None:
+    """
+    Test that a partial batch is flushed after the flush interval.
+
+    Args:
+        mock_save_many_to_db (AsyncMock): Mocked bulk insert.
+    """
+    writer = PredictionWriter("sqlite:///:memory:", flush_size=100, flush_interval=0.05)
+    await writer.start()
+
+    await writer.put(DATA, 1, 0.9)
+    await asyncio.sleep(0.02)
+    mock_save_many_to_db.assert_not_awaited()
+    await asyncio.sleep(0.1)
+    mock_save_many_to_db.assert_awaited_once()
+
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_writer_drains_on_stop(mock_save_many_to_db: AsyncMock) -> None:
+    """
+    Test that the predictions still waiting are saved on shutdown,
+    and that predictions are rejected afterwards.
+
+    Args:
+        mock_save_many_to_db (AsyncMock): Mocked bulk insert.
+    """
+    writer = PredictionWriter("sqlite:///:memory:", flush_size=100, flush_interval=60)
+    await writer.start()
+    for _ in range(5):
+        await writer.put(DATA, 1, 0.9)
+
+    await writer.stop()
+
+    assert sum(len(call.args[1]) for call in mock_save_many_to_db.await_args_list) == 5
+    assert await writer.put(DATA, 1, 0.9) is False
+    stats = writer.stats()
+    assert stats["queued"] == 5
+    assert stats["flushed"] == 5
+    assert stats["pending"] == 0
+    assert stats["dropped"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "drop_policy, expected_probabilities",
+    [("drop_newest", [0.1, 0.2]), ("drop_oldest", [0.2, 0.3])],
+)
+async def test_writer_drop_policy(
+    mock_save_many_to_db: AsyncMock,
+    drop_policy: str,
+    expected_probabilities: list,
+) -> None:
+    """
+    Test the drop policies when the queue is full.
+
+    Args:
+        mock_save_many_to_db (AsyncMock): Mocked bulk insert.
+        drop_policy (str): The drop policy under test.
+        expected_probabilities (list): The probabilities of the predictions kept.
+    """
+    writer = PredictionWriter(
+        "sqlite:///:memory:",
+        max_queue_size=2,
+        flush_size=100,
+        flush_interval=60,
+        drop_policy=drop_policy,
+    )
+    await writer.start()
+    # Let the background task take the first prediction off the queue
+    await writer.put(DATA, 1, 0.0)
+    await asyncio.sleep(0)
+
+    for probability in (0.1, 0.2, 0.3):
+        await writer.put(DATA, 1, probability)
+    assert writer.stats()["dropped"] == 1
+
+    await writer.stop()
+    saved = [p for call in mock_save_many_to_db.await_args_list for p in call.args[3]]
+    assert saved == [0.0] + expected_probabilities
+
+
+@pytest.mark.asyncio
+async def test_writer_counts_failures(mock_save_many_to_db: AsyncMock) -> None:
+    """
+    Test that predictions which could not be saved are counted as failed.
+
+    Args:
+        mock_save_many_to_db (AsyncMock): Mocked bulk insert.
+    """
+    mock_save_many_to_db.return_value = False
+    writer = PredictionWriter("sqlite:///:memory:", flush_size=2)
+    await writer.start()
+    await writer.put(DATA, 1, 0.9)
+    await writer.put(DATA, 0, 0.8)
+    await writer.stop()
+
+    assert writer.stats()["failed"] == 2
+    assert writer.stats()["flushed"] == 0